@@ -0,0 +1,117 @@
+#!/usr/bin/python3
+
+"""Compares the codecs of the file storage engine.
+
+Every codec encodes and decodes the dictionary representation of the same
+objects, and a Markdown table of the best times and file sizes is printed.
+The dictionaries are built directly, so the storage of the working directory
+is neither loaded nor changed.
+
+Usage:
+    ./benchmark_codecs.py [<number of objects>]
+"""
+
+import io
+import sys
+import time
+from datetime import datetime
+from typing import Callable, List
+from uuid import uuid4
+from standalone import import_engine
+
+CODECS = import_engine("codec").CODECS
+
+
+def best_time(function: Callable, repeat: int = 5) -> float:
+    """Returns the best time taken by a function, in seconds."""
+    times = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+
+def sample_objects(count: int) -> dict:
+    """Returns the dictionary representation of `count` objects."""
+    objects = {}
+    now = datetime.now().isoformat()
+
+    def sample(class_name: str, **attributes) -> str:
+        """Adds the representation of an object and returns its id."""
+        obj_id = str(uuid4())
+        objects[f"{class_name}.{obj_id}"] = {
+            "id": obj_id,
+            "created_at": now,
+            "updated_at": now,
+            **attributes,
+            "__class__": class_name,
+        }
+        return obj_id
+
+    for number in range(count // 3):
+        user_id = sample(
+            "User", email=f"user{number}@alx.com", first_name="Betty"
+        )
+        place_id = sample(
+            "Place",
+            user_id=user_id,
+            name=f"Cosy room {number}",
+            number_rooms=number % 5,
+            latitude=5.6037,
+            amenity_ids=["wifi", "pool"],
+        )
+        sample(
+            "Review",
+            place_id=place_id,
+            user_id=user_id,
+            text="Lovely stay, would come back – merci!",
+        )
+
+    return objects
+
+
+def main(argv: List[str]) -> int:
+    """Runs the benchmark and prints its results.
+
+    Args:
+        argv (List[str]): The command line arguments.
+
+    Returns:
+        int: The exit status.
+    """
+    count = int(argv[0]) if argv else 30000
+    objects = sample_objects(count)
+
+    print(f"{len(objects)} objects\n")
+    print("| Codec | Encode (ms) | Decode (ms) | Size (KiB) |")
+    print("| --- | ---: | ---: | ---: |")
+
+    for name, codec in CODECS.items():
+        content = codec.encode(objects)
+
+        def decode() -> None:
+            """Decodes the content of the file."""
+            if codec.binary:
+                file = io.BytesIO(content)
+            else:
+                file = io.StringIO(content, newline="")
+
+            for _ in codec.decode(file):
+                pass
+
+        size = len(content if codec.binary else content.encode("utf-8"))
+        print(
+            f"| `{name}` "
+            f"| {best_time(lambda: codec.encode(objects)) * 1000:.0f} "
+            f"| {best_time(decode) * 1000:.0f} "
+            f"| {size / 1024:.0f} |"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
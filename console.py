@@ -7,7 +7,8 @@ import os
 import cmd
 import shlex
 from ast import literal_eval
-from typing import List
+from datetime import datetime
+from typing import Any, Callable, Iterable, List
 from models import storage
 from models.user import User
 from models.city import City
@@ -16,6 +17,10 @@ from models.state import State
 from models.review import Review
 from models.amenity import Amenity
 from models.base_model import BaseModel
+from models.engine.range_index import is_number
+
+# the `fields=` option of the `all` and `show` commands, e.g. fields=[id,name]
+FIELDS = re.compile(r"\bfields=(\[[^\]]*\]|\S+)")
 
 
 class HBNBCommand(cmd.Cmd):
@@ -61,6 +66,7 @@ class HBNBCommand(cmd.Cmd):
             - `User.all()`
             - `User.create()`
             - `User.update(<id>, <attribute_name>, <attribute_value>)`
+            - `Place.where(price_by_night < 100 and max_guest >= 4)`
 
         Args:
             line (str): The command line received.
@@ -78,6 +84,19 @@ class HBNBCommand(cmd.Cmd):
         if not args:
             return line
 
+        # the list of fields is passed on whole, whatever the other arguments
+        fields = FIELDS.search(args)
+        if fields and user_cmd in ("all", "show"):
+            args = args[: fields.start()] + args[fields.end():]
+            line = self.__handle_model_based_cmd(
+                f"{class_name}.{user_cmd}({args.strip().strip(',')})"
+            )
+            return f"{line} {''.join(fields.group().split())}"
+
+        # filters are parsed by the commands, quotes included
+        if user_cmd in ("where", "explain", "stats"):
+            return f"{line} {args}"
+
         try:
             # Handle dictionary argument (for update commands)
             obj_dict_match = re.search(r"\{.*?\}", args)
@@ -242,26 +261,19 @@ class HBNBCommand(cmd.Cmd):
             object | None: The instance (object) of the searched `instance_id`
             and `instance_class` if found, otherwise None.
         """
-        all_objects = storage.all()
-
-        for obj in all_objects.values():
-            if (
-                obj.id == instance_id
-                and obj.__class__.__name__ == instance_class
-            ):
-                return obj
-
-        return None
+        return storage.get(instance_class, instance_id)
 
     @staticmethod
     def do_quit(_) -> bool:
         """Quit command to exit the console."""
+        storage.flush()
         return True
 
     @staticmethod
     def do_eof(_) -> bool:
         """Exits the console gracefully."""
         print()
+        storage.flush()
         return True
 
     def do_create(self, class_name: str) -> None:
@@ -274,7 +286,9 @@ class HBNBCommand(cmd.Cmd):
             return
 
         obj = self.__models[shlex.split(class_name)[0]]()
-        obj.save()
+
+        # `obj.save()` would tell the subscribers about `updated_at` too
+        storage.save()
         print(obj.id)
 
     @staticmethod
@@ -295,6 +309,11 @@ class HBNBCommand(cmd.Cmd):
         Args:
             line (str): The command line argument received.
         """
+        line, fields = self.__pop_fields(line)
+        if fields == ():
+            print("** invalid fields **")
+            return
+
         if not self.__is_valid_args(line, check_class=True, check_id=True):
             return
 
@@ -307,26 +326,31 @@ class HBNBCommand(cmd.Cmd):
             return
 
         instance = self.__search_instance(instance_class, instance_id)
-        if instance:
-            print(instance)
-        else:
+        if not instance:
             print("** no instance found **")
+        elif fields:
+            print(instance.formatter(fields)(instance))
+        else:
+            print(instance)
 
     @staticmethod
     def help_show() -> None:
         """Prints the help info for the `show` command."""
         print(
             "Prints the string representation of an instance based on the "
-            "class name and id",
+            "class name and id, optionally with only some fields",
             "Usage:",
-            "\tOption 1: show <class name> <id>",
-            "\tOption 2: <class name>.show(<id>)",
+            "\tOption 1: show <class name> <id> [fields=[<name>,...]]",
+            "\tOption 2: <class name>.show(<id>[, fields=[<name>,...]])",
             sep="\n",
         )
 
     def do_destroy(self, line) -> None:
         """Deletes an instance base on the class name and id.
 
+        With the `--cascade` option, the instances referencing it are deleted
+        too, and everything is saved at once.
+
         Args:
             line (str): The command line argument received.
         """
@@ -335,14 +359,15 @@ class HBNBCommand(cmd.Cmd):
         if not self.__is_valid_args(line, check_class=True, check_id=True):
             return
 
-        instance_class, instance_id = shlex.split(line)
+        instance_class, instance_id, *options = shlex.split(line)
+        if any(option != "--cascade" for option in options):
+            print("** unknown option **")
+            return
 
         instance = self.__search_instance(instance_class, instance_id)
         if instance:
-            objects = storage.all()
-
             # delete the current instance
-            del objects[f"{instance.__class__.__name__}.{instance.id}"]
+            storage.delete(instance, cascade=bool(options))
 
             # save the updated objects dictionary
             storage.save()
@@ -353,46 +378,133 @@ class HBNBCommand(cmd.Cmd):
     def help_destroy() -> None:
         """Prints the help info for the `show` command."""
         print(
-            "Deletes an instance based on the class name and id",
+            "Deletes an instance based on the class name and id. With "
+            "--cascade, the instances referencing it are deleted too (e.g. "
+            "the cities, places and reviews of a state).",
             "Usage:",
-            "\tOption 1: destroy <class name> <id>",
-            "\tOption 2: <class name>.destroy(<id>)",
+            "\tOption 1: destroy <class name> <id> [--cascade]",
+            "\tOption 2: <class name>.destroy(<id>[, --cascade])",
             sep="\n",
         )
 
-    def do_all(self, model_name: str) -> None:
-        """Prints the string representation for all or some model instances."""
-        if model_name and shlex.split(model_name)[0] not in self.__models:
-            print("** class doesn't exist **")
+    def do_all(self, line: str) -> None:
+        """Prints the string representation for all or some model instances.
+
+        The instances are printed as they are read, one page at a time if
+        `limit`, `offset` or `after` options are given, e.g.
+        `all User limit=100 after=<id>`.
+
+        Args:
+            line (str): The command line argument received.
+        """
+        line, fields = self.__pop_fields(line)
+        if fields == ():
+            print("** invalid fields **")
             return
 
-        objects = storage.all()
-        instances = []
+        args = shlex.split(line)
 
-        # print the instances for a specific model, if provided
-        if model_name:
-            for obj in objects.values():
-                if obj.__class__.__name__ == model_name:
-                    instances.append(str(obj))
-        else:
-            # print all the instances available
-            for obj in objects.values():
-                instances.append(str(obj))
+        model_name = None
+        if args and "=" not in args[0]:
+            model_name = args.pop(0)
+            if model_name not in self.__models:
+                print("** class doesn't exist **")
+                return
+
+        options = {}
+        for arg in args:
+            name, equals, value = arg.partition("=")
+            if not equals or name not in ("limit", "offset", "after"):
+                print("** unknown option **")
+                return
 
-        print(instances)
+            if name != "after":
+                if not value.isdigit():
+                    print(f"** {name} must be a non-negative integer **")
+                    return
+                value = int(value)
+
+            options[name] = value
+
+        try:
+            objects = storage.page(model_name, **options)
+        except ValueError:
+            print("** no instance found **")
+            return
+
+        if fields:
+            self.__print_list(
+                objects, lambda obj: obj.formatter(fields)(obj)
+            )
+        else:
+            self.__print_list(objects)
 
     @staticmethod
     def help_all() -> None:
         """Prints the help info for the `all` command."""
         print(
             "Prints the string representation for all or a specified model's "
-            "instances.",
+            "instances, optionally a page of at most limit instances, "
+            "skipping offset instances from the first one or from the one "
+            "after the given id (or <class name>.<id> without a class name), "
+            "optionally with only some fields.",
             "Usage:",
-            "\tOption 1: all [<class name>]",
-            "\tOption 2: <class name>.all()",
+            "\tOption 1: all [<class name>] [limit=<n>] [offset=<n>] "
+            "[after=<id>] [fields=[<name>,...]]",
+            "\tOption 2: <class name>.all([limit=<n>][, offset=<n>]"
+            "[, after=<id>][, fields=[<name>,...]])",
             sep="\n",
         )
 
+    @staticmethod
+    def __print_list(
+        objects: Iterable[Any], format_instance: Callable[[Any], str] = str
+    ) -> None:
+        """Prints the string representation of objects as a list, writing
+        every object as soon as it is read instead of building the list.
+
+        Args:
+            objects (Iterable[Any]): The objects.
+
+            format_instance (Callable[[Any], str], optional): Returns the
+            string representation of an object. Defaults to `str`.
+        """
+        separator = ""
+
+        print("[", end="")
+        for obj in objects:
+            print(separator, repr(format_instance(obj)), sep="", end="")
+            separator = ", "
+        print("]")
+
+    @staticmethod
+    def __pop_fields(line: str) -> tuple:
+        """Takes the `fields=` option out of the arguments of a command.
+
+        The fields are separated by commas, optionally within brackets, e.g.
+        `fields=[id,name]` or `fields=id,name`.
+
+        Args:
+            line (str): The command line argument received.
+
+        Returns:
+            tuple: The line without the option, and the names of the fields,
+            which is None without the option and empty if a name is invalid.
+        """
+        match = FIELDS.search(line)
+        if not match:
+            return line, None
+
+        fields = tuple(
+            name.strip().strip("'\"")
+            for name in match.group(1).strip("[]").split(",")
+            if name.strip()
+        )
+        if not all(name.isidentifier() for name in fields):
+            fields = ()
+
+        return line[: match.start()] + line[match.end():], fields
+
     def do_update(self, arg: str) -> None:
         """Updates an instance based on the class name and id by adding or
         updating attributes.
@@ -425,14 +537,23 @@ class HBNBCommand(cmd.Cmd):
                 attr_val = literal_eval(attr_val)
             except (ValueError, SyntaxError):
                 # well, looks like we'd have to save it as it was received
-                instance.__dict__[attr_name] = attr_val
+                attributes = {attr_name: attr_val}
             else:
                 if isinstance(attr_val, dict):
-                    instance.__dict__.update(attr_val)
+                    attributes = attr_val
                 else:
-                    instance.__dict__[attr_name] = attr_val
+                    attributes = {attr_name: attr_val}
 
-            instance.save()
+            storage.preserve(instance)
+            instance.__dict__["updated_at"] = datetime.now()
+            instance.__dict__.update(attributes)
+
+            # the attributes bypassed `__setattr__`, so update the indexes and
+            # tell the subscribers, once, as `instance.save()` would again
+            storage.mark_dirty(
+                instance, *dict.fromkeys([*attributes, "updated_at"])
+            )
+            storage.save()
         else:
             print("** no instance found **")
 
@@ -457,14 +578,7 @@ class HBNBCommand(cmd.Cmd):
         if not self.__is_valid_args(model_name, check_class=True):
             return
 
-        objects = storage.all()
-        instance_count = 0
-
-        for obj in objects.values():
-            if obj.__class__.__name__ == model_name:
-                instance_count += 1
-
-        print(instance_count)
+        print(storage.count(shlex.split(model_name)[0]))
 
     @staticmethod
     def help_count() -> None:
@@ -477,6 +591,267 @@ class HBNBCommand(cmd.Cmd):
             sep="\n",
         )
 
+    def do_range(self, line: str) -> None:
+        """Prints the instances of a model whose numeric attribute is within
+        a range, ordered by that attribute.
+
+        Args:
+            line (str): The command line argument received.
+        """
+        if not self.__is_valid_args(line, check_class=True):
+            return
+
+        args = shlex.split(line)
+        if len(args) < 2:
+            print("** attribute name missing **")
+            return
+
+        if len(args) < 3:
+            print("** value missing **")
+            return
+
+        try:
+            bounds = [literal_eval(bound) for bound in args[2:4]]
+        except (ValueError, SyntaxError):
+            bounds = None
+
+        if not bounds or not all(is_number(bound) for bound in bounds):
+            print("** range bounds must be numbers **")
+            return
+
+        objects = storage.range(args[0], args[1], *bounds)
+        print([str(obj) for obj in objects])
+
+    @staticmethod
+    def help_range() -> None:
+        """Prints the help info for the `range` command."""
+        print(
+            "Prints the instances of a model whose numeric attribute is "
+            "between a minimum and an optional maximum, both included.",
+            "Usage:",
+            "\tOption 1: range <class name> <attribute name> <min> [<max>]",
+            "\tOption 2: <class name>.range(<attribute name>, <min>[, <max>])",
+            sep="\n",
+        )
+
+    def do_near(self, line: str) -> None:
+        """Prints the instances of a model nearest to a point, nearest first.
+
+        Args:
+            line (str): The command line argument received.
+        """
+        if not self.__is_valid_args(line, check_class=True):
+            return
+
+        args = shlex.split(line)
+        if len(args) < 3:
+            print("** coordinates missing **")
+            return
+
+        try:
+            numbers = [literal_eval(arg) for arg in args[1:5]]
+        except (ValueError, SyntaxError):
+            numbers = []
+
+        if not all(is_number(number) for number in numbers) or not numbers:
+            print("** coordinates must be numbers **")
+            return
+
+        latitude, longitude, *extra = numbers
+        k = extra[0] if extra else 10
+        if not isinstance(k, int) or k < 1:
+            print("** k must be a positive integer **")
+            return
+
+        radius = extra[1] if len(extra) > 1 else None
+
+        try:
+            objects = storage.near(args[0], latitude, longitude, k, radius)
+        except ValueError:
+            print("** class has no location **")
+            return
+
+        print([str(obj) for obj in objects])
+
+    @staticmethod
+    def help_near() -> None:
+        """Prints the help info for the `near` command."""
+        print(
+            "Prints the k instances of a model nearest to a point, 10 by "
+            "default, optionally within a radius in kilometres.",
+            "Usage:",
+            "\tOption 1: near <class name> <latitude> <longitude> [<k>] "
+            "[<radius>]",
+            "\tOption 2: "
+            "<class name>.near(<latitude>, <longitude>[, <k>[, <radius>]])",
+            sep="\n",
+        )
+
+    def do_search(self, line: str) -> None:
+        """Prints the instances of a model whose text mentions some words,
+        best match first.
+
+        Args:
+            line (str): The command line argument received.
+        """
+        if not self.__is_valid_args(line, check_class=True):
+            return
+
+        args = shlex.split(line)
+        query = " ".join(args[1:])
+        if not query.strip():
+            print("** search terms missing **")
+            return
+
+        try:
+            objects = storage.search(args[0], query)
+        except ValueError:
+            print("** class has no text index **")
+            return
+
+        print([str(obj) for obj in objects])
+
+    @staticmethod
+    def help_search() -> None:
+        """Prints the help info for the `search` command."""
+        print(
+            "Prints the instances of a model whose text mentions any of the "
+            "search terms, best match first.",
+            "Usage:",
+            '\tOption 1: search <class name> "<search terms>"',
+            '\tOption 2: <class name>.search("<search terms>")',
+            sep="\n",
+        )
+
+    def do_where(self, line: str) -> None:
+        """Prints the instances of a model matching a filter.
+
+        Args:
+            line (str): The command line argument received.
+        """
+        result = self.__run_filter(line)
+        if result is not None:
+            print([str(obj) for obj in result["matches"]])
+
+    @staticmethod
+    def help_where() -> None:
+        """Prints the help info for the `where` command."""
+        print(
+            "Prints the instances of a model matching a filter, which "
+            "compares attributes to values with ==, !=, <, <=, > and >=, "
+            "combined with and, or, not and parentheses.",
+            "Usage:",
+            "\tOption 1: where <class name> <filter>",
+            "\tOption 2: <class name>.where(<filter>)",
+            "Example: Place.where(price_by_night < 100 and max_guest >= 4)",
+            sep="\n",
+        )
+
+    def do_explain(self, line: str) -> None:
+        """Runs a filter on a model and prints the plan used, with timings.
+
+        Args:
+            line (str): The command line argument received.
+        """
+        result = self.__run_filter(line)
+        if result is None:
+            return
+
+        print(
+            f"Filter: {result['filter']}",
+            f"Plan: {result['plan']}",
+            f"Candidates: {result['candidates']}",
+            f"Matches: {len(result['matches'])}",
+            f"Planning time: {result['planning']:.3f} ms",
+            f"Execution time: {result['execution']:.3f} ms",
+            sep="\n",
+        )
+
+    @staticmethod
+    def help_explain() -> None:
+        """Prints the help info for the `explain` command."""
+        print(
+            "Runs a filter on a model, as the `where` command does, and "
+            "prints the index or scan used to find the candidates, with "
+            "timings.",
+            "Usage:",
+            "\tOption 1: explain <class name> <filter>",
+            "\tOption 2: <class name>.explain(<filter>)",
+            sep="\n",
+        )
+
+    def do_stats(self, line: str) -> None:
+        """Prints statistics on a numeric attribute of the instances of a
+        model, optionally filtered.
+
+        Args:
+            line (str): The command line argument received.
+        """
+        model_name, _, args = line.strip().partition(" ")
+        if not self.__is_valid_args(model_name, check_class=True):
+            return
+
+        attribute, _, query = args.strip().partition(" ")
+        attribute = attribute.rstrip(",")
+        if not attribute:
+            print("** attribute name missing **")
+            return
+
+        query = query.strip()
+        if query:
+            keyword, _, query = query.partition(" ")
+            if keyword != "where" or not query.strip():
+                print("** filter missing after where **")
+                return
+
+        try:
+            stats = storage.stats(model_name, attribute, query or None)
+        except ValueError as error:
+            print(f"** invalid filter: {error} **")
+            return
+
+        for name, value in stats.items():
+            print(f"{name}: {round(value, 6)}")
+
+    @staticmethod
+    def help_stats() -> None:
+        """Prints the help info for the `stats` command."""
+        print(
+            "Prints the count, min, max, mean, standard deviation, sum and "
+            "percentiles of a numeric attribute of a model's instances, "
+            "optionally of those matching a filter.",
+            "Usage:",
+            "\tOption 1: stats <class name> <attribute name> [where <filter>]",
+            "\tOption 2: "
+            "<class name>.stats(<attribute name>[ where <filter>])",
+            sep="\n",
+        )
+
+    def __run_filter(self, line: str) -> "dict | None":
+        """Runs the filter of the `where` and `explain` commands.
+
+        Args:
+            line (str): The command line argument received, i.e. the class
+            name and the filter.
+
+        Returns:
+            dict | None: The result of `storage.explain()`, or None if the
+            arguments are invalid.
+        """
+        model_name, _, query = line.strip().partition(" ")
+        if not self.__is_valid_args(model_name, check_class=True):
+            return None
+
+        if not query.strip():
+            print("** filter missing **")
+            return None
+
+        try:
+            return storage.explain(model_name, query)
+        except ValueError as error:
+            print(f"** invalid filter: {error} **")
+            return None
+
     @staticmethod
     def do_clear(_) -> None:
         """Clears the console screen."""
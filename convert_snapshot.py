@@ -0,0 +1,42 @@
+#!/usr/bin/python3
+
+"""Converts the JSON file of the file storage engine to a binary snapshot
+and back.
+
+Usage:
+    ./convert_snapshot.py to-binary <JSON file> <snapshot>
+    ./convert_snapshot.py to-json <snapshot> <JSON file>
+"""
+
+import sys
+from typing import List
+from standalone import import_engine
+
+# only the given files are read and written, not the storage
+binary_snapshot = import_engine("binary_snapshot")
+
+
+def main(argv: List[str]) -> int:
+    """Runs a converter from the command line.
+
+    Args:
+        argv (List[str]): The command line arguments.
+
+    Returns:
+        int: The exit status.
+    """
+    converters = {
+        "to-binary": binary_snapshot.json_to_binary,
+        "to-json": binary_snapshot.binary_to_json,
+    }
+
+    if len(argv) != 3 or argv[0] not in converters:
+        print(__doc__.rpartition("Usage:\n")[2].rstrip(), file=sys.stderr)
+        return 2
+
+    converters[argv[0]](argv[1], argv[2])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
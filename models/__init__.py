@@ -1,8 +1,35 @@
 #!/usr/bin/python3
 
-"""Creates a unique instance of the FileStorage model."""
+"""Creates a unique instance of the storage engine.
 
-from models.engine.file_storage import FileStorage
+The SQLite database engine is used when the `HBNB_TYPE_STORAGE` environment
+variable is set to `db`, otherwise objects are saved to a JSON file.
+"""
+
+from os import getenv
+
+if getenv("HBNB_TYPE_STORAGE") == "db":
+    from models.engine.db_storage import DBStorage
+
+    storage = DBStorage(getenv("HBNB_DB_PATH", "hbnb.db"))
+else:
+    from models.engine.file_storage import FileStorage
+
+    storage = FileStorage(
+        journal=getenv("HBNB_STORAGE_JOURNAL") == "1",
+        sharded=getenv("HBNB_STORAGE_SHARDED") == "1",
+        lazy=getenv("HBNB_STORAGE_LAZY") == "1",
+        binary=getenv("HBNB_STORAGE_BINARY") == "1",
+        codec=getenv("HBNB_STORAGE_CODEC", "json"),
+        write_behind=getenv("HBNB_STORAGE_WRITE_BEHIND") == "1",
+        flush_interval=float(getenv("HBNB_STORAGE_FLUSH_INTERVAL", "1.0")),
+        group_commit_window=float(getenv("HBNB_STORAGE_GROUP_COMMIT", "0")),
+        columnar=tuple(
+            name
+            for name in getenv("HBNB_STORAGE_COLUMNAR", "").split(",")
+            if name
+        ),
+        shared=getenv("HBNB_STORAGE_SHARED") == "1",
+    )
 
-storage = FileStorage()
 storage.reload()
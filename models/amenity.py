@@ -2,6 +2,7 @@
 
 """This module defines the Amenity model."""
 
+import models
 from models.base_model import BaseModel
 
 
@@ -9,3 +10,8 @@ class Amenity(BaseModel):
     """Defines the Amenity model."""
 
     name = ""
+
+    @property
+    def places(self) -> list:
+        """Returns the places having the amenity."""
+        return models.storage.related(self, "Place")
@@ -3,13 +3,44 @@
 """A module that defines the Base Model"""
 
 from datetime import datetime
-from typing import Any
+from functools import lru_cache
+from operator import attrgetter
+from typing import Any, Callable
 from uuid import uuid4
 import models
 
 
 class BaseModel:
-    """Defines the Base Model."""
+    """Defines the Base Model.
+
+    Attributes:
+        _indexes (tuple): The names of the attributes the storage keeps a hash
+        index of, so that instances are found by their value without a scan.
+
+        _references (dict): The names of the attributes holding the id of an
+        instance of another model, or a list of ids, mapped to the name of
+        that model. They are hash indexed too, so the instances referencing
+        another one are found without a scan, and they are followed by the
+        navigation properties and the cascading deletes of the storage.
+
+        _range_indexes (tuple): The names of the numeric attributes the
+        storage keeps sorted, so that instances are found by a range of
+        values without a scan.
+
+        _location_index (tuple): The names of the latitude and longitude
+        attributes the storage keeps in a spatial index, if any, so that
+        instances are found by their distance to a point without a scan.
+
+        _text_indexes (tuple): The names of the text attributes the storage
+        keeps an inverted index of, so that instances are found by the words
+        they contain without a scan.
+    """
+
+    _indexes = ()
+    _references = {}
+    _range_indexes = ()
+    _location_index = ()
+    _text_indexes = ()
 
     def __init__(self, *args, **kwargs) -> None:
         """Initializes the Base Model."""
@@ -37,19 +68,43 @@ class BaseModel:
         """
         return f"[{self.__class__.__name__}] ({self.id}) {self.__dict__}"
 
+    @classmethod
+    def formatter(cls, fields: tuple) -> Callable[["BaseModel"], str]:
+        """Returns a function formatting instances like `__str__()`, with
+        only some of their attributes.
+
+        The format string and the attribute getter are built once per model
+        and fields, then reused, so formatting an instance only reads the
+        requested attributes instead of taking the repr of its `__dict__`.
+
+        Args:
+            fields (tuple): The names of the attributes, in order. Class
+            attributes are included, and instances missing an attribute are
+            formatted without it.
+
+        Returns:
+            Callable[[BaseModel], str]: The formatter.
+        """
+        return _formatter(cls, tuple(dict.fromkeys(fields)))
+
     def __setattr__(self, __name: str, __value: Any) -> None:
         """Handles the setting of attributes.
 
         This method updates the `updated_at` attribute whenever a new attribute
-        is added to the instance.
+        is added to the instance, then marks the instance as changed in the
+        storage so it gets written on the next save and its indexes are kept
+        up to date, and its subscribers are told. The open snapshots of the
+        storage keep the state the instance had first.
 
         Args:
             __name (str): The name of the attribute.
             __value (Any): The value for the attribute.
         """
         if __name != "update_at":
+            models.storage.preserve(self)
             self.__dict__["updated_at"] = datetime.now()
             self.__dict__[__name] = __value
+            models.storage.mark_dirty(self, __name)
 
     def save(self) -> None:
         """Save the instance and updates the `updated_at`"""
@@ -78,3 +133,31 @@ class BaseModel:
         obj_dict["created_at"] = self.created_at.isoformat()
 
         return obj_dict
+
+
+@lru_cache(maxsize=256)
+def _formatter(cls: type, fields: tuple) -> Callable[[BaseModel], str]:
+    """Builds the formatter of `BaseModel.formatter()`."""
+    items = ", ".join(f"{field!r}: {{!r}}" for field in fields)
+    template = f"[{cls.__name__}] ({{}}) {{{{{items}}}}}"
+    get = attrgetter(*fields) if fields else lambda _: ()
+    single = len(fields) == 1
+
+    def format_instance(obj: BaseModel) -> str:
+        """Formats an instance with the attributes of the formatter."""
+        try:
+            values = get(obj)
+        except AttributeError:
+            present = {
+                field: getattr(obj, field)
+                for field in fields
+                if hasattr(obj, field)
+            }
+            return f"[{cls.__name__}] ({obj.id}) {present}"
+
+        if single:
+            return template.format(obj.id, values)
+
+        return template.format(obj.id, *values)
+
+    return format_instance
@@ -2,11 +2,24 @@
 
 """This module defines the City model."""
 
+import models
 from models.base_model import BaseModel
 
 
 class City(BaseModel):
     """Defines the City model."""
 
+    _references = {"state_id": "State"}
+
     state_id = ""
     name = ""
+
+    @property
+    def state(self) -> "BaseModel | None":
+        """Returns the state of the city, if it exists."""
+        return models.storage.get("State", self.state_id)
+
+    @property
+    def places(self) -> list:
+        """Returns the places in the city."""
+        return models.storage.related(self, "Place")
@@ -0,0 +1,385 @@
+#!/usr/bin/python3
+
+"""This module defines a binary snapshot format for the objects of the file
+storage engine, along with converters from and to the JSON file.
+
+Objects are grouped by shape, i.e. their model and the names and types of
+their attributes, so every object of a shape is a fixed-width row that is
+decoded in a single `struct` call. An object id that is a UUID takes 16
+bytes, naive `created_at` and `updated_at` dates are microseconds since the
+epoch, and every string is an index into a string table shared by the whole
+file. The layout of a snapshot is:
+
+    header        magic, version, offset of the string table and of the
+                  shape table
+    rows          the rows of every shape, one shape after the other
+    string table  the number of strings, their lengths and their text
+    shape table   the number of shapes, then the model, number of rows,
+                  offset of the rows and attribute names and types of
+                  every shape
+"""
+
+import json
+import mmap
+import struct
+from uuid import UUID
+from datetime import datetime, timedelta
+from functools import partial
+from itertools import accumulate, repeat
+from operator import itemgetter
+from typing import Iterable, Iterator, List
+from models.engine.json_stream import iter_members
+
+MAGIC = b"HBNB"
+VERSION = 1
+
+HEADER = struct.Struct("<4sHxxQQ")
+SHAPE = struct.Struct("<IIQH")
+COUNT = struct.Struct("<I")
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+DECODER = json.JSONDecoder()
+
+# the attribute types, with the `struct` format of their values
+NONE = "x"
+BOOL = "?"
+INT = "q"
+FLOAT = "d"
+STRING = "I"
+UUID_ID = "u"
+TIMESTAMP = "t"
+ISO_DATETIME = "i"
+OTHER = "j"
+
+FORMATS = {
+    NONE: "B",
+    BOOL: "?",
+    INT: "q",
+    FLOAT: "d",
+    STRING: "I",
+    # the 16 bytes of a UUID, split like the groups of its canonical form
+    UUID_ID: "4s2s2s2s6s",
+    TIMESTAMP: "q",
+    ISO_DATETIME: "I",
+    OTHER: "I",
+}
+
+
+def _is_uuid(value: str) -> bool:
+    """Checks whether a string is a UUID in its canonical form."""
+    if len(value) != 36:
+        return False
+
+    try:
+        return str(UUID(value)) == value
+    except ValueError:
+        return False
+
+
+def _encode_value(name: str, value, intern: callable) -> tuple:
+    """Returns the type of an attribute and the value to pack.
+
+    Args:
+        name (str): The name of the attribute.
+        value (Any): The value of the attribute.
+        intern (callable): Returns the index of a string in the string table.
+
+    Returns:
+        tuple: The type of the attribute, followed by the values to pack.
+    """
+    if value is None:
+        return NONE, 0
+
+    if isinstance(value, bool):
+        return BOOL, value
+
+    if isinstance(value, int) and -(2**63) <= value < 2**63:
+        return INT, value
+
+    if isinstance(value, float):
+        return FLOAT, value
+
+    if isinstance(value, str):
+        if name == "id" and _is_uuid(value):
+            raw = UUID(value).bytes
+            return UUID_ID, raw[:4], raw[4:6], raw[6:8], raw[8:10], raw[10:]
+        return STRING, intern(value)
+
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            return TIMESTAMP, (value - EPOCH) // MICROSECOND
+        return ISO_DATETIME, intern(value.isoformat())
+
+    return OTHER, intern(json.dumps(value))
+
+
+def dump(records: Iterable[tuple], file_path: str) -> None:
+    """Writes objects to a binary snapshot.
+
+    Args:
+        records (Iterable[tuple]): The `(model name, attributes)` of every
+        object, where the attributes are the `__dict__` of the object.
+
+        file_path (str): The path to the snapshot.
+
+    Raises:
+        TypeError: If an attribute can't be serialized to JSON.
+    """
+    strings = {}
+
+    def intern(text: str) -> int:
+        """Returns the index of a string, adding it to the table if new."""
+        index = strings.get(text)
+        if index is None:
+            index = strings[text] = len(strings)
+        return index
+
+    shapes = {}
+
+    for model_name, attributes in records:
+        types = []
+        values = []
+
+        for name, value in attributes.items():
+            value_type, *packed = _encode_value(name, value, intern)
+            types.append(value_type)
+            values.extend(packed)
+
+        shape = (model_name, tuple(attributes), "".join(types))
+        if shape not in shapes:
+            # the shape table refers to its names through the string table
+            shapes[shape] = []
+            intern(model_name)
+            for name in attributes:
+                intern(name)
+
+        shapes[shape].append(values)
+
+    with open(file_path, "wb") as snapshot:
+        snapshot.write(bytes(HEADER.size))
+
+        offsets = []
+        for (_, _, types), rows in shapes.items():
+            offsets.append(snapshot.tell())
+
+            row = struct.Struct(
+                "<" + "".join(FORMATS[value_type] for value_type in types)
+            )
+            snapshot.write(b"".join(row.pack(*values) for values in rows))
+
+        strings_offset = snapshot.tell()
+        text = list(strings)
+        snapshot.write(COUNT.pack(len(text)))
+        snapshot.write(struct.pack(f"<{len(text)}I", *map(len, text)))
+        snapshot.write("".join(text).encode("utf-8"))
+
+        shapes_offset = snapshot.tell()
+        snapshot.write(COUNT.pack(len(shapes)))
+        for offset, ((model_name, names, types), rows) in zip(
+            offsets, shapes.items()
+        ):
+            snapshot.write(
+                SHAPE.pack(strings[model_name], len(rows), offset, len(names))
+            )
+            snapshot.write(
+                struct.pack(
+                    f"<{len(names)}I", *[strings[name] for name in names]
+                )
+            )
+            snapshot.write(types.encode("ascii"))
+
+        snapshot.seek(0)
+        snapshot.write(
+            HEADER.pack(MAGIC, VERSION, strings_offset, shapes_offset)
+        )
+
+
+def load(file_path: str) -> Iterator[tuple]:
+    """Reads the objects of a binary snapshot through a memory map.
+
+    Args:
+        file_path (str): The path to the snapshot.
+
+    Yields:
+        tuple: The `(model name, attribute names, rows)` of every shape, where
+        `rows` iterates over the attribute values of every object. The rows
+        must be consumed before moving on to the next shape.
+
+    Raises:
+        ValueError: If the file is not a binary snapshot.
+    """
+    with open(file_path, "rb") as snapshot:
+        if not snapshot.read(HEADER.size):
+            return
+
+        with mmap.mmap(
+            snapshot.fileno(), 0, access=mmap.ACCESS_READ
+        ) as data:
+            yield from _read(data)
+
+
+def _read(data: mmap.mmap) -> Iterator[tuple]:
+    """Decodes the objects of a memory mapped binary snapshot."""
+    if len(data) < HEADER.size:
+        raise ValueError("not a binary snapshot")
+
+    magic, version, strings_offset, shapes_offset = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not a binary snapshot")
+
+    # the strings are decoded at once, then sliced by their lengths
+    (count,) = COUNT.unpack_from(data, strings_offset)
+    lengths = struct.unpack_from(f"<{count}I", data, strings_offset + 4)
+    start = strings_offset + 4 + 4 * count
+    text = str(data[start:shapes_offset], "utf-8")
+    ends = list(accumulate(lengths))
+    strings = list(
+        map(text.__getitem__, map(slice, [0] + ends[:-1], ends))
+    )
+
+    (count,) = COUNT.unpack_from(data, shapes_offset)
+    position = shapes_offset + 4
+
+    for _ in range(count):
+        model_index, rows, offset, width = SHAPE.unpack_from(data, position)
+        position += SHAPE.size
+
+        names = tuple(
+            strings[index]
+            for index in struct.unpack_from(f"<{width}I", data, position)
+        )
+        position += 4 * width
+
+        types = str(data[position:position + width], "ascii")
+        position += width
+
+        if not width:
+            yield strings[model_index], names, repeat((), rows)
+            continue
+
+        row = struct.Struct(
+            "<" + "".join(FORMATS[value_type] for value_type in types)
+        )
+        columns = iter(
+            zip(*row.iter_unpack(data[offset:offset + rows * row.size]))
+        )
+
+        yield strings[model_index], names, zip(
+            *[
+                _decode_column(value_type, columns, strings, rows)
+                for value_type in types
+            ]
+        )
+
+
+def _decode_column(
+    value_type: str, columns: Iterator, strings: List[str], rows: int
+) -> Iterable:
+    """Decodes the values of an attribute for every row of a shape.
+
+    The values are converted with `map` so that no Python code runs for
+    every value.
+
+    Args:
+        value_type (str): The type of the attribute.
+
+        columns (Iterator): The unpacked columns of the shape, from which the
+        columns of the attribute are taken.
+
+        strings (List[str]): The string table.
+        rows (int): The number of rows of the shape.
+
+    Returns:
+        Iterable: The values of the attribute.
+    """
+    if value_type == NONE:
+        next(columns)
+        return repeat(None, rows)
+
+    if value_type == STRING:
+        return map(strings.__getitem__, next(columns))
+
+    if value_type == UUID_ID:
+        groups = [map(bytes.hex, next(columns)) for _ in range(5)]
+        return map("-".join, zip(*groups))
+
+    if value_type == TIMESTAMP:
+        return map(EPOCH.__add__, map(MICROSECOND.__mul__, next(columns)))
+
+    if value_type == ISO_DATETIME:
+        return map(
+            datetime.fromisoformat, map(strings.__getitem__, next(columns))
+        )
+
+    if value_type == OTHER:
+        # the scanner of the decoder parses a value without any Python code
+        decoded = map(
+            DECODER.scan_once,
+            map(strings.__getitem__, next(columns)),
+            repeat(0),
+        )
+        return map(itemgetter(0), decoded)
+
+    return next(columns)
+
+
+def _from_json_dict(json_dict: dict) -> tuple:
+    """Returns the `(model name, attributes)` of a saved dictionary."""
+    attributes = dict(json_dict)
+    model_name = attributes.pop("__class__")
+
+    # the same conversion done when building a model from a dictionary
+    for key in ("created_at", "updated_at"):
+        if key in attributes:
+            attributes[key] = datetime.fromisoformat(attributes[key])
+
+    return model_name, attributes
+
+
+def _to_json_dict(model_name: str, attributes: dict) -> dict:
+    """Returns the dictionary representation of an object, as `to_dict`."""
+    json_dict = dict(attributes)
+    json_dict["__class__"] = model_name
+
+    for key in ("updated_at", "created_at"):
+        if key in json_dict:
+            json_dict[key] = json_dict[key].isoformat()
+
+    return json_dict
+
+
+def json_to_binary(json_path: str, binary_path: str) -> None:
+    """Converts the JSON file of the file storage to a binary snapshot.
+
+    Args:
+        json_path (str): The path to the JSON file.
+        binary_path (str): The path to the snapshot to write.
+    """
+    with open(json_path, "r", encoding="utf-8", newline="") as json_file:
+        dump(
+            (
+                _from_json_dict(json_dict)
+                for _, json_dict, _, _ in iter_members(json_file)
+            ),
+            binary_path,
+        )
+
+
+def binary_to_json(binary_path: str, json_path: str) -> None:
+    """Converts a binary snapshot to the JSON file of the file storage.
+
+    Args:
+        binary_path (str): The path to the snapshot.
+        json_path (str): The path to the JSON file to write.
+    """
+    objects = {
+        f"{model_name}.{attributes['id']}": _to_json_dict(
+            model_name, attributes
+        )
+        for model_name, names, rows in load(binary_path)
+        for attributes in map(dict, map(partial(zip, names), rows))
+    }
+
+    with open(json_path, "w", encoding="utf-8") as json_file:
+        json.dump(objects, json_file, indent=4)
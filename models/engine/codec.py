@@ -0,0 +1,278 @@
+#!/usr/bin/python3
+
+"""This module defines the codecs used by the file storage engine to
+serialize the dictionary representation of the objects.
+
+The `json` codec writes the indented JSON file the storage has always used,
+the other codecs trade readability for speed and size. `orjson` and
+`msgpack` are used when they are installed, but they aren't required.
+"""
+
+import json
+import pickle
+import marshal
+from typing import Any, BinaryIO, Dict, Iterator, List
+from models.engine.json_stream import iter_members
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def _dumps(value: Any) -> bytes:
+    """Serializes a value to compact JSON, with `orjson` if installed.
+
+    `orjson` saves NaN and infinite floats as `null` and rejects integers
+    wider than 64 bits.
+    """
+    if orjson is not None:
+        return orjson.dumps(value)
+
+    return json.dumps(
+        value, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def _loads(data: bytes) -> Any:
+    """Deserializes compact JSON, with `orjson` if installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+
+    return json.loads(data)
+
+
+class Codec:
+    """Defines a codec, which serializes the objects of the storage.
+
+    Attributes:
+        name (str): The name the codec is selected with.
+        extension (str): The extension of the files written by the codec.
+        binary (bool): Whether the codec reads and writes bytes or text.
+    """
+
+    name = ""
+    extension = ""
+    binary = True
+
+    def encode(self, objects: Dict[str, dict]) -> Any:
+        """Serializes objects.
+
+        Args:
+            objects (Dict[str, dict]): The dictionary representation of the
+            objects, by `<class name>.<id>` key.
+
+        Returns:
+            Any: The content of the file, as bytes or text.
+        """
+        raise NotImplementedError
+
+    def decode(self, file: Any) -> Iterator[tuple]:
+        """Deserializes the objects saved in a file.
+
+        Args:
+            file (Any): The file, opened in binary or text mode.
+
+        Yields:
+            tuple: The key and dictionary representation of every object.
+        """
+        raise NotImplementedError
+
+
+class FragmentCodec(Codec):
+    """Defines a codec that serializes every object on its own.
+
+    The storage engine caches the fragment of every object, so only the
+    objects changed since the last save are serialized again.
+    """
+
+    def encode_member(self, key: str, json_dict: dict) -> Any:
+        """Serializes one object.
+
+        Args:
+            key (str): The `<class name>.<id>` key of the object.
+            json_dict (dict): The dictionary representation of the object.
+
+        Returns:
+            Any: The fragment of the object, as bytes or text.
+        """
+        raise NotImplementedError
+
+    def join(self, fragments: List[Any]) -> Any:
+        """Joins the fragments of every object into the content of a file.
+
+        Args:
+            fragments (List[Any]): The fragments of the objects.
+
+        Returns:
+            Any: The content of the file, as bytes or text.
+        """
+        raise NotImplementedError
+
+    def encode(self, objects: Dict[str, dict]) -> Any:
+        """Serializes objects one at a time, then joins them."""
+        return self.join(
+            [self.encode_member(key, obj) for key, obj in objects.items()]
+        )
+
+
+class JSONCodec(FragmentCodec):
+    """Defines the default codec, a JSON object indented by 4 spaces."""
+
+    name = "json"
+    extension = ".json"
+    binary = False
+
+    def encode_member(self, key: str, json_dict: dict) -> str:
+        """Serializes one object the way `json.dump` lays it out."""
+        # strip the braces and newlines surrounding the single member
+        return json.dumps({key: json_dict}, indent=4)[2:-2]
+
+    def join(self, fragments: List[str]) -> str:
+        """Wraps the members in the braces of the JSON object."""
+        if not fragments:
+            return "{}"
+
+        return "{\n" + ",\n".join(fragments) + "\n}"
+
+    def decode(self, file: Any) -> Iterator[tuple]:
+        """Reads the members of the JSON object as a stream."""
+        for key, json_dict, _, _ in iter_members(file):
+            yield key, json_dict
+
+
+class CompactJSONCodec(FragmentCodec):
+    """Defines a codec writing a JSON object without any whitespace."""
+
+    name = "json-compact"
+    extension = ".json"
+
+    def encode_member(self, key: str, json_dict: dict) -> bytes:
+        """Serializes one object as a member of the JSON object."""
+        return _dumps(key) + b":" + _dumps(json_dict)
+
+    def join(self, fragments: List[bytes]) -> bytes:
+        """Wraps the members in the braces of the JSON object."""
+        return b"{" + b",".join(fragments) + b"}"
+
+    def decode(self, file: BinaryIO) -> Iterator[tuple]:
+        """Reads the JSON object at once."""
+        yield from _loads(file.read()).items()
+
+
+class JSONLinesCodec(FragmentCodec):
+    """Defines a codec writing every object as JSON on its own line.
+
+    The key of an object isn't saved, as it is made of the `__class__` and
+    `id` of the object.
+    """
+
+    name = "jsonl"
+    extension = ".jsonl"
+
+    def encode_member(self, key: str, json_dict: dict) -> bytes:
+        """Serializes one object on its own line."""
+        return _dumps(json_dict) + b"\n"
+
+    def join(self, fragments: List[bytes]) -> bytes:
+        """Concatenates the lines."""
+        return b"".join(fragments)
+
+    def decode(self, file: BinaryIO) -> Iterator[tuple]:
+        """Reads the objects one line at a time."""
+        for line in file:
+            if line.strip():
+                json_dict = _loads(line)
+                class_id = f"{json_dict['__class__']}.{json_dict['id']}"
+
+                yield class_id, json_dict
+
+
+class PickleCodec(Codec):
+    """Defines a codec writing the objects with `pickle` protocol 5."""
+
+    name = "pickle"
+    extension = ".pickle"
+
+    def encode(self, objects: Dict[str, dict]) -> bytes:
+        """Pickles the objects."""
+        return pickle.dumps(objects, protocol=5)
+
+    def decode(self, file: BinaryIO) -> Iterator[tuple]:
+        """Unpickles the objects."""
+        yield from pickle.load(file).items()
+
+
+class MarshalCodec(Codec):
+    """Defines a codec writing the objects with `marshal`.
+
+    The format of `marshal` may change between Python versions, so the file
+    should only be read by the version that wrote it.
+    """
+
+    name = "marshal"
+    extension = ".marshal"
+
+    def encode(self, objects: Dict[str, dict]) -> bytes:
+        """Marshals the objects."""
+        return marshal.dumps(objects)
+
+    def decode(self, file: BinaryIO) -> Iterator[tuple]:
+        """Unmarshals the objects."""
+        # `marshal.load` reads a file in many small calls, so read it first
+        yield from marshal.loads(file.read()).items()
+
+
+class MessagePackCodec(Codec):
+    """Defines a codec writing the objects with `msgpack`."""
+
+    name = "msgpack"
+    extension = ".msgpack"
+
+    def encode(self, objects: Dict[str, dict]) -> bytes:
+        """Packs the objects."""
+        return msgpack.packb(objects, use_bin_type=True)
+
+    def decode(self, file: BinaryIO) -> Iterator[tuple]:
+        """Unpacks the objects."""
+        yield from msgpack.unpackb(file.read(), raw=False).items()
+
+
+CODECS = {
+    codec.name: codec
+    for codec in (
+        JSONCodec(),
+        CompactJSONCodec(),
+        JSONLinesCodec(),
+        PickleCodec(),
+        MarshalCodec(),
+    )
+}
+
+if msgpack is not None:
+    CODECS[MessagePackCodec.name] = MessagePackCodec()
+
+
+def get_codec(name: str) -> Codec:
+    """Returns a codec by its name.
+
+    Args:
+        name (str): The name of the codec.
+
+    Returns:
+        Codec: The codec.
+
+    Raises:
+        ValueError: If there is no codec with that name.
+    """
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValueError(
+            f"unknown codec {name!r}, expected one of: {', '.join(CODECS)}"
+        ) from None
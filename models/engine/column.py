@@ -0,0 +1,120 @@
+#!/usr/bin/python3
+
+"""This module defines the numeric columns the storage engines build from
+an attribute of the objects of a model, to compute statistics on them.
+
+A column holds the values in a contiguous, sorted `array('d')` of C doubles,
+so once it is built, its statistics are computed by builtins and `map()`
+over `operator` functions, which loop in C rather than walking Python
+objects. The storage engines cache the columns until the objects of their
+model change.
+"""
+
+from array import array
+from itertools import repeat
+from math import fsum, sqrt
+from operator import mul, sub
+from typing import Any, Dict, Iterable
+from models.engine.range_index import is_number
+
+PERCENTILES = (25, 50, 75, 90, 99)
+
+
+class NumericColumn:
+    """Defines a sorted column of the numeric values of an attribute.
+
+    Values that aren't numbers (see `is_number()`) are left out.
+
+    Attributes:
+        values (array): The values, sorted, as doubles.
+    """
+
+    def __init__(self, values: Iterable[Any]) -> None:
+        """Builds a column.
+
+        Args:
+            values (Iterable[Any]): The values of the attribute.
+        """
+        self.values = array("d", sorted(v for v in values if is_number(v)))
+        self.__summary = None
+
+    @classmethod
+    def from_numbers(cls, numbers: Iterable[float]) -> "NumericColumn":
+        """Builds a column from values already known to be numbers, e.g. a
+        column of a columnar projection, without checking them.
+
+        Args:
+            numbers (Iterable[float]): The values.
+
+        Returns:
+            NumericColumn: The column.
+        """
+        column = cls(())
+        column.values = array("d", sorted(numbers))
+
+        return column
+
+    def __len__(self) -> int:
+        """Returns the number of values in the column."""
+        return len(self.values)
+
+    def percentile(self, percent: float) -> float:
+        """Returns a percentile of the values, interpolating linearly between
+        the closest two values.
+
+        Args:
+            percent (float): The percentile, between 0 and 100.
+
+        Returns:
+            float: The percentile.
+
+        Raises:
+            ValueError: If the column is empty.
+        """
+        values = self.values
+        if not values:
+            raise ValueError("percentile of an empty column")
+
+        position = (len(values) - 1) * percent / 100
+        lower = int(position)
+        upper = min(lower + 1, len(values) - 1)
+
+        return values[lower] + (values[upper] - values[lower]) * (
+            position - lower
+        )
+
+    def summary(self) -> Dict[str, float]:
+        """Returns the statistics of the column.
+
+        The statistics are computed once, then returned from a cache.
+
+        Returns:
+            Dict[str, float]: The `count`, then for a column that isn't empty,
+            the `min`, `max`, `mean`, population standard deviation `stddev`,
+            `sum` and the percentiles in `PERCENTILES`, e.g. `p50`.
+        """
+        if self.__summary is not None:
+            return dict(self.__summary)
+
+        values = self.values
+        stats = {"count": len(values)}
+        if not values:
+            return stats
+
+        total = fsum(values)
+        mean = total / len(values)
+        deviations = array("d", map(sub, values, repeat(mean)))
+
+        stats["min"] = values[0]
+        stats["max"] = values[-1]
+        stats["mean"] = mean
+        stats["stddev"] = sqrt(
+            fsum(map(mul, deviations, deviations)) / len(values)
+        )
+        stats["sum"] = total
+
+        for percent in PERCENTILES:
+            stats[f"p{percent}"] = self.percentile(percent)
+
+        self.__summary = stats
+        return dict(stats)
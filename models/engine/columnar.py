@@ -0,0 +1,337 @@
+#!/usr/bin/python3
+
+"""This module defines the columnar projection the storage engines can keep
+of the objects of a model, for analytics.
+
+Every attribute a model declares with a number or a string as class default
+gets a column, as do `created_at` and `updated_at`:
+
+- integers are kept in an `array('q')` and floats in an `array('d')`;
+- strings are dictionary-encoded: the column is an `array('l')` of codes
+  into a list of the distinct strings the rows hold;
+- timestamps are kept in an `array('q')` of microseconds since 1970-01-01.
+
+Row `i` of every column holds an attribute of the object whose key is
+`keys[i]`. A value that doesn't fit the type of its column (e.g. a string in
+a numeric column) is null in the column, which a `bytearray` of validity
+flags records. Removed rows are replaced by the last row, so the columns
+stay contiguous.
+
+Comparisons and aggregations run over the columns with `map()`,
+`compress()` and set operations, which loop in C rather than walking the
+`__dict__` of every object.
+"""
+
+from array import array
+from datetime import datetime, timedelta
+from itertools import compress, repeat
+from operator import and_, eq, ge, gt, le, lt, ne, not_
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+from models.engine.range_index import is_number
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+TIMESTAMPS = ("created_at", "updated_at")
+
+COMPARE = {"==": eq, "!=": ne, "<": lt, "<=": le, ">": gt, ">=": ge}
+
+
+class _Column:
+    """Defines a column of values of one type, with validity flags."""
+
+    def __init__(self, kind: str) -> None:
+        """Initializes an empty column.
+
+        Args:
+            kind (str): `int`, `float`, `str` or `timestamp`.
+        """
+        self.kind = kind
+        self.values = array({"str": "l", "float": "d"}.get(kind, "q"))
+        self.valid = bytearray()
+
+        # the strings of a dictionary-encoded column, their codes and the
+        # number of rows holding them: a string no row holds any longer is
+        # dropped, and its code reused
+        self.strings = []
+        self.codes = {}
+        self.counts = []
+        self.free = []
+
+    def encode(self, value: Any) -> Any:
+        """Returns the value to store for an attribute, or None for null."""
+        kind = self.kind
+
+        if kind == "int":
+            if isinstance(value, int) and not isinstance(value, bool):
+                if -(2**63) <= value < 2**63:
+                    return value
+            return None
+
+        if kind == "float":
+            # integers beyond 2**53 would be rounded, and compare differently
+            if isinstance(value, float) and is_number(value):
+                return value
+            if is_number(value) and abs(value) <= 2**53:
+                return float(value)
+            return None
+
+        if kind == "timestamp":
+            if isinstance(value, datetime) and value.tzinfo is None:
+                return (value - EPOCH) // MICROSECOND
+            return None
+
+        if not isinstance(value, str):
+            return None
+
+        code = self.codes.get(value)
+        if code is None:
+            if self.free:
+                code = self.free.pop()
+                self.strings[code] = value
+            else:
+                code = len(self.strings)
+                self.strings.append(value)
+                self.counts.append(0)
+
+            self.codes[value] = code
+
+        return code
+
+    def decode(self, row: int) -> Any:
+        """Returns the value of a row, or None for null."""
+        if not self.valid[row]:
+            return None
+
+        value = self.values[row]
+        if self.kind == "str":
+            return self.strings[value]
+        if self.kind == "timestamp":
+            return EPOCH + value * MICROSECOND
+
+        return value
+
+    def set(self, row: int, value: Any) -> None:
+        """Sets the value of a row, appending it if it is the next row."""
+        encoded = self.encode(value)
+        if self.kind == "str" and encoded is not None:
+            self.counts[encoded] += 1
+
+        if row == len(self.values):
+            self.values.append(0 if encoded is None else encoded)
+            self.valid.append(encoded is not None)
+        else:
+            self.__release(row)
+            self.values[row] = 0 if encoded is None else encoded
+            self.valid[row] = encoded is not None
+
+    def move_last(self, row: int) -> None:
+        """Moves the last row over a row, then drops the last row."""
+        self.__release(row)
+        self.values[row] = self.values[-1]
+        self.valid[row] = self.valid[-1]
+        self.values.pop()
+        self.valid.pop()
+
+    def __release(self, row: int) -> None:
+        """Drops the string of a row from the dictionary if no other row
+        holds it."""
+        if self.kind != "str" or not self.valid[row]:
+            return
+
+        code = self.values[row]
+        self.counts[code] -= 1
+        if not self.counts[code]:
+            del self.codes[self.strings[code]]
+            self.strings[code] = None
+            self.free.append(code)
+
+    def compare(
+        self, compare: Callable[[Any, Any], bool], literal: Any
+    ) -> Optional[Set[int]]:
+        """Returns the rows whose value compares true to a literal.
+
+        Args:
+            compare (Callable[[Any, Any], bool]): The comparison, e.g. `le`.
+            literal (Any): The literal.
+
+        Returns:
+            Optional[Set[int]]: The rows, nulls excluded, or None if the
+            literal can't be compared in the column, e.g. a string with the
+            values of a numeric column.
+        """
+        rows = range(len(self.values))
+
+        if self.kind == "str":
+            if not isinstance(literal, str):
+                return None
+
+            codes = {
+                code
+                for string, code in self.codes.items()
+                if compare(string, literal)
+            }
+            matches = map(codes.__contains__, self.values)
+        elif self.kind == "timestamp" or not is_number(literal):
+            return None
+        else:
+            matches = map(compare, self.values, repeat(literal))
+
+        if 0 in self.valid:
+            matches = map(and_, matches, self.valid)
+
+        return set(compress(rows, matches))
+
+    def nulls(self) -> Set[int]:
+        """Returns the rows whose value is null."""
+        if 0 not in self.valid:
+            return set()
+
+        return set(compress(range(len(self.valid)), map(not_, self.valid)))
+
+
+class ColumnarProjection:
+    """Defines the columns of the attributes of the objects of a model.
+
+    Attributes:
+        model (type): The model.
+        keys (List[str]): The key of the object of every row.
+        rows (Dict[str, int]): The row of every key.
+        columns (Dict[str, _Column]): The columns, by attribute name.
+    """
+
+    def __init__(self, model: type) -> None:
+        """Initializes an empty projection of a model.
+
+        Args:
+            model (type): The model.
+        """
+        self.model = model
+        self.keys = []
+        self.rows = {}
+        self.columns = {}
+
+        for cls in reversed(model.__mro__):
+            for name, default in vars(cls).items():
+                if name.startswith("_") or isinstance(default, bool):
+                    continue
+
+                if isinstance(default, int):
+                    self.columns[name] = _Column("int")
+                elif isinstance(default, float):
+                    self.columns[name] = _Column("float")
+                elif isinstance(default, str):
+                    self.columns[name] = _Column("str")
+
+        for name in TIMESTAMPS:
+            self.columns[name] = _Column("timestamp")
+
+    def __len__(self) -> int:
+        """Returns the number of rows."""
+        return len(self.keys)
+
+    def add(self, key: str, obj: Any) -> None:
+        """Adds the attributes of an object, or updates its row.
+
+        Args:
+            key (str): The key of the object.
+            obj (Any): The object.
+        """
+        row = self.rows.get(key)
+        if row is None:
+            row = self.rows[key] = len(self.keys)
+            self.keys.append(key)
+
+        for name, column in self.columns.items():
+            column.set(row, getattr(obj, name, None))
+
+    def remove(self, key: str) -> None:
+        """Removes the row of an object, if it is in the projection.
+
+        Args:
+            key (str): The key of the object.
+        """
+        row = self.rows.pop(key, None)
+        if row is None:
+            return
+
+        last = self.keys.pop()
+        if last != key:
+            self.keys[row] = last
+            self.rows[last] = row
+
+        for column in self.columns.values():
+            column.move_last(row)
+
+    def row(self, key: str) -> Dict[str, Any]:
+        """Returns the values of the row of an object.
+
+        Args:
+            key (str): The key of the object.
+
+        Returns:
+            Dict[str, Any]: The values by attribute name, None for nulls.
+        """
+        row = self.rows[key]
+
+        return {
+            name: column.decode(row) for name, column in self.columns.items()
+        }
+
+    def numbers(
+        self, attribute: str, rows: Set[int] = None
+    ) -> Optional[array]:
+        """Returns the values of a numeric column, nulls left out.
+
+        Args:
+            attribute (str): The name of the attribute.
+
+            rows (Set[int], optional): The rows to include. Defaults to None,
+            meaning all of them.
+
+        Returns:
+            Optional[array]: The values, in row order, or None if the
+            attribute has no integer or float column.
+        """
+        column = self.columns.get(attribute)
+        if column is None or column.kind not in ("int", "float"):
+            return None
+
+        selected = column.valid
+        if rows is not None:
+            selected = map(
+                and_, selected, map(rows.__contains__, range(len(self.keys)))
+            )
+
+        return array(column.values.typecode, compress(column.values, selected))
+
+    def compare(
+        self, attribute: str, operator: str, literal: Any
+    ) -> Optional[Tuple[Set[int], Set[int]]]:
+        """Compares a column to a literal.
+
+        Rows whose value is null, and every row when the literal can't be
+        compared to the values of the column (e.g. a string with numbers),
+        are undecided: only the objects themselves tell whether they match.
+
+        Args:
+            attribute (str): The name of the attribute.
+            operator (str): The comparison operator, e.g. `<=`.
+            literal (Any): The literal.
+
+        Returns:
+            Optional[Tuple[Set[int], Set[int]]]: The rows that match and the
+            undecided rows, or None if the attribute has no column.
+        """
+        column = self.columns.get(attribute)
+        if column is None:
+            return None
+
+        matches = column.compare(COMPARE[operator], literal)
+        if matches is None:
+            return set(), self.every()
+
+        return matches, column.nulls()
+
+    def every(self) -> Set[int]:
+        """Returns every row."""
+        return set(range(len(self.keys)))
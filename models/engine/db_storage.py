@@ -0,0 +1,175 @@
+#!/usr/bin/python3
+
+"""
+This module defines the DB Storage class that saves instances to a SQLite
+database and loads them back.
+"""
+
+import json
+import sqlite3
+import threading
+from models.base_model import BaseModel
+from models.user import User
+from models.amenity import Amenity
+from models.city import City
+from models.place import Place
+from models.state import State
+from models.review import Review
+from models.engine.file_storage import FileStorage
+
+
+class DBStorage(FileStorage):
+    """Defines the database storage model.
+
+    Every model has its own table. The `id`, `created_at` and `updated_at`
+    attributes have their own columns, the other attributes are stored as a
+    JSON object in the `attributes` column. Objects are kept in the same
+    objects dictionary as the file storage, so the storage API is the same,
+    and `reload()` builds every row of every table, like the JSON file is
+    loaded whole outside of lazy mode.
+
+    The objects are locked for writing while they are loaded or saved, like
+    with the file storage, and the connection may be used from any thread,
+    one at a time.
+    """
+
+    __models = {
+        "BaseModel": BaseModel,
+        "User": User,
+        "State": State,
+        "City": City,
+        "Amenity": Amenity,
+        "Place": Place,
+        "Review": Review,
+    }
+    __columns = ("id", "created_at", "updated_at", "__class__")
+
+    def __init__(self, db_path: str = "hbnb.db") -> None:
+        """Initializes the database storage engine.
+
+        Args:
+            db_path (str, optional): The path to the SQLite database.
+            Defaults to `hbnb.db`.
+        """
+        super().__init__()
+
+        self.__connection = sqlite3.connect(
+            db_path, cached_statements=256, check_same_thread=False
+        )
+        self.__connection_lock = threading.Lock()
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute("PRAGMA synchronous=NORMAL")
+
+        with self.__connection:
+            for model_name in self.__models:
+                self.__connection.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{model_name}" ('
+                    "id TEXT PRIMARY KEY, "
+                    "created_at TEXT NOT NULL, "
+                    "updated_at TEXT NOT NULL, "
+                    "attributes TEXT NOT NULL)"
+                )
+
+    def reload(self) -> None:
+        """Loads every row of every model table into the objects dictionary.
+
+        The rows are read as they are built, but every instance is kept in
+        memory, so the whole database is loaded.
+        """
+        objects = self.all()
+
+        with objects.lock.write, self.__connection_lock:
+            for model_name, model in self.__models.items():
+                rows = self.__connection.execute(
+                    "SELECT id, created_at, updated_at, attributes "
+                    f'FROM "{model_name}"'
+                )
+
+                for instance_id, created_at, updated_at, attributes in rows:
+                    json_dict = json.loads(attributes)
+                    json_dict["id"] = instance_id
+                    json_dict["created_at"] = created_at
+                    json_dict["updated_at"] = updated_at
+
+                    objects.load(
+                        f"{model_name}.{instance_id}", model(**json_dict)
+                    )
+
+    def save(self) -> None:
+        """Writes the objects changed since the last save to the database.
+
+        All the changes are written in a single transaction, with one batched
+        statement per model table.
+        """
+        objects = self.all()
+
+        with objects.lock.write:
+            self.__write(objects)
+
+    def __write(self, objects: dict) -> None:
+        """Writes the dirty objects, with the objects locked for writing.
+
+        Args:
+            objects (dict): The objects dictionary.
+        """
+        upserts = {}
+        deletes = {}
+
+        for class_id in objects.dirty:
+            model_name = class_id.partition(".")[0]
+
+            if class_id not in objects:
+                if model_name in self.__models:
+                    deletes.setdefault(model_name, []).append(
+                        (class_id.partition(".")[2],)
+                    )
+                continue
+
+            obj = objects[class_id]
+
+            # ensure valid keys
+            if class_id != f"{obj.__class__.__name__}.{obj.id}":
+                raise KeyError("invalid key. key must be <class name>.<id>")
+
+            obj_dict = obj.to_dict()
+            attributes = {
+                key: value
+                for key, value in obj_dict.items()
+                if key not in self.__columns
+            }
+
+            upserts.setdefault(model_name, []).append(
+                (
+                    obj_dict["id"],
+                    obj_dict["created_at"],
+                    obj_dict["updated_at"],
+                    json.dumps(attributes, separators=(",", ":")),
+                )
+            )
+
+        with self.__connection_lock, self.__connection:
+            for model_name, rows in upserts.items():
+                self.__connection.executemany(
+                    f'INSERT OR REPLACE INTO "{model_name}" '
+                    "(id, created_at, updated_at, attributes) "
+                    "VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+
+            for model_name, rows in deletes.items():
+                self.__connection.executemany(
+                    f'DELETE FROM "{model_name}" WHERE id = ?', rows
+                )
+
+        objects.dirty.clear()
+
+    def checkpoint(self) -> None:
+        """Folds the write-ahead log back into the database file."""
+        with self.__connection_lock:
+            self.__connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self) -> None:
+        """Closes the connection to the database."""
+        super().close()
+        with self.__connection_lock:
+            self.__connection.close()
@@ -0,0 +1,278 @@
+#!/usr/bin/python3
+
+"""This module defines the events the storage engines publish when instances
+are created, updated or deleted, and their subscribers.
+
+Synchronous subscribers are called with every event in the thread that made
+the change, once the storage is unlocked. Batched subscribers are called with
+lists of events from a thread of their own: events are queued until then,
+and dropped once the queue is full, so that a slow subscriber never holds up
+the threads changing the instances.
+"""
+
+import threading
+from collections import deque
+from typing import Callable, Iterable, List
+
+CREATED = "created"
+UPDATED = "updated"
+DELETED = "deleted"
+
+
+class Event:
+    """Defines a change made to an instance.
+
+    Attributes:
+        kind (str): `created`, `updated` or `deleted`.
+        class_name (str): The name of the model of the instance.
+        id (str): The id of the instance.
+
+        fields (tuple): The names of the attributes set: every attribute of
+        a created instance, those changed on an updated one (empty when they
+        aren't known), and none for a deleted one.
+    """
+
+    def __init__(
+        self, kind: str, class_name: str, id: str, fields: tuple = ()
+    ) -> None:
+        """Initializes an event.
+
+        Args:
+            kind (str): `created`, `updated` or `deleted`.
+            class_name (str): The name of the model of the instance.
+            id (str): The id of the instance.
+            fields (tuple, optional): The names of the attributes set.
+            Defaults to ().
+        """
+        self.kind = kind
+        self.class_name = class_name
+        self.id = id
+        self.fields = fields
+
+    def __repr__(self) -> str:
+        """Returns the representation of the event."""
+        return (
+            f"Event({self.kind!r}, {self.class_name!r}, {self.id!r}, "
+            f"{self.fields!r})"
+        )
+
+    def __eq__(self, other: object) -> bool:
+        """Returns whether two events describe the same change."""
+        if not isinstance(other, Event):
+            return NotImplemented
+
+        return (self.kind, self.class_name, self.id, self.fields) == (
+            other.kind,
+            other.class_name,
+            other.id,
+            other.fields,
+        )
+
+
+class Subscription:
+    """Defines a synchronous subscriber, called with every event.
+
+    Attributes:
+        callback (Callable[[Event], None]): The subscriber.
+    """
+
+    def __init__(self, callback: Callable[[Event], None]) -> None:
+        """Initializes a synchronous subscription.
+
+        Args:
+            callback (Callable[[Event], None]): The subscriber.
+        """
+        self.callback = callback
+
+    def deliver(self, events: List[Event]) -> None:
+        """Calls the subscriber with every event, in order.
+
+        Args:
+            events (List[Event]): The events.
+        """
+        for event in events:
+            self.callback(event)
+
+    def flush(self, timeout: float = None) -> bool:
+        """Returns at once, as events are delivered as they are published.
+
+        Args:
+            timeout (float, optional): Unused. Defaults to None.
+
+        Returns:
+            bool: Always True.
+        """
+        return True
+
+    def close(self) -> None:
+        """Stops the subscription, which holds no resource."""
+
+
+class BatchedSubscription(Subscription):
+    """Defines an asynchronous subscriber, called with lists of events from
+    a thread of its own.
+
+    Attributes:
+        callback (Callable[[List[Event]], None]): The subscriber.
+        batch_size (int): The largest number of events in a list.
+        queue_size (int): The largest number of events waiting.
+        dropped (int): The number of events dropped as the queue was full.
+        error (Exception): The error last raised by the subscriber, if any.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[List[Event]], None],
+        batch_size: int = 100,
+        queue_size: int = 10000,
+    ) -> None:
+        """Initializes a batched subscription and starts its thread.
+
+        Args:
+            callback (Callable[[List[Event]], None]): The subscriber.
+
+            batch_size (int, optional): The largest number of events in a
+            list. Defaults to 100.
+
+            queue_size (int, optional): The largest number of events waiting
+            for the subscriber, beyond which new events are dropped.
+            Defaults to 10000.
+
+        Raises:
+            ValueError: If the batch or queue size isn't positive.
+        """
+        if batch_size < 1 or queue_size < 1:
+            raise ValueError("the batch and queue sizes must be positive")
+
+        super().__init__(callback)
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.dropped = 0
+        self.error = None
+
+        self.__events = deque()
+        self.__condition = threading.Condition()
+        self.__busy = False
+        self.__closed = False
+
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def deliver(self, events: List[Event]) -> None:
+        """Queues the events, dropping those that don't fit.
+
+        Args:
+            events (List[Event]): The events.
+        """
+        with self.__condition:
+            room = self.queue_size - len(self.__events)
+            self.__events.extend(events[:room])
+            self.dropped += max(0, len(events) - room)
+            self.__condition.notify_all()
+
+    def flush(self, timeout: float = None) -> bool:
+        """Waits for the queued events to be delivered.
+
+        Args:
+            timeout (float, optional): The largest number of seconds to wait.
+            Defaults to None, meaning no limit.
+
+        Returns:
+            bool: Whether every queued event was delivered.
+        """
+        with self.__condition:
+            return self.__condition.wait_for(
+                lambda: not self.__events and not self.__busy, timeout
+            )
+
+    def close(self) -> None:
+        """Delivers the queued events, then stops the thread."""
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify_all()
+
+        if self.__thread is not threading.current_thread():
+            self.__thread.join()
+
+    def __run(self) -> None:
+        """Calls the subscriber with the queued events until closed."""
+        events = self.__events
+
+        while True:
+            with self.__condition:
+                while not events and not self.__closed:
+                    self.__condition.wait()
+
+                if not events:
+                    return
+
+                batch = [
+                    events.popleft()
+                    for _ in range(min(len(events), self.batch_size))
+                ]
+                self.__busy = True
+
+            try:
+                self.callback(batch)
+            except Exception as error:
+                self.error = error
+            finally:
+                with self.__condition:
+                    self.__busy = False
+                    self.__condition.notify_all()
+
+
+class EventBus:
+    """Defines the subscribers of the events of the storage engines.
+
+    Attributes:
+        subscriptions (tuple): The subscriptions, replaced rather than
+        changed, so that events are published without a lock.
+    """
+
+    def __init__(self) -> None:
+        """Initializes a bus without subscribers."""
+        self.subscriptions = ()
+        self.__lock = threading.Lock()
+
+    def subscribe(self, subscription: Subscription) -> Subscription:
+        """Adds a subscription.
+
+        Args:
+            subscription (Subscription): The subscription.
+
+        Returns:
+            Subscription: The subscription.
+        """
+        with self.__lock:
+            self.subscriptions += (subscription,)
+
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Removes a subscription, if present, and closes it.
+
+        Args:
+            subscription (Subscription): The subscription.
+        """
+        with self.__lock:
+            self.subscriptions = tuple(
+                other
+                for other in self.subscriptions
+                if other is not subscription
+            )
+
+        subscription.close()
+
+    def publish(self, events: Iterable[Event]) -> None:
+        """Delivers events to every subscription.
+
+        Args:
+            events (Iterable[Event]): The events.
+        """
+        events = list(events)
+        if not events:
+            return
+
+        for subscription in self.subscriptions:
+            subscription.deliver(events)
@@ -5,8 +5,16 @@ This module defines the File Storage class that serializes instances to JSON
 files deserializes JSON files to instances.
 """
 
+import os
 import json
-from typing import Any
+import mmap
+import atexit
+import threading
+from time import monotonic, perf_counter
+from contextlib import contextmanager, suppress
+from itertools import chain, islice
+from operator import indexOf
+from typing import Any, Callable, Iterator
 from models.base_model import BaseModel
 from models.user import User
 from models.amenity import Amenity
@@ -14,13 +22,55 @@ from models.city import City
 from models.place import Place
 from models.state import State
 from models.review import Review
+from models.engine import binary_snapshot
+from models.engine.codec import FragmentCodec, get_codec
+from models.engine.column import NumericColumn
+from models.engine.columnar import ColumnarProjection
+from models.engine.events import (
+    CREATED,
+    DELETED,
+    UPDATED,
+    BatchedSubscription,
+    Event,
+    EventBus,
+    Subscription,
+)
+from models.engine.json_stream import iter_members
+from models.engine.object_registry import (
+    MISSING,
+    ObjectRegistry,
+    indexed_attributes,
+)
+from models.engine.query import parse, plan
+from models.engine.range_index import is_number
+from models.engine.snapshot import Snapshot
+from models.engine.text_index import TextIndex
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+
+def _fsync(path: str) -> None:
+    """Flushes a file or directory to disk.
+
+    Args:
+        path (str): The path to the file or directory.
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
 
 
 class FileStorage:
     """Defines the file storage model."""
 
     __file_path = "file_storage.json"
-    __objects = {}
+    __objects = ObjectRegistry()
+    __events = EventBus()
     __models = {
         "BaseModel": BaseModel,
         "User": User,
@@ -30,49 +80,2067 @@ class FileStorage:
         "Place": Place,
         "Review": Review,
     }
+    __column_cache_size = 64
+
+    def __init__(
+        self,
+        file_path: str = None,
+        journal: bool = False,
+        checkpoint_interval: int = 1000,
+        sharded: bool = False,
+        lazy: bool = False,
+        binary: bool = False,
+        codec: str = "json",
+        write_behind: bool = False,
+        flush_interval: float = 1.0,
+        flush_threshold: int = 1000,
+        group_commit_window: float = 0,
+        columnar: tuple = (),
+        shared: bool = False,
+    ) -> None:
+        """Initializes the file storage engine.
+
+        Args:
+            file_path (str, optional): The path to the JSON file. Defaults to
+            `file_storage.json`.
+
+            journal (bool, optional): Determines whether changes are appended
+            to a journal instead of rewriting the whole JSON file on every
+            save. Defaults to False.
+
+            checkpoint_interval (int, optional): The number of journal records
+            after which the journal is folded back into the JSON file.
+            Defaults to 1000.
+
+            sharded (bool, optional): Determines whether the objects of every
+            model are saved to their own JSON file, which is only read when
+            the model is first needed. The files are kept in a directory named
+            after the JSON file, e.g. `file_storage/User.json`.
+            Defaults to False.
+
+            lazy (bool, optional): Determines whether objects are only built
+            from the JSON file when they are first read. The position of every
+            object in the file is kept in an index next to it, e.g.
+            `file_storage.json.idx`. Defaults to False.
+
+            binary (bool, optional): Determines whether objects are saved to a
+            binary snapshot instead of the JSON file, which is much faster to
+            load. The snapshot is named after the JSON file, e.g.
+            `file_storage.bin`. Defaults to False.
+
+            codec (str, optional): The name of the codec objects are
+            serialized with, one of `json`, `json-compact`, `jsonl`,
+            `pickle`, `marshal` or `msgpack` (if installed). Unless a file
+            path is given, the extension of the file is that of the codec,
+            e.g. `file_storage.pickle`. Defaults to `json`.
+
+            write_behind (bool, optional): Determines whether `save()` only
+            asks a background thread to write the objects, so that many saves
+            in a row are coalesced into a single write. Pending writes are
+            done by `flush()` and when the interpreter exits.
+            Defaults to False.
+
+            flush_interval (float, optional): In write-behind mode, the number
+            of seconds a write waits for more saves to coalesce.
+            Defaults to 1.0.
+
+            flush_threshold (int, optional): In write-behind mode, the number
+            of changed objects that triggers a write without waiting for the
+            interval. Defaults to 1000.
+
+            group_commit_window (float, optional): The number of seconds a
+            save waits for saves from other threads, so that they are all
+            written and synced to disk at once. Defaults to 0, meaning every
+            save is written on its own.
+
+            columnar (tuple, optional): The names of the models whose objects
+            are also kept in a columnar projection (see `columns()`), which
+            filters and statistics then read instead of the objects.
+            Defaults to no model.
+
+            shared (bool, optional): Determines whether other processes save
+            to the same file. Saves then hold an advisory lock on the file
+            (`fcntl.flock()` on e.g. `file_storage.json.lock`), and the
+            objects other processes saved are merged in before the next read
+            or save, once the file changed. Defaults to False.
+
+        Raises:
+            ValueError: If the sharded mode is combined with the journal or
+            lazy modes, the binary mode with the sharded or lazy modes, the
+            lazy or binary modes with another codec than `json`, the shared
+            mode with any of these modes or without `fcntl`, or if the codec
+            is unknown, or a columnar model is unknown.
+        """
+        if sharded and (journal or lazy):
+            raise ValueError(
+                "the sharded mode can't be combined with the journal or "
+                "lazy modes"
+            )
+
+        if binary and (sharded or lazy):
+            raise ValueError(
+                "the binary mode can't be combined with the sharded or "
+                "lazy modes"
+            )
+
+        if shared and (journal or sharded or lazy or binary):
+            raise ValueError(
+                "the shared mode can't be combined with the journal, "
+                "sharded, lazy or binary modes"
+            )
+
+        if shared and fcntl is None:
+            raise ValueError("the shared mode needs fcntl")
+
+        self.__codec = get_codec(codec)
+
+        unknown = set(columnar).difference(self.__models)
+        if unknown:
+            raise ValueError(
+                f"unknown columnar models: {', '.join(sorted(unknown))}"
+            )
+
+        if codec != "json" and (lazy or binary):
+            raise ValueError(
+                "the lazy and binary modes can only use the json codec"
+            )
+
+        if file_path:
+            self.__file_path = file_path
+        else:
+            self.__file_path = (
+                os.path.splitext(self.__file_path)[0] + self.__codec.extension
+            )
+
+        self.__journal = journal
+        self.__journal_path = f"{self.__file_path}.journal"
+        self.__checkpoint_interval = checkpoint_interval
+        self.__journal_records = 0
+
+        # the keys of the objects present in the JSON file or the journal
+        self.__persisted = set()
+
+        # the JSON fragment last written for every key, with its version
+        self.__fragments = {}
+
+        self.__sharded = sharded
+        self.__shards_dir = os.path.splitext(self.__file_path)[0]
+
+        # the models whose objects have been read from disk
+        self.__loaded = set() if sharded else set(self.__models)
+
+        self.__lazy = lazy
+        self.__index_path = f"{self.__file_path}.idx"
+        self.__mmap = None
+
+        # the byte range of every object in the JSON file not yet built, and
+        # their number by model
+        self.__pending = {}
+        self.__unbuilt = {}
+
+        self.__binary = binary
+        self.__binary_path = f"{os.path.splitext(self.__file_path)[0]}.bin"
+
+        self.__text_index_path = f"{self.__file_path}.fts"
+
+        self.__shared = shared
+        self.__lock_path = f"{self.__file_path}.lock"
+
+        # in shared mode, the inode, modification time and size of the file
+        # when it was last read or written, and the `updated_at` of every
+        # object it held then
+        self.__signature = None
+        self.__stamps = {}
+
+        # {(model name, attribute, filter): (generation, NumericColumn)}
+        self.__columns = {}
+
+        # the models kept in a columnar projection
+        self.__columnar = set(columnar)
+
+        # guards the objects shared by every storage engine, which many
+        # threads may read at once
+        self.__lock = self.__objects.lock
+        self.__write_requested = threading.Condition()
+
+        # one write at a time, as the objects are only locked while their
+        # snapshot is taken
+        self.__write_lock = threading.Lock()
+
+        self.__write_behind = write_behind
+        self.__flush_interval = flush_interval
+        self.__flush_threshold = flush_threshold
+        self.__writer = None
+        self.__closed = False
+
+        # the time of the first save not written yet, if any
+        self.__requested_at = None
+
+        # the error raised by the last background write, if any
+        self.__write_error = None
+
+        # whether the writer thread is writing, which flushes wait for
+        self.__writing = False
+
+        self.__group_commit_window = group_commit_window
+        self.__commit_done = threading.Condition()
+        self.__committing = False
+
+        # whether the group commit is being written, after its window
+        self.__commit_writing = False
+
+        # the number of group commits done, and the last one that failed
+        self.__commits = 0
+        self.__failed_commit = (None, None)
+
+        if write_behind:
+            atexit.register(self.flush)
+
+    def all(self, cls: Any = None) -> dict:
+        """
+        Returns all the objects in the dictionary, or only those of a model
+
+        Args:
+            cls (Any, optional): The model, or the name of the model, of the
+            objects to return. Defaults to None, meaning all the objects.
+
+        Returns:
+            dict: A dictionary containing all serialized objects. When `cls`
+            is given, it is a new dictionary holding the objects of `cls`,
+            taken from their partition without scanning the other objects.
+        """
+        if cls is None:
+            with self.__reading(*self.__models):
+                return self.__objects
+
+        model_name = cls if isinstance(cls, str) else cls.__name__
+        with self.__reading(model_name):
+            return dict(self.__objects.partition(model_name))
+
+    def count(self, cls: Any) -> int:
+        """
+        Returns the number of instances of a model
+
+        Args:
+            cls (Any): The model, or the name of the model.
+
+        Returns:
+            int: The number of instances, including those not built yet in
+            lazy mode.
+        """
+        model_name = cls if isinstance(cls, str) else cls.__name__
+
+        with self.__reading(model_name, build=False):
+            return len(self.__objects.partition(model_name)) + (
+                self.__unbuilt.get(model_name, 0)
+            )
+
+    def iter(self, cls: Any) -> Iterator[Any]:
+        """
+        Returns an iterator over the instances of a model
+
+        Args:
+            cls (Any): The model, or the name of the model.
+
+        Returns:
+            Iterator[Any]: The instances of the model, which may safely be
+            added or deleted while iterating.
+        """
+        return iter(self.all(cls).values())
+
+    def page(
+        self,
+        cls: Any = None,
+        limit: int = None,
+        offset: int = 0,
+        after: str = None,
+    ) -> Iterator[Any]:
+        """
+        Returns an iterator over a page of the instances, or of a model's
+
+        Instances are listed in the order they were added, as by `all()`.
+        Only the instances of the page are collected, by slicing the objects
+        dictionary, so the first pages are returned at the same speed
+        whatever the number of instances. In lazy mode, the instances not
+        built yet follow in the order of the index, and only those up to the
+        end of the page are built.
+
+        Args:
+            cls (Any, optional): The model, or the name of the model, of the
+            instances. Defaults to None, meaning every instance.
+
+            limit (int, optional): The largest number of instances to return.
+            Defaults to None, meaning no limit.
+
+            offset (int, optional): The number of instances to skip.
+            Defaults to 0.
+
+            after (str, optional): A cursor: the id of the instance after
+            which the page starts, or for every instance, its key (e.g.
+            `User.<id>`). The offset is counted from there. Defaults to None,
+            meaning the page starts at the first instance.
+
+        Returns:
+            Iterator[Any]: The instances of the page, which may safely be
+            added or deleted while iterating.
+
+        Raises:
+            ValueError: If the limit or offset is negative or not an integer,
+            or if no instance has the cursor.
+        """
+        for name, value in (("limit", limit), ("offset", offset)):
+            if value is None and name == "limit":
+                continue
+
+            if (
+                isinstance(value, bool)
+                or not isinstance(value, int)
+                or value < 0
+            ):
+                raise ValueError(f"{name} must be a non-negative integer")
+
+        if cls is None:
+            model_names = tuple(self.__models)
+        else:
+            model_names = (cls if isinstance(cls, str) else cls.__name__,)
+            if after is not None:
+                after = f"{model_names[0]}.{after}"
+
+        stop = None if limit is None else offset + limit
+
+        with self.__reading(*model_names, build=False):
+            page = self.__page(cls, model_names, offset, stop, after)
+            if page is not None:
+                return iter(page)
+
+        with self.__lock.write:
+            return iter(
+                self.__page(cls, model_names, offset, stop, after, build=True)
+            )
+
+    def __page(
+        self,
+        cls: Any,
+        model_names: tuple,
+        offset: int,
+        stop: int,
+        after: str,
+        build: bool = False,
+    ) -> list:
+        """Returns the instances of a page, for `page()`.
+
+        Args:
+            cls (Any): The model, or None for every instance.
+            model_names (tuple): The names of the models of the instances.
+            offset (int): The number of instances to skip.
+            stop (int): The position of the end of the page, or None.
+            after (str): The key of the cursor, or None.
+
+            build (bool, optional): Whether the instances not built yet in
+            lazy mode may be built, with the lock held for writing. Defaults
+            to False.
+
+        Returns:
+            list: The instances, or None if some must be built first and
+            `build` is False.
+
+        Raises:
+            ValueError: If no instance has the cursor.
+        """
+        if cls is None:
+            objects = self.__objects
+        else:
+            objects = self.__objects.partition(model_names[0])
+
+        def unbuilt() -> Iterator[str]:
+            """Yields the keys of the instances not built yet, in order."""
+            prefix = None if cls is None else f"{model_names[0]}."
+            for key in self.__pending:
+                if prefix is None or key.startswith(prefix):
+                    yield key
+
+        keys = chain(objects, unbuilt()) if self.__pending else iter(objects)
+        if after is not None:
+            if after not in objects and after not in self.__pending:
+                raise ValueError(f"no instance found after {after}")
+
+            # skips the keys up to the cursor in C
+            indexOf(keys, after)
+
+        page = list(islice(keys, offset, stop))
+
+        if page and page[-1] in self.__pending:
+            if not build:
+                return None
+
+            # the instances before the page are built too, so that they keep
+            # their place in the order
+            pending = []
+            for key in unbuilt():
+                pending.append(key)
+                if key == page[-1]:
+                    break
+
+            self.__materialize(*pending)
+
+        return [self.__objects[key] for key in page]
+
+    def find(self, cls: Any, **criteria: Any) -> list:
+        """
+        Returns the instances of a model whose attributes have given values
+
+        The candidates are taken from the smallest hash index matching the
+        criteria on the attributes the model lists in `_indexes`, and only
+        they are checked against the other criteria. Without such criteria,
+        every instance of the model is checked.
+
+        Args:
+            cls (Any): The model, or the name of the model.
+            criteria (Any): The values of the attributes, by name.
+
+        Returns:
+            list: The matching instances.
+        """
+        model_name = cls if isinstance(cls, str) else cls.__name__
+
+        with self.__reading(model_name):
+            candidates = self.__objects.partition(model_name)
+            for attribute, value in criteria.items():
+                indexed = self.__objects.lookup(model_name, attribute, value)
+                if indexed is not None and len(indexed) < len(candidates):
+                    candidates = indexed
+
+            return [
+                obj
+                for obj in candidates.values()
+                if all(
+                    getattr(obj, attribute, MISSING) == value
+                    for attribute, value in criteria.items()
+                )
+            ]
+
+    def where(self, cls: Any, query: str) -> list:
+        """
+        Returns the instances of a model matching a filter
+
+        The filter is written in the language of `models.engine.query`,
+        e.g. `price_by_night < 100 and max_guest >= 4`. The planner reads the
+        candidates from the index with the fewest of them, or checks every
+        instance when no index helps.
+
+        Args:
+            cls (Any): The model, or the name of the model.
+            query (str): The filter.
+
+        Returns:
+            list: The matching instances.
+
+        Raises:
+            ValueError: If the filter is invalid.
+        """
+        return self.explain(cls, query)["matches"]
+
+    def explain(self, cls: Any, query: str) -> dict:
+        """
+        Runs a filter on the instances of a model and describes how
 
-    def all(self) -> dict:
+        Args:
+            cls (Any): The model, or the name of the model.
+            query (str): The filter, as accepted by `where()`.
+
+        Returns:
+            dict: The parsed `filter`, the `plan` chosen, the number of
+            `candidates` checked, the `matches`, and the `planning` and
+            `execution` times in milliseconds.
+
+        Raises:
+            ValueError: If the filter is invalid.
+        """
+        model_name = cls if isinstance(cls, str) else cls.__name__
+        model = self.__models.get(model_name, cls)
+        node = parse(query)
+
+        if (
+            model_name in self.__columnar
+            and model_name not in self.__objects.projections
+        ):
+            self.columns(cls)
+
+        with self.__reading(model_name):
+            start = perf_counter()
+            query_plan = plan(node, model_name, model, self.__objects)
+            planned = perf_counter()
+
+            matches = list(query_plan.matches())
+            candidates = len(matches)
+            for obj in query_plan.candidates():
+                candidates += 1
+                if node.matches(obj):
+                    matches.append(obj)
+            executed = perf_counter()
+
+        return {
+            "filter": str(node),
+            "plan": query_plan.description,
+            "candidates": candidates,
+            "matches": matches,
+            "planning": (planned - start) * 1000,
+            "execution": (executed - planned) * 1000,
+        }
+
+    def stats(self, cls: Any, attribute: str, query: str = None) -> dict:
+        """
+        Returns statistics on a numeric attribute of the instances of a model
+
+        The values are copied to a sorted `array('d')` column, which is
+        cached, along with its statistics, until an instance of the model is
+        added, changed or deleted. Values that aren't numbers are ignored.
+        For a model kept in a columnar projection, the values are copied from
+        the numeric column of the attribute, if it has one.
+
+        Args:
+            cls (Any): The model, or the name of the model.
+            attribute (str): The name of the numeric attribute.
+
+            query (str, optional): A filter, as accepted by `where()`, on the
+            instances to include. Defaults to None, meaning all of them.
+
+        Returns:
+            dict: The statistics, as returned by `NumericColumn.summary()`.
+
+        Raises:
+            ValueError: If the filter is invalid.
+        """
+        model_name = cls if isinstance(cls, str) else cls.__name__
+        key = (model_name, attribute, query)
+
+        with self.__reading(model_name):
+            cached = self.__columns.get(key)
+            if cached is not None and cached[0] == self.__objects.generation(
+                model_name
+            ):
+                return cached[1].summary()
+
+        # the cache is only changed by a single thread
+        with self.__lock.write:
+            self.__load_model(model_name)
+
+            generation = self.__objects.generation(model_name)
+            cached = self.__columns.get(key)
+
+            if cached is None or cached[0] != generation:
+                numbers = None
+                if query is None and model_name in self.__columnar:
+                    projection = self.columns(cls)
+                    numbers = projection.numbers(attribute)
+
+                if numbers is not None:
+                    # values of another type than the column, such as a
+                    # float in an integer column, are null in it
+                    numbers = list(numbers)
+                    for row in projection.columns[attribute].nulls():
+                        obj = self.__objects[projection.keys[row]]
+                        value = getattr(obj, attribute, None)
+                        if is_number(value):
+                            numbers.append(value)
+
+                    column = NumericColumn.from_numbers(numbers)
+                else:
+                    if query is None:
+                        objects = self.__objects.partition(
+                            model_name
+                        ).values()
+                    else:
+                        objects = self.where(cls, query)
+
+                    column = NumericColumn(
+                        getattr(obj, attribute, None) for obj in objects
+                    )
+
+                # keep the most recently built columns only
+                self.__columns.pop(key, None)
+                if len(self.__columns) >= self.__column_cache_size:
+                    del self.__columns[next(iter(self.__columns))]
+
+                cached = self.__columns[key] = (generation, column)
+
+            return cached[1].summary()
+
+    def columns(self, cls: Any) -> ColumnarProjection:
+        """
+        Returns the columnar projection of the instances of a model
+
+        The projection is built on the first call, then kept up to date as
+        instances are added, changed or deleted. Filters on the model are
+        then compared over its columns rather than over every instance.
+
+        Args:
+            cls (Any): The model, or the name of the model.
+
+        Returns:
+            ColumnarProjection: The projection.
+        """
+        model_name = cls if isinstance(cls, str) else cls.__name__
+        model = self.__models.get(model_name, cls)
+
+        with self.__lock.write:
+            self.__load_model(model_name)
+            self.__columnar.add(model_name)
+
+            return self.__objects.project(model_name, model)
+
+    def range(
+        self, cls: Any, attribute: str, low: Any = None, high: Any = None
+    ) -> list:
+        """
+        Returns the instances of a model whose attribute is within bounds
+
+        The instances are found by bisecting the range index of the attribute
+        when the model lists it in `_range_indexes`, otherwise every instance
+        of the model is checked. Only numeric values are ever matched.
+
+        Args:
+            cls (Any): The model, or the name of the model.
+            attribute (str): The name of the numeric attribute.
+
+            low (Any, optional): The lowest value, included. Defaults to None,
+            meaning there is no lower bound.
+
+            high (Any, optional): The highest value, included. Defaults to
+            None, meaning there is no upper bound.
+
+        Returns:
+            list: The matching instances, ordered by the attribute.
+        """
+        model_name = cls if isinstance(cls, str) else cls.__name__
+
+        with self.__reading(model_name):
+            class_ids = self.__objects.range(model_name, attribute, low, high)
+            if class_ids is not None:
+                return [self.__objects[class_id] for class_id in class_ids]
+
+            matches = [
+                obj
+                for obj in self.__objects.partition(model_name).values()
+                if is_number(value := getattr(obj, attribute, None))
+                and (low is None or value >= low)
+                and (high is None or value <= high)
+            ]
+            # the order of the range index, where ties are ordered by key
+            matches.sort(key=lambda obj: (getattr(obj, attribute), obj.id))
+
+            return matches
+
+    def near(
+        self,
+        cls: Any,
+        latitude: float,
+        longitude: float,
+        k: int = None,
+        radius: float = None,
+    ) -> list:
+        """
+        Returns the instances of a model nearest to a point
+
+        The instances are found through the spatial index of the coordinates
+        the model names in `_location_index`. Distances are great-circle
+        distances in kilometres.
+
+        Args:
+            cls (Any): The model, or the name of the model.
+            latitude (float): The latitude of the point, in degrees.
+            longitude (float): The longitude of the point, in degrees.
+
+            k (int, optional): The number of instances to return. Defaults to
+            None, meaning every instance within the radius.
+
+            radius (float, optional): The largest distance from the point.
+            Defaults to None, meaning there is no limit.
+
+        Returns:
+            list: The instances, nearest first.
+
+        Raises:
+            ValueError: If the model has no location.
+        """
+        with self.__reading(cls if isinstance(cls, str) else cls.__name__):
+            index = self.__location_index(cls)
+            if index is None:
+                return []
+
+            if k is None and radius is not None:
+                found = index.within(latitude, longitude, radius)
+            else:
+                found = index.nearest(
+                    latitude, longitude, len(index) if k is None else k, radius
+                )
+
+            return [self.__objects[class_id] for _, class_id in found]
+
+    def bbox(
+        self, cls: Any, south: float, west: float, north: float, east: float
+    ) -> list:
+        """
+        Returns the instances of a model located in a bounding box
+
+        Args:
+            cls (Any): The model, or the name of the model.
+            south (float): The lowest latitude, included.
+            west (float): The western longitude, included.
+            north (float): The highest latitude, included.
+
+            east (float): The eastern longitude, included. A box crossing the
+            antimeridian has an eastern longitude lower than the western one.
+
+        Returns:
+            list: The instances.
+
+        Raises:
+            ValueError: If the model has no location.
+        """
+        with self.__reading(cls if isinstance(cls, str) else cls.__name__):
+            index = self.__location_index(cls)
+            if index is None:
+                return []
+
+            return [
+                self.__objects[class_id]
+                for class_id in index.bbox(south, west, north, east)
+            ]
+
+    def search(self, cls: Any, query: str, limit: int = None) -> list:
+        """
+        Returns the instances of a model whose text mentions some words
+
+        The instances are ranked with BM25 over the inverted indexes of the
+        text attributes the model lists in `_text_indexes`, adding up the
+        scores of every attribute.
+
+        Args:
+            cls (Any): The model, or the name of the model.
+            query (str): The words to look for.
+
+            limit (int, optional): The largest number of instances to return.
+            Defaults to None, meaning every matching instance.
+
+        Returns:
+            list: The matching instances, best first.
+
+        Raises:
+            ValueError: If the model has no text index.
+        """
+        model_name = cls if isinstance(cls, str) else cls.__name__
+        model = self.__models.get(model_name, cls)
+
+        attributes = getattr(model, "_text_indexes", ())
+        if not attributes:
+            raise ValueError(f"{model_name} has no text index")
+
+        with self.__reading(model_name):
+            scores = {}
+            for attribute in attributes:
+                index = self.__objects.texts.get((model_name, attribute))
+                if index is None:
+                    continue
+
+                for class_id, score in index.search(query).items():
+                    scores[class_id] = scores.get(class_id, 0.0) + score
+
+            # a saved index may still list objects removed from the shards
+            objects = self.__objects
+            ranked = sorted(
+                (class_id for class_id in scores if class_id in objects),
+                key=lambda class_id: (-scores[class_id], class_id),
+            )
+            if limit is not None:
+                ranked = ranked[:limit]
+
+            return [self.__objects[class_id] for class_id in ranked]
+
+    def related(self, obj: Any, cls: Any) -> list:
+        """
+        Returns the instances of a model referencing an instance
+
+        The instances are found in the reverse adjacency maps kept on the
+        attributes the model lists in `_references`, e.g. the cities of a
+        state, or the places having an amenity in their `amenity_ids`.
+
+        Args:
+            obj (Any): The referenced instance.
+            cls (Any): The model, or the name of the model, of the instances.
+
+        Returns:
+            list: The instances referencing `obj`.
+
+        Raises:
+            ValueError: If the model has no reference to the model of `obj`.
+        """
+        model_name = cls if isinstance(cls, str) else cls.__name__
+        model = self.__models.get(model_name, cls)
+
+        target = obj.__class__.__name__
+        attributes = [
+            attribute
+            for attribute, referenced in getattr(
+                model, "_references", {}
+            ).items()
+            if referenced == target
+        ]
+        if not attributes:
+            raise ValueError(f"{model_name} has no reference to {target}")
+
+        with self.__reading(model_name):
+            found = {}
+            for attribute in attributes:
+                found.update(
+                    self.__objects.lookup(model_name, attribute, obj.id) or {}
+                )
+
+            return list(found.values())
+
+    def get(self, cls: Any, instance_id: str) -> Any:
         """
-        Returns all the objects in the dictionary
+        Returns an instance based on its model and id
+
+        Args:
+            cls (Any): The model, or the name of the model, of the instance.
+            instance_id (str): The id of the instance.
 
         Returns:
-            dict: A dictionary containing all serialized objects.
+            Any: The instance, or None if it doesn't exist.
         """
-        return self.__objects
+        model_name = cls if isinstance(cls, str) else cls.__name__
+        class_id = f"{model_name}.{instance_id}"
+
+        with self.__reading(model_name, build=False):
+            if class_id not in self.__pending:
+                return self.__objects.get(class_id)
+
+        with self.__lock.write:
+            if class_id in self.__pending:
+                self.__materialize(class_id)
+
+            return self.__objects.get(class_id)
 
     def new(self, obj: Any) -> None:
         """
         Saves a new instance to the objects dictionary
 
+        The subscribers are told the instance was created.
+
         Args:
             obj (Any): The object save in dictionary
         """
-        self.__objects[f"{obj.__class__.__name__}.{obj.id}"] = obj
+        class_id = f"{obj.__class__.__name__}.{obj.id}"
 
-    def reload(self) -> None:
-        """Deserializes the json objects into their respective models."""
-        try:
-            with open(self.__file_path, "r", encoding="utf-8") as json_file:
-                instances = json.load(json_file)
+        with self.__lock.write:
+            self.__unpend(class_id)
+            self.__objects[class_id] = obj
 
-                for class_name_id, json_dict in instances.items():
-                    model_name = json_dict["__class__"]
-                    self.__objects[class_name_id] = self.__models[model_name](
-                        **json_dict
+        if self.__events.subscriptions:
+            event = Event(
+                CREATED, obj.__class__.__name__, obj.id, tuple(obj.__dict__)
+            )
+            self.__events.publish([event])
+
+    def delete(self, obj: Any = None, cascade: bool = False) -> None:
+        """
+        Removes an instance from the objects dictionary
+
+        With `cascade`, the instances referencing it through an id are
+        removed too, along with the instances referencing those, and so on
+        (e.g. the cities, places and reviews of a state), while its id is
+        taken out of the lists of ids referencing it (e.g. the `amenity_ids`
+        of places). Nothing is written until the next save, but the
+        subscribers are told every instance removed.
+
+        Args:
+            obj (Any, optional): The object to remove. Nothing is done if it
+            is None or not in the dictionary. Defaults to None.
+
+            cascade (bool, optional): Whether to remove the instances
+            referencing the object as well. Defaults to False.
+        """
+        if obj is None:
+            return
+
+        # the removed instances, in order
+        removed = {}
+
+        with self.__lock.write:
+            stack = [obj]
+            while stack:
+                parent = stack.pop()
+                class_id = f"{parent.__class__.__name__}.{parent.id}"
+                if class_id in removed:
+                    continue
+
+                removed[class_id] = self.__objects.pop(class_id, None)
+                if not cascade:
+                    break
+
+                for model_name, attribute in self.__referencing(
+                    parent.__class__.__name__
+                ):
+                    self.__load_model(model_name)
+                    children = self.__objects.lookup(
+                        model_name, attribute, parent.id
                     )
-        except (FileNotFoundError, PermissionError):
-            pass
 
-    def save(self) -> None:
-        """Serializes the objects dictionary and save it to a JSON file."""
-        instances = {}
+                    for child in list((children or {}).values()):
+                        ids = getattr(child, attribute)
+                        if isinstance(ids, list):
+                            setattr(
+                                child,
+                                attribute,
+                                [item for item in ids if item != parent.id],
+                            )
+                        else:
+                            stack.append(child)
+
+        if self.__events.subscriptions:
+            self.__events.publish(
+                Event(DELETED, instance.__class__.__name__, instance.id)
+                for instance in removed.values()
+                if instance is not None
+            )
+
+    def snapshot(self) -> Snapshot:
+        """
+        Takes a point-in-time snapshot of every instance
+
+        Reading the snapshot returns the state of the instances at the time
+        it was taken, however they are created, changed or deleted since.
+        Taking it copies the references to the instances, not the instances:
+        an instance is only copied when it first changes while the snapshot
+        is open. In lazy mode, every instance is built first.
+
+        Returns:
+            Snapshot: The snapshot, mapping the key of every instance to its
+            `to_dict()`. Close it once done.
+        """
+        with self.__lock.write:
+            self.__load_shards(*self.__models)
+            self.__materialize(*self.__pending)
+
+            return self.__objects.snapshot()
+
+    def preserve(self, obj: Any) -> None:
+        """Keeps the state of an object about to change in the open
+        snapshots, so that they still read the state it had.
+
+        It must be called before the attributes of an object are changed,
+        which assigning an attribute of a model does.
+
+        Args:
+            obj (Any): The object about to change.
+        """
+        # objects being initialized have no id, nor any snapshot holding them
+        obj_id = getattr(obj, "id", None)
+        if obj_id is None or not self.__objects.snapshots:
+            return
+
+        with self.__lock.write:
+            self.__objects.preserve(f"{obj.__class__.__name__}.{obj_id}", obj)
+
+    def mark_dirty(self, obj: Any, *attributes: str) -> None:
+        """Marks an object as changed so it is written on the next save.
+
+        The indexes of the object are updated when an indexed attribute
+        changed, and so is its row in the columnar projection of its model,
+        if any, and the subscribers are told. Objects that are not in the
+        objects dictionary are ignored.
+
+        Args:
+            obj (Any): The object that changed.
+
+            attributes (str): The names of the attributes that changed. When
+            none are given, every indexed attribute is assumed to have changed.
+        """
+        class_id = f"{obj.__class__.__name__}.{obj.id}"
+
+        with self.__lock.write:
+            if self.__objects.get(class_id) is not obj:
+                return
+
+            self.__objects.touch(class_id)
+
+            indexed = indexed_attributes(type(obj))
+            if indexed and (
+                not attributes
+                or any(attribute in indexed for attribute in attributes)
+            ):
+                self.__objects.reindex(class_id, attributes)
+            else:
+                projection = self.__objects.projections.get(
+                    obj.__class__.__name__
+                )
+                if projection is not None:
+                    projection.add(class_id, obj)
+
+        if self.__events.subscriptions:
+            self.__events.publish(
+                [Event(UPDATED, obj.__class__.__name__, obj.id, attributes)]
+            )
+
+    def subscribe(
+        self,
+        callback: Callable,
+        batched: bool = False,
+        batch_size: int = 100,
+        queue_size: int = 10000,
+    ) -> Subscription:
+        """Calls a subscriber whenever an instance is created, updated or
+        deleted, through any storage engine.
+
+        A synchronous subscriber is called with every `Event` in the thread
+        that made the change, once the storage is unlocked. A batched one is
+        called with lists of events from a thread of its own; events wait in
+        a bounded queue meanwhile, and are dropped once it is full, so that a
+        slow subscriber never holds up the changes.
+
+        Args:
+            callback (Callable): The subscriber, called with an `Event`, or
+            with a list of events when batched.
+
+            batched (bool, optional): Whether the subscriber is called with
+            lists of events from a thread of its own. Defaults to False.
+
+            batch_size (int, optional): The largest number of events in a
+            list. Defaults to 100.
+
+            queue_size (int, optional): The largest number of events waiting
+            for a batched subscriber. Defaults to 10000.
+
+        Returns:
+            Subscription: The subscription, to pass to `unsubscribe()`.
+
+        Raises:
+            ValueError: If the batch or queue size isn't positive.
+        """
+        if batched:
+            subscription = BatchedSubscription(
+                callback, batch_size, queue_size
+            )
+        else:
+            subscription = Subscription(callback)
+
+        return self.__events.subscribe(subscription)
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Stops calling a subscriber, once it got the events queued for it.
+
+        Args:
+            subscription (Subscription): The subscription, as returned by
+            `subscribe()`.
+        """
+        self.__events.unsubscribe(subscription)
+
+    def dirty_count(self) -> int:
+        """Returns the number of objects changed since the last save.
+
+        Returns:
+            int: The number of objects created, updated or deleted since the
+            last save.
+        """
+        return len(self.__objects.dirty)
+
+    def reload(self) -> None:
+        """Deserializes the json objects into their respective models.
+
+        In journal mode, the records in the journal are replayed on top of the
+        objects loaded from the JSON file. In sharded mode, nothing is read
+        until the objects of a model are needed. In shared mode, the objects
+        changed since the last save are kept rather than read. In lazy mode,
+        only the index of the JSON file is read. In binary mode, the objects
+        are loaded from the binary snapshot. The indexes are rebuilt as the
+        objects are loaded, in the same pass, except for the text indexes
+        saved next to the JSON file, which only take in the objects whose
+        text changed, and forget the objects no longer saved once their
+        model is loaded.
+        """
+        with self.__lock.write:
+            self.__load_text_indexes()
+
+            if self.__sharded:
+                self.__loaded.clear()
+                return
+
+            if self.__binary:
+                self.__load_binary()
+            elif self.__lazy:
+                self.__load_index()
+            elif self.__shared:
+                self.__signature, self.__stamps = None, {}
+                self.__refresh()
+            else:
+                self.__load_file(self.__file_path)
+
+            if self.__journal:
+                self.__replay_journal()
+                self.__persisted = set(self.__objects).union(self.__pending)
+
+            self.__objects.prune_text_indexes(
+                lambda class_id: class_id in self.__pending
+            )
+
+    def save(self) -> None:
+        """Serializes the objects dictionary and save it to a JSON file.
+
+        In journal mode, only the objects created, updated or deleted since the
+        last save are appended to the journal. In sharded mode, only the files
+        of the models with such objects are written. In write-behind mode, the
+        writer thread is asked to write the objects instead. With a group
+        commit window, the saves of many threads are written at once.
+
+        Raises:
+            Exception: In write-behind mode, the error raised by the last
+            background write, if it failed.
+        """
+        if self.__group_commit_window and not self.__write_behind:
+            self.__group_commit()
+            return
+
+        if not self.__write_behind:
+            self.__write()
+            return
+
+        with self.__write_requested:
+            self.__raise_write_error()
+
+            if self.__requested_at is None:
+                self.__requested_at = monotonic()
+
+            self.__closed = False
+            if self.__writer is None or not self.__writer.is_alive():
+                self.__writer = threading.Thread(
+                    target=self.__run_writer, daemon=True
+                )
+                self.__writer.start()
+
+            self.__write_requested.notify_all()
+
+    def flush(self) -> None:
+        """Writes the objects saved but not yet written in write-behind mode.
+
+        Nothing is done in the other modes, where `save()` writes at once.
+        A write the writer thread is doing is waited for.
+
+        Raises:
+            Exception: The error raised by the last background write, if it
+            failed.
+        """
+        with self.__write_requested:
+            while self.__writing:
+                self.__write_requested.wait()
+
+            self.__raise_write_error()
+
+            if self.__requested_at is None:
+                return
+
+            self.__requested_at = None
+
+        self.__write()
+
+    def checkpoint(self) -> None:
+        """Folds the journal back into the JSON file and empties it.
+
+        Like a save, it waits for the write in progress, if any, as both
+        write the same temporary file.
+        """
+        with self.__write_lock, self.__file_locked(), self.__lock.write:
+            self.__checkpoint()
+
+    def __checkpoint(self) -> None:
+        """Folds the journal back into the JSON file and empties it, with
+        the objects locked for writing."""
+        self.__write_snapshot()
+
+        self.__persisted = set(self.__objects).union(self.__pending)
+
+        # the snapshot is complete, so the journal can safely be discarded
+        with open(self.__journal_path, "w", encoding="utf-8"):
+            pass
+
+        self.__journal_records = 0
+        self.__write_text_indexes()
+
+    def close(self) -> None:
+        """Flushes the pending saves and stops the writer thread, if any."""
+        self.flush()
+
+        with self.__write_requested:
+            self.__closed = True
+            self.__write_requested.notify_all()
+
+        if self.__writer is not None:
+            self.__writer.join()
+            self.__writer = None
+
+        if self.__write_behind:
+            atexit.unregister(self.flush)
+
+    def __write(self) -> None:
+        """Writes the objects changed since the last write.
+
+        In the default mode, the objects are written from a snapshot, so
+        they are only locked while it is taken and may change during the
+        write. The other modes lock them for the whole write. In shared
+        mode, the file stays locked from the merge of the objects saved by
+        other processes until it is replaced.
+        """
+        with self.__write_lock, self.__file_locked():
+            with self.__lock.write:
+                if (
+                    self.__journal
+                    or self.__sharded
+                    or self.__binary
+                    or self.__lazy
+                ):
+                    if self.__journal:
+                        # the text indexes are saved on checkpoints, as the
+                        # journal brings them up to date on reload
+                        self.__append_journal()
+                        return
+
+                    if self.__sharded:
+                        self.__write_shards()
+                    else:
+                        self.__write_snapshot()
+
+                    self.__write_text_indexes()
+                    return
+
+                if self.__shared:
+                    self.__refresh()
+
+                snapshot = self.__objects.snapshot()
+                written = set(self.__objects.dirty)
+                self.__clear_dirty()
+
+            try:
+                with snapshot:
+                    self.__write_file(self.__file_path, snapshot=snapshot)
+
+                    if self.__shared:
+                        self.__stamp(snapshot, written)
+            except BaseException:
+                # the changes are still to be written
+                with self.__lock.write:
+                    self.__objects.dirty.update(written)
+                raise
+
+            with self.__lock.write:
+                self.__write_text_indexes()
+
+    def __group_commit(self) -> None:
+        """Writes the objects along with the saves of other threads.
+
+        The first save waits for the group commit window, then writes the
+        changes of every save made in the meantime. The other saves wait for
+        that write instead of doing their own.
+
+        Raises:
+            Exception: The error raised by the write, if it failed.
+        """
+        with self.__commit_done:
+            # changes made once a commit is written wait for the next one
+            while self.__commit_writing:
+                self.__commit_done.wait()
+
+            commit = self.__commits
+
+            if self.__committing:
+                while self.__commits == commit:
+                    self.__commit_done.wait()
+
+                failed_commit, error = self.__failed_commit
+                if failed_commit == commit:
+                    raise error
+                return
+
+            self.__committing = True
+            self.__commit_done.wait(self.__group_commit_window)
+            self.__commit_writing = True
+
+        try:
+            self.__write()
+        except Exception as error:
+            with self.__commit_done:
+                self.__failed_commit = (commit, error)
+            raise
+        finally:
+            with self.__commit_done:
+                self.__committing = self.__commit_writing = False
+                self.__commits += 1
+                self.__commit_done.notify_all()
+
+    def __run_writer(self) -> None:
+        """Writes the objects whenever saves are requested, in write-behind
+        mode.
+
+        A write waits up to the flush interval after the first save it covers,
+        or until the flush threshold of changed objects is reached.
+        """
+        while True:
+            with self.__write_requested:
+                if self.__closed:
+                    return
+
+                if self.__requested_at is None:
+                    self.__write_requested.wait()
+                    continue
+
+                remaining = (
+                    self.__requested_at + self.__flush_interval - monotonic()
+                )
+                if (
+                    remaining > 0
+                    and len(self.__objects.dirty) < self.__flush_threshold
+                ):
+                    self.__write_requested.wait(remaining)
+                    continue
+
+                self.__requested_at = None
+                self.__writing = True
+
+            # the objects aren't locked while they are written
+            try:
+                self.__write()
+            except Exception as error:
+                with self.__write_requested:
+                    self.__write_error = error
+            finally:
+                with self.__write_requested:
+                    self.__writing = False
+                    self.__write_requested.notify_all()
+
+    def __raise_write_error(self) -> None:
+        """Raises the error of the last background write, if it failed."""
+        error, self.__write_error = self.__write_error, None
+
+        if error is not None:
+            raise error
+
+    def __check_key(self, class_id: str, obj: Any) -> None:
+        """Ensures an object is stored under the key `<class name>.<id>`.
+
+        Args:
+            class_id (str): The key of the object in the objects dictionary.
+            obj (Any): The object stored under `class_id`.
+
+        Raises:
+            KeyError: If `class_id` is not a valid key for `obj`.
+        """
+        if class_id != f"{obj.__class__.__name__}.{obj.id}":
+            raise KeyError("invalid key. key must be <class name>.<id>")
+
+    def __shard_path(self, model_name: str) -> str:
+        """Returns the path to the file of a model in sharded mode."""
+        return os.path.join(
+            self.__shards_dir, f"{model_name}{self.__codec.extension}"
+        )
+
+    def __load_shards(self, *model_names: str) -> None:
+        """Loads the objects of the models whose file hasn't been read yet.
+
+        Args:
+            model_names (str): The names of the models to load.
+        """
+        for model_name in model_names:
+            if model_name in self.__loaded or model_name not in self.__models:
+                continue
+
+            self.__loaded.add(model_name)
+            self.__load_file(self.__shard_path(model_name))
+
+            # the text indexes read on reload may hold objects of the model
+            # that are no longer saved
+            self.__objects.prune_text_indexes(
+                lambda class_id: class_id.partition(".")[0]
+                not in self.__loaded
+            )
+
+    def __load_model(self, model_name: str) -> None:
+        """Ensures every object of a model is loaded and built.
+
+        Args:
+            model_name (str): The name of the model.
+        """
+        self.__load_shards(model_name)
+
+        if self.__unbuilt.get(model_name):
+            prefix = f"{model_name}."
+            self.__materialize(
+                *[key for key in self.__pending if key.startswith(prefix)]
+            )
+
+    @contextmanager
+    def __reading(self, *model_names: str, build: bool = True) -> Iterator:
+        """Holds the lock for reading the objects of some models, or for
+        writing if they must be loaded first.
+
+        Args:
+            model_names (str): The names of the models.
+
+            build (bool, optional): Whether the objects not built yet in lazy
+            mode must be built. Defaults to True.
+        """
+        if (
+            self.__shared
+            and not self.__lock.held()
+            and self.__stat() != self.__signature
+        ):
+            with self.__lock.write:
+                self.__refresh()
+
+        with self.__lock.read:
+            loaded = self.__loaded.issuperset(
+                name for name in model_names if name in self.__models
+            )
+            if loaded and build and self.__pending:
+                loaded = not any(
+                    self.__unbuilt.get(model_name)
+                    for model_name in model_names
+                )
+
+            if loaded:
+                yield
+                return
+
+        with self.__lock.write:
+            for model_name in model_names:
+                if build:
+                    self.__load_model(model_name)
+                else:
+                    self.__load_shards(model_name)
+
+            yield
+
+    @contextmanager
+    def __file_locked(self) -> Iterator:
+        """Holds the advisory lock on the file in shared mode, so that the
+        other processes don't save at the same time."""
+        if not self.__shared:
+            yield
+            return
+
+        fd = os.open(self.__lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            # closing the file releases the lock
+            os.close(fd)
+
+    def __stat(self, fd: int = None) -> tuple:
+        """Returns the inode, modification time and size of the file, which
+        change whenever a save replaces it, or None if it doesn't exist.
+
+        Args:
+            fd (int, optional): The descriptor of the file, once opened.
+            Defaults to None, meaning the file is looked up by its path.
+        """
+        try:
+            stat = os.stat(self.__file_path) if fd is None else os.fstat(fd)
+        except FileNotFoundError:
+            return None
+
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def __refresh(self) -> None:
+        """Merges the objects other processes saved since the file was last
+        read or written, in shared mode.
+
+        Only the objects whose `updated_at` changed in the file are built,
+        and only those missing from it are removed. Objects changed since
+        the last save keep their changes, which the next save writes.
+        """
+        try:
+            if self.__codec.binary:
+                storage_file = open(self.__file_path, "rb")
+            else:
+                storage_file = open(
+                    self.__file_path, "r", encoding="utf-8", newline=""
+                )
+        except (FileNotFoundError, PermissionError):
+            return
+
+        objects = self.__objects
+        stamps = {}
+
+        with storage_file:
+            signature = self.__stat(storage_file.fileno())
+            if signature == self.__signature:
+                return
+
+            for class_id, json_dict in self.__codec.decode(storage_file):
+                stamps[class_id] = stamp = json_dict.get("updated_at")
+
+                if class_id in objects.dirty or (
+                    class_id in objects
+                    and self.__stamps.get(class_id) == stamp
+                ):
+                    continue
+
+                model_name = json_dict["__class__"]
+                objects.load(class_id, self.__models[model_name](**json_dict))
+
+        for class_id in self.__stamps.keys() - stamps.keys():
+            if class_id in objects and class_id not in objects.dirty:
+                objects.unload(class_id)
+
+        self.__signature, self.__stamps = signature, stamps
+
+    def __stamp(self, snapshot: Snapshot, written: set) -> None:
+        """Remembers what was just written to the file, in shared mode.
+
+        Args:
+            snapshot (Snapshot): The snapshot written, still open.
+            written (set): The keys of the objects changed since the save
+            before.
+        """
+        stamps = self.__stamps
+        for class_id in written.difference(snapshot):
+            stamps.pop(class_id, None)
+
+        for class_id in snapshot:
+            if class_id in written or class_id not in stamps:
+                stamps[class_id] = snapshot.state(class_id).get("updated_at")
+
+        self.__signature = self.__stat()
+
+    def __referencing(self, model_name: str) -> list:
+        """Returns the references to a model from every model.
+
+        Args:
+            model_name (str): The name of the referenced model.
+
+        Returns:
+            list: The `(model name, attribute)` of every reference.
+        """
+        return [
+            (name, attribute)
+            for name, model in self.__models.items()
+            for attribute, referenced in model._references.items()
+            if referenced == model_name
+        ]
+
+    def __location_index(self, cls: Any) -> Any:
+        """Returns the spatial index of a model, whose objects must be loaded.
+
+        Args:
+            cls (Any): The model, or the name of the model.
+
+        Returns:
+            Any: The spatial index, or None if no object has a location yet.
+
+        Raises:
+            ValueError: If the model has no location.
+        """
+        model_name = cls if isinstance(cls, str) else cls.__name__
+        model = self.__models.get(model_name, cls)
+
+        if not getattr(model, "_location_index", ()):
+            raise ValueError(f"{model_name} has no location")
+
+        return self.__objects.locations.get(model_name)
+
+    def __load_text_indexes(self) -> None:
+        """Reads the text indexes saved next to the storage file, if any.
+
+        Text indexes left behind by a storage file that is gone are ignored.
+        """
+        if not os.path.isfile(self.__text_index_path):
+            return
+
+        stores = (
+            self.__file_path,
+            self.__journal_path,
+            self.__binary_path,
+            self.__shards_dir,
+        )
+        if not any(os.path.exists(path) for path in stores):
+            return
+
+        try:
+            with open(self.__text_index_path, "r", encoding="utf-8") as fts:
+                states = json.load(fts)
+        except (FileNotFoundError, PermissionError, ValueError):
+            return
+
+        for name, state in states.items():
+            class_name, _, attribute = name.partition(".")
+            self.__objects.restore_text_index(
+                class_name, attribute, TextIndex.from_state(state)
+            )
+
+    def __write_text_indexes(self) -> None:
+        """Saves the text indexes next to the JSON file, if they changed.
+
+        Nothing is written while no instance holds any indexed text.
+        """
+        texts = self.__objects.texts
+        if not any(index.changed for index in texts.values()):
+            return
+
+        self.__write_content(
+            self.__text_index_path,
+            json.dumps(
+                {
+                    f"{class_name}.{attribute}": index.to_state()
+                    for (class_name, attribute), index in texts.items()
+                },
+                separators=(",", ":"),
+            ),
+        )
+
+        for index in texts.values():
+            index.changed = False
+
+    def __load_file(self, file_path: str) -> None:
+        """Loads the objects saved in a file with the codec of the storage.
+
+        With the `json` codec, the file is parsed as a stream: every object
+        is built as soon as it has been read, so the raw JSON is never held
+        in memory as a whole.
+
+        Args:
+            file_path (str): The path to the file.
+        """
+        try:
+            if self.__codec.binary:
+                storage_file = open(file_path, "rb")
+            else:
+                storage_file = open(
+                    file_path, "r", encoding="utf-8", newline=""
+                )
+        except (FileNotFoundError, PermissionError):
+            return
+
+        with storage_file:
+            for class_name_id, json_dict in self.__codec.decode(storage_file):
+                model_name = json_dict["__class__"]
+                self.__objects.load(
+                    class_name_id, self.__models[model_name](**json_dict)
+                )
+
+    def __load_binary(self) -> None:
+        """Loads the objects saved in the binary snapshot.
+
+        The attributes in the snapshot are already decoded, so the objects
+        are built without going through the dictionary representation.
+        """
+        try:
+            shapes = binary_snapshot.load(self.__binary_path)
+            for model_name, names, rows in shapes:
+                model = self.__models[model_name]
+                objects = {}
+
+                for values in rows:
+                    obj = model.__new__(model)
+                    obj.__dict__.update(zip(names, values))
+                    objects[f"{model_name}.{obj.id}"] = obj
+
+                self.__objects.load_many(objects)
+        except (FileNotFoundError, PermissionError):
+            return
+
+    def __load_index(self) -> None:
+        """Maps the JSON file in memory and reads the position of every
+        object in it, without building any object.
+
+        The index is rebuilt by scanning the JSON file when it is missing or
+        older than the JSON file.
+        """
+        self.__unmap()
+        self.__pending = {}
+        self.__unbuilt = {}
+
+        try:
+            json_file = open(
+                self.__file_path, "r", encoding="utf-8", newline=""
+            )
+        except (FileNotFoundError, PermissionError):
+            return
+
+        with json_file:
+            stat = os.fstat(json_file.fileno())
+
+            try:
+                with open(self.__index_path, "r", encoding="utf-8") as idx:
+                    index = json.load(idx)
+            except (FileNotFoundError, PermissionError, ValueError):
+                index = {}
+
+            if (index.get("size"), index.get("mtime_ns")) == (
+                stat.st_size,
+                stat.st_mtime_ns,
+            ):
+                offsets = index["offsets"]
+            else:
+                offsets = {
+                    class_id: (start, end)
+                    for class_id, _, start, end in iter_members(json_file)
+                }
+
+            if offsets:
+                self.__mmap = mmap.mmap(
+                    json_file.fileno(), 0, access=mmap.ACCESS_READ
+                )
+
+        unbuilt = self.__unbuilt
+        for class_id, (start, end) in offsets.items():
+            # the saved object replaces the one in memory, as in a reload
+            self.__objects.unload(class_id)
+            self.__pending[class_id] = (start, end)
+
+            model_name = class_id.partition(".")[0]
+            unbuilt[model_name] = unbuilt.get(model_name, 0) + 1
+
+    def __materialize(self, *class_ids: str) -> None:
+        """Builds objects from their byte range in the JSON file.
+
+        Args:
+            class_ids (str): The keys of the objects to build.
+        """
+        for class_id in class_ids:
+            start, end = self.__unpend(class_id)
+            json_dict = json.loads(self.__mmap[start:end])
+
+            self.__objects.load(
+                class_id, self.__models[json_dict["__class__"]](**json_dict)
+            )
+
+        if not self.__pending:
+            self.__unmap()
+
+    def __unpend(self, class_id: str) -> tuple:
+        """Forgets the byte range of an object not built yet, if any.
+
+        Args:
+            class_id (str): The key of the object.
+
+        Returns:
+            tuple: The byte range, or None if the object isn't pending.
+        """
+        byte_range = self.__pending.pop(class_id, None)
+        if byte_range is not None:
+            model_name = class_id.partition(".")[0]
+            self.__unbuilt[model_name] -= 1
+
+        return byte_range
+
+    def __unmap(self) -> None:
+        """Closes the memory map of the JSON file, if any."""
+        if self.__mmap is not None:
+            self.__mmap.close()
+            self.__mmap = None
+
+    def __write_snapshot(self) -> None:
+        """Writes every object in the objects dictionary to the JSON file.
+
+        In lazy mode, the objects that haven't been built yet are copied from
+        the current JSON file as they are, and the index is written too. In
+        binary mode, the binary snapshot is written instead.
+        """
+        if self.__binary:
+            records = []
+            for class_id, obj in self.__objects.items():
+                # ensure valid keys
+                self.__check_key(class_id, obj)
+                records.append((obj.__class__.__name__, obj.__dict__))
+
+            self.__replace_file(
+                self.__binary_path,
+                lambda temp_path: binary_snapshot.dump(records, temp_path),
+            )
+            self.__clear_dirty()
+            return
+
+        raw_items = [
+            (class_id, self.__mmap[start:end].decode("utf-8"))
+            for class_id, (start, end) in self.__pending.items()
+        ]
+
+        # the offsets of the mapped file are about to change
+        self.__unmap()
+
+        offsets = self.__write_file(
+            self.__file_path, self.__objects.items(), raw_items
+        )
+        self.__clear_dirty()
+
+        if self.__lazy:
+            stat = os.stat(self.__file_path)
+            self.__write_content(
+                self.__index_path,
+                json.dumps(
+                    {
+                        "size": stat.st_size,
+                        "mtime_ns": stat.st_mtime_ns,
+                        "offsets": offsets,
+                    },
+                    separators=(",", ":"),
+                ),
+            )
+
+        if self.__pending:
+            self.__pending = {
+                class_id: tuple(offsets[class_id])
+                for class_id in self.__pending
+            }
+
+            with open(self.__file_path, "rb") as json_file:
+                self.__mmap = mmap.mmap(
+                    json_file.fileno(), 0, access=mmap.ACCESS_READ
+                )
+
+    def __write_shards(self) -> None:
+        """Writes the JSON files of the models with changed objects."""
+        changed = set()
+
+        for class_id in self.__objects.dirty:
+            if class_id in self.__objects:
+                # ensure valid keys
+                self.__check_key(class_id, self.__objects[class_id])
+
+            changed.add(class_id.partition(".")[0])
+
+        os.makedirs(self.__shards_dir, exist_ok=True)
+
+        for model_name in changed.intersection(self.__models):
+            # merge the objects saved by earlier runs before overwriting them
+            self.__load_shards(model_name)
+
+            self.__write_file(
+                self.__shard_path(model_name),
+                self.all(model_name).items(),
+            )
+
+        self.__clear_dirty()
+
+    def __write_file(
+        self,
+        file_path: str,
+        items: Any = (),
+        raw_items: Any = (),
+        snapshot: Snapshot = None,
+    ) -> dict:
+        """Writes objects to a file with the codec of the storage.
+
+        With codecs that serialize every object on its own, only the objects
+        whose version changed since they were last written are serialized
+        again, the others reuse their cached fragment.
+
+        Args:
+            file_path (str): The path to the file.
+
+            items (Any, optional): The `(<class name>.<id>, object)` pairs to
+            write. Defaults to ().
+
+            raw_items (Any, optional): The `(<class name>.<id>, JSON)` pairs
+            of objects already serialized. Defaults to ().
+
+            snapshot (Snapshot, optional): A snapshot whose objects are
+            written instead of the items, as they were when it was taken.
+            Defaults to None.
+
+        Returns:
+            dict: In lazy mode, the `[start, end]` byte range of every object
+            in the file, otherwise an empty dictionary.
+        """
+        codec = self.__codec
+
+        if snapshot is None:
+            versions = self.__objects.versions
+
+            def to_dict(_: str, obj: Any) -> dict:
+                """Returns the state of an object."""
+                return obj.to_dict()
+
+        else:
+            items = snapshot.objects.items()
+            versions = snapshot.versions
+
+            def to_dict(class_id: str, _: Any) -> dict:
+                """Returns the state of an object in the snapshot."""
+                return snapshot.state(class_id)
+
+        if not isinstance(codec, FragmentCodec):
+            objects = {}
+            for class_id, obj in items:
+                # ensure valid keys
+                self.__check_key(class_id, obj)
+                objects[class_id] = to_dict(class_id, obj)
+
+            self.__write_content(file_path, codec.encode(objects))
+            return {}
+
+        class_ids = []
+        fragments = []
+
+        for class_id, obj in items:
+            version = versions.get(class_id)
+            cached = self.__fragments.get(class_id)
+
+            if cached is None or cached[0] != version:
+                # ensure valid keys
+                self.__check_key(class_id, obj)
+
+                cached = (
+                    version,
+                    codec.encode_member(class_id, to_dict(class_id, obj)),
+                )
+                self.__fragments[class_id] = cached
+
+            class_ids.append(class_id)
+            fragments.append(cached[1])
+
+        for class_id, value in raw_items:
+            class_ids.append(class_id)
+            fragments.append(f"    {json.dumps(class_id)}: {value}")
+
+        self.__write_content(file_path, codec.join(fragments))
+
+        if not self.__lazy:
+            return {}
+
+        offsets = {}
+        position = 2
+        for class_id, fragment in zip(class_ids, fragments):
+            if fragment.isascii():
+                end = position + len(fragment)
+            else:
+                end = position + len(fragment.encode("utf-8"))
+
+            # skip the indentation, the key and the colon before the value
+            offsets[class_id] = [position + len(json.dumps(class_id)) + 6, end]
+            position = end + 2
+
+        return offsets
+
+    def __write_content(self, file_path: str, content: Any) -> None:
+        """Replaces the content of a file atomically.
+
+        Args:
+            file_path (str): The path to the file.
+            content (Any): The bytes or text to write.
+        """
+
+        def write(temp_path: str) -> None:
+            """Writes the content to the temporary file."""
+            if isinstance(content, bytes):
+                with open(temp_path, "wb") as storage_file:
+                    storage_file.write(content)
+            else:
+                with open(temp_path, "w", encoding="utf-8") as storage_file:
+                    storage_file.write(content)
+
+        self.__replace_file(file_path, write)
+
+    @staticmethod
+    def __replace_file(file_path: str, write: Callable[[str], None]) -> None:
+        """Replaces a file with one written next to it, so that a crash never
+        leaves it half written.
+
+        The new file is synced to disk before it replaces the old one, then
+        the directory is synced so the replacement itself is durable.
+
+        Args:
+            file_path (str): The path to the file.
+
+            write (Callable[[str], None]): Writes the new file to the
+            temporary path it is given.
+        """
+        temp_path = f"{file_path}.{os.getpid()}.tmp"
+
+        try:
+            write(temp_path)
+            _fsync(temp_path)
+            os.replace(temp_path, file_path)
+        except BaseException:
+            with suppress(FileNotFoundError):
+                os.remove(temp_path)
+            raise
+
+        _fsync(os.path.dirname(file_path) or os.curdir)
+
+    def __clear_dirty(self) -> None:
+        """Forgets the changes made since the last save once written."""
+        for class_id in self.__objects.dirty:
+            if class_id not in self.__objects:
+                self.__fragments.pop(class_id, None)
+
+        self.__objects.dirty.clear()
+
+    def __replay_journal(self) -> None:
+        """Applies the records in the journal to the objects dictionary.
+
+        A record is a compact JSON array on its own line, either
+        `["set", <key>, <dictionary representation>]` or `["del", <key>]`.
+        A partially written last line (e.g. after a crash) is ignored.
+        """
+        self.__journal_records = 0
+
+        try:
+            with open(self.__journal_path, "r", encoding="utf-8") as journal:
+                lines = journal.readlines()
+        except (FileNotFoundError, PermissionError):
+            return
+
+        for line_number, line in enumerate(lines, start=1):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                if line_number == len(lines):
+                    break
+                raise
+
+            self.__unpend(record[1])
+
+            if record[0] == "set":
+                json_dict = record[2]
+                self.__objects.load(
+                    record[1],
+                    self.__models[json_dict["__class__"]](**json_dict),
+                )
+            elif record[0] == "del":
+                self.__objects.unload(record[1])
+
+            self.__journal_records += 1
+
+    def __append_journal(self) -> None:
+        """Appends a record for every object changed since the last save."""
+        records = []
+
+        for class_id in self.__objects.dirty:
+            if class_id in self.__objects:
+                obj = self.__objects[class_id]
+                self.__check_key(class_id, obj)
+
+                records.append(["set", class_id, obj.to_dict()])
+            elif class_id in self.__persisted:
+                records.append(["del", class_id])
+
+        if records:
+            with open(self.__journal_path, "a", encoding="utf-8") as journal:
+                journal.writelines(
+                    json.dumps(record, separators=(",", ":")) + "\n"
+                    for record in records
+                )
+                journal.flush()
+                os.fsync(journal.fileno())
 
-        for class_id, obj in self.__objects.items():
-            # ensure valid keys
-            if class_id != f"{obj.__class__.__name__}.{obj.id}":
-                raise KeyError("invalid key. key must be <class name>.<id>")
+        for record in records:
+            if record[0] == "set":
+                self.__persisted.add(record[1])
+            else:
+                self.__persisted.discard(record[1])
 
-            instances[class_id] = obj.to_dict()
+        self.__clear_dirty()
 
-        with open(self.__file_path, "w", encoding="utf-8") as json_file:
-            json.dump(instances, json_file, indent=4)
+        self.__journal_records += len(records)
+        if self.__journal_records >= self.__checkpoint_interval:
+            self.__checkpoint()
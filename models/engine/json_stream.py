@@ -0,0 +1,147 @@
+#!/usr/bin/python3
+
+"""This module defines a streaming reader for the JSON object saved by the
+file storage engine."""
+
+import re
+import json
+from json.decoder import scanstring
+from typing import Iterator, TextIO
+
+CHUNK_SIZE = 64 * 1024
+
+MEMBER = re.compile(
+    r'[ \t\n\r]*("[^"\\]*(?:\\.[^"\\]*)*")[ \t\n\r]*:[ \t\n\r]*'
+)
+DELIMITER = re.compile(r"[ \t\n\r]*([,}])")
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def _byte_length(text: str) -> int:
+    """Returns the number of bytes of a string encoded as UTF-8."""
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+def iter_members(
+    json_file: TextIO, chunk_size: int = CHUNK_SIZE
+) -> Iterator[tuple]:
+    """Yields the members of the JSON object in a file one at a time.
+
+    The file is read in chunks of `chunk_size` characters and every value is
+    decoded as soon as it is complete, so only the current chunk and the
+    current value are held in memory. The file should be opened with
+    `newline=""` for the byte ranges to match the file.
+
+    Args:
+        json_file (TextIO): The file containing a JSON object.
+
+        chunk_size (int, optional): The number of characters read at a time.
+        Defaults to 64 KiB.
+
+    Yields:
+        tuple: The `(key, value, start, end)` of every member, where `start`
+        and `end` are the byte range of the value in the file.
+
+    Raises:
+        json.JSONDecodeError: If the file does not contain a JSON object.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    # the byte offset in the file of `buffer[mark]`
+    mark = mark_bytes = 0
+
+    def fill() -> bool:
+        """Reads the next chunk, dropping what was consumed before `mark`."""
+        nonlocal buffer, pos, mark, eof
+
+        chunk = "" if eof else json_file.read(chunk_size)
+        if not chunk:
+            eof = True
+            return False
+
+        buffer = buffer[mark:] + chunk
+        pos -= mark
+        mark = 0
+
+        return True
+
+    def peek() -> str:
+        """Returns the next non-whitespace character, or "" at the end."""
+        nonlocal pos
+
+        pos = WHITESPACE.match(buffer, pos).end()
+        while pos == len(buffer) and fill():
+            pos = WHITESPACE.match(buffer, pos).end()
+
+        return buffer[pos:pos + 1]
+
+    def decode(scanner: callable) -> tuple:
+        """Decodes the token at `pos`, reading more chunks as needed."""
+        while True:
+            try:
+                value, end = scanner(pos)
+            except json.JSONDecodeError:
+                if not fill():
+                    raise
+                continue
+
+            # a number may continue in the next chunk
+            if end < len(buffer) or not fill():
+                return value, end
+
+    def fail(message: str) -> None:
+        """Raises a decode error at the current position."""
+        raise json.JSONDecodeError(message, buffer, pos)
+
+    if peek() != "{":
+        fail("Expecting '{'")
+    pos += 1
+
+    done = peek() == "}"
+    if done:
+        pos += 1
+
+    while not done:
+        # the common case, where the key is well within the buffer
+        found = MEMBER.match(buffer, pos)
+        if found and found.end() < len(buffer):
+            key = scanstring(buffer, found.start(1) + 1)[0]
+            pos = found.end()
+        else:
+            if peek() != '"':
+                fail("Expecting property name enclosed in double quotes")
+
+            key, pos = decode(lambda start: scanstring(buffer, start + 1))
+
+            if peek() != ":":
+                fail("Expecting ':' delimiter")
+            pos += 1
+            peek()
+
+        value, end = decode(lambda start: decoder.raw_decode(buffer, start))
+
+        start_bytes = mark_bytes + _byte_length(buffer[mark:pos])
+        mark_bytes = start_bytes + _byte_length(buffer[pos:end])
+        mark = pos = end
+
+        yield key, value, start_bytes, mark_bytes
+
+        found = DELIMITER.match(buffer, pos)
+        if found and found.end() < len(buffer):
+            delimiter = found.group(1)
+            pos = found.end()
+        else:
+            delimiter = peek()
+            pos += 1
+
+        if delimiter == "}":
+            done = True
+        elif delimiter != ",":
+            pos -= 1
+            fail("Expecting ',' delimiter")
+
+    if peek():
+        fail("Extra data")
@@ -0,0 +1,593 @@
+#!/usr/bin/python3
+
+"""This module defines the dictionary used by the storage engines to hold
+every object."""
+
+from itertools import count
+from typing import Any, Callable, List, Optional
+from weakref import WeakSet
+from models.engine.columnar import ColumnarProjection
+from models.engine.range_index import RangeIndex, is_number
+from models.engine.read_write_lock import ReadWriteLock
+from models.engine.spatial_index import SpatialIndex, is_location
+from models.engine.snapshot import Snapshot
+from models.engine.text_index import TextIndex
+
+MISSING = object()
+
+
+def indexed_attributes(cls: type) -> tuple:
+    """Returns the names of the attributes of a model kept in an index.
+
+    Args:
+        cls (type): The model.
+
+    Returns:
+        tuple: The names of the attributes.
+    """
+    return (
+        getattr(cls, "_indexes", ())
+        + tuple(getattr(cls, "_references", {}))
+        + getattr(cls, "_range_indexes", ())
+        + getattr(cls, "_location_index", ())
+        + getattr(cls, "_text_indexes", ())
+    )
+
+
+class ObjectRegistry(dict):
+    """Defines the objects dictionary of a storage engine.
+
+    It behaves like a regular dictionary, but it keeps track of the keys
+    added, replaced or removed since the last save (the dirty keys). Every key
+    also carries a version number that changes whenever the object stored
+    under it changes, which lets the storage engines cache what they have
+    already serialized. The objects are also partitioned by the class name
+    in their key, so the objects of a model are found without a full scan,
+    and the attributes a model lists in its `_indexes` are kept in hash
+    indexes, so the objects with a given value are found the same way. So
+    are the attributes holding the ids of other objects, listed in its
+    `_references`, which makes these indexes the reverse adjacency maps of
+    the relationships between models: a list of ids is indexed under every id
+    it holds. The numeric attributes a model lists in its `_range_indexes` are
+    kept in range indexes, which find the objects whose value is within
+    bounds, and the coordinates named by its `_location_index` in a spatial
+    index. The text attributes a model lists in its `_text_indexes` are kept
+    in inverted indexes, which rank the objects mentioning some words.
+
+    The objects of a class can also be kept in a columnar projection, once
+    `project()` is called for it, which is updated along with the indexes.
+
+    Every class also has a generation number, which changes whenever one of
+    its objects is added, changed or removed, so that what is computed from
+    the objects of a class can be cached until they change.
+
+    Point-in-time snapshots of the objects are taken with `snapshot()`, and
+    kept consistent by calling `preserve()` before an object changes.
+
+    The dictionary doesn't lock itself: the storage engines sharing it hold
+    its `lock` for reading or writing around what they do with it.
+    """
+
+    def __init__(self) -> None:
+        """Initializes an empty objects dictionary."""
+        super().__init__()
+        self.dirty = set()
+        self.versions = {}
+        self.partitions = {}
+        self.generations = {}
+
+        # {(class name, attribute): {value: {key: object}}}, which includes
+        # the reverse adjacency maps of the references to other objects
+        self.indexes = {}
+
+        # {(class name, attribute): RangeIndex}
+        self.ranges = {}
+
+        # {class name: SpatialIndex}
+        self.locations = {}
+
+        # {(class name, attribute): TextIndex}
+        self.texts = {}
+
+        # {class name: ColumnarProjection}
+        self.projections = {}
+
+        # the snapshots that may still be read
+        self.snapshots = WeakSet()
+
+        # shared by every storage engine using the dictionary
+        self.lock = ReadWriteLock()
+
+        # the indexes of every key, with the attributes they index and the
+        # hash index buckets, to remove it from them once its values changed
+        self.__indexed = {}
+
+        self.__counter = count(1)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        """Adds or replaces an object and marks it dirty."""
+        super().__setitem__(key, value)
+        self.__add(key, value)
+        self.touch(key)
+
+    def __delitem__(self, key: str) -> None:
+        """Removes an object and marks it dirty."""
+        super().__delitem__(key)
+        self.__forget(key)
+
+    def __ior__(self, other: Any) -> "ObjectRegistry":
+        """Updates the dictionary in place with the `|=` operator."""
+        self.update(other)
+        return self
+
+    def touch(self, key: str) -> None:
+        """Marks the object stored under `key` as changed.
+
+        Args:
+            key (str): The key of the object in the dictionary.
+        """
+        self.dirty.add(key)
+        self.versions[key] = version = next(self.__counter)
+        self.generations[key.partition(".")[0]] = version
+
+    def snapshot(self) -> Snapshot:
+        """Takes a snapshot of the objects.
+
+        Returns:
+            Snapshot: The snapshot, which is kept consistent until closed.
+        """
+        snapshot = Snapshot(
+            dict(self), dict(self.versions), next(self.__counter)
+        )
+        self.snapshots.add(snapshot)
+
+        return snapshot
+
+    def preserve(self, key: str, value: Any) -> None:
+        """Keeps the state of an object about to change in the open snapshots
+        that hold it.
+
+        Args:
+            key (str): The key of the object in the dictionary.
+            value (Any): The object.
+        """
+        for snapshot in list(self.snapshots):
+            if snapshot.closed:
+                self.snapshots.discard(snapshot)
+            else:
+                snapshot.preserve(key, value)
+
+    def generation(self, class_name: str) -> int:
+        """Returns the generation of a class, which changes whenever one of
+        its objects is added, changed or removed.
+
+        Args:
+            class_name (str): The class name.
+
+        Returns:
+            int: The generation number.
+        """
+        return self.generations.get(class_name, 0)
+
+    def load(self, key: str, value: Any) -> None:
+        """Adds an object read from disk without marking it dirty.
+
+        Args:
+            key (str): The key of the object in the dictionary.
+            value (Any): The object.
+        """
+        super().__setitem__(key, value)
+        self.__add(key, value, bulk=True)
+        self.dirty.discard(key)
+        self.versions[key] = version = next(self.__counter)
+        self.generations[key.partition(".")[0]] = version
+
+    def load_many(self, objects: dict) -> None:
+        """Adds many objects read from disk without marking them dirty.
+
+        Args:
+            objects (dict): The objects to add, by key.
+        """
+        super().update(objects)
+        for key, value in objects.items():
+            self.__add(key, value, bulk=True)
+
+        self.dirty.difference_update(objects)
+        self.versions.update(zip(objects, self.__counter))
+        for key in objects:
+            self.generations[key.partition(".")[0]] = self.versions[key]
+
+    def unload(self, key: str) -> None:
+        """Removes an object deleted on disk without marking it dirty.
+
+        Args:
+            key (str): The key of the object in the dictionary.
+        """
+        super().pop(key, None)
+        self.__remove(key)
+        self.dirty.discard(key)
+        self.versions.pop(key, None)
+        self.generations[key.partition(".")[0]] = next(self.__counter)
+
+    def update(self, *args, **kwargs) -> None:
+        """Adds or replaces many objects and marks them dirty."""
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        """Returns the object under `key`, adding `default` if missing."""
+        if key not in self:
+            self[key] = default
+
+        return self[key]
+
+    def pop(self, key: str, *default) -> Any:
+        """Removes an object and returns it, marking it dirty."""
+        if key not in self:
+            return super().pop(key, *default)
+
+        value = super().pop(key)
+        self.__forget(key)
+
+        return value
+
+    def popitem(self) -> tuple:
+        """Removes the last object added and returns it with its key."""
+        key, value = super().popitem()
+        self.__forget(key)
+
+        return key, value
+
+    def clear(self) -> None:
+        """Removes every object and marks them all dirty."""
+        self.dirty.update(self)
+        for class_name in self.partitions:
+            self.generations[class_name] = next(self.__counter)
+        self.versions.clear()
+        self.partitions.clear()
+        self.indexes.clear()
+        self.ranges.clear()
+        self.locations.clear()
+        self.texts.clear()
+        for class_name, projection in self.projections.items():
+            self.projections[class_name] = ColumnarProjection(
+                projection.model
+            )
+        self.__indexed.clear()
+        super().clear()
+
+    def partition(self, class_name: str) -> dict:
+        """Returns the objects whose key starts with a class name.
+
+        Args:
+            class_name (str): The class name.
+
+        Returns:
+            dict: The objects of the class by key. It must not be modified.
+        """
+        return self.partitions.get(class_name, {})
+
+    def lookup(
+        self, class_name: str, attribute: str, value: Any
+    ) -> Optional[dict]:
+        """Returns the objects of a class whose indexed attribute has a value.
+
+        For a reference holding a list of ids, the objects returned are those
+        whose list contains the value.
+
+        Args:
+            class_name (str): The class name.
+            attribute (str): The name of the attribute.
+            value (Any): The value of the attribute.
+
+        Returns:
+            Optional[dict]: The objects by key, which must not be modified, or
+            None if the attribute isn't indexed or the value isn't hashable.
+        """
+        index = self.indexes.get((class_name, attribute))
+        if index is None:
+            return None
+
+        try:
+            return index.get(value, {})
+        except TypeError:
+            return None
+
+    def range(
+        self, class_name: str, attribute: str, low: Any, high: Any
+    ) -> Optional[List[str]]:
+        """Returns the keys of the objects of a class whose range indexed
+        attribute is between two bounds.
+
+        Args:
+            class_name (str): The class name.
+            attribute (str): The name of the attribute.
+            low (Any): The lowest value included, or None.
+            high (Any): The highest value included, or None.
+
+        Returns:
+            Optional[List[str]]: The keys ordered by value, or None if the
+            attribute isn't range indexed.
+        """
+        index = self.ranges.get((class_name, attribute))
+        if index is None:
+            return None
+
+        return index.range(low, high)
+
+    def project(self, class_name: str, model: type) -> ColumnarProjection:
+        """Returns the columnar projection of the objects of a class, which
+        is built on the first call and kept up to date afterwards.
+
+        Args:
+            class_name (str): The class name.
+            model (type): The model of the objects, whose class attributes
+            tell the columns to build.
+
+        Returns:
+            ColumnarProjection: The projection.
+        """
+        projection = self.projections.get(class_name)
+
+        if projection is None:
+            projection = ColumnarProjection(model)
+            for key, value in self.partition(class_name).items():
+                projection.add(key, value)
+
+            self.projections[class_name] = projection
+
+        return projection
+
+    def restore_text_index(
+        self, class_name: str, attribute: str, index: TextIndex
+    ) -> None:
+        """Uses a text index read from disk, unless there already is one.
+
+        The objects loaded afterwards are only tokenized if their text
+        differs from the text in the index.
+
+        Args:
+            class_name (str): The class name.
+            attribute (str): The name of the text attribute.
+            index (TextIndex): The text index.
+        """
+        self.texts.setdefault((class_name, attribute), index)
+
+    def prune_text_indexes(self, keep: Callable[[str], bool]) -> None:
+        """Removes the keys of the objects no longer indexed from the text
+        indexes, e.g. those left over from a text index read from disk.
+
+        Args:
+            keep (Callable[[str], bool]): Tells whether a key that isn't
+            indexed should be kept anyway, e.g. because it isn't loaded yet.
+        """
+        for index in self.texts.values():
+            index.prune(
+                lambda key: any(
+                    entry[1] is index for entry in self.__indexed.get(key, ())
+                )
+                or keep(key)
+            )
+
+    def reindex(self, key: str, attributes: tuple = ()) -> None:
+        """Updates the indexes after the attributes of an object changed.
+
+        Only the indexes of the attributes that changed are updated, and a
+        text index is left alone unless the text changed.
+
+        Args:
+            key (str): The key of the object in the dictionary.
+
+            attributes (tuple, optional): The names of the attributes that
+            changed. Defaults to (), meaning they all may have changed.
+        """
+        if key in self:
+            attributes = set(attributes) or None
+            self.__unindex(key, attributes, texts=False)
+            self.__index(key, self[key], attributes=attributes)
+            self.__project(key, self[key])
+
+    def __add(self, key: str, value: Any, bulk: bool = False) -> None:
+        """Adds an object to its partition and to the indexes of its class."""
+        self.__partition(key)[key] = value
+        self.__unindex(key, texts=False)
+        self.__index(key, value, bulk)
+        self.__project(key, value)
+
+    def __remove(self, key: str) -> None:
+        """Removes a key from its partition and from the indexes."""
+        self.__unpartition(key)
+        self.__unindex(key)
+
+        projection = self.projections.get(key.partition(".")[0])
+        if projection is not None:
+            projection.remove(key)
+
+    def __project(self, key: str, value: Any) -> None:
+        """Adds an object to the projection of its class, if there is one,
+        or updates its row."""
+        projection = self.projections.get(key.partition(".")[0])
+        if projection is not None:
+            projection.add(key, value)
+
+    def __index(
+        self,
+        key: str,
+        value: Any,
+        bulk: bool = False,
+        attributes: Optional[set] = None,
+    ) -> None:
+        """Adds an object to the indexes of the attributes of its class.
+
+        Attributes that are missing, whose value isn't hashable or, for range
+        and text indexes, isn't a number or a non-empty string are left out
+        of the indexes, as are invalid coordinates. A reference holding a
+        list of ids is indexed under every id. With `attributes`, only the
+        indexes of these attributes are updated.
+        """
+        cls = type(value)
+        references = getattr(cls, "_references", {})
+        hashed = dict.fromkeys(getattr(cls, "_indexes", ()))
+        hashed.update(dict.fromkeys(references))
+        range_attributes = getattr(cls, "_range_indexes", ())
+        location = getattr(cls, "_location_index", ())
+        text_attributes = getattr(cls, "_text_indexes", ())
+        if not (hashed or range_attributes or location or text_attributes):
+            return
+
+        if attributes is not None:
+            hashed = [name for name in hashed if name in attributes]
+            range_attributes = [
+                name for name in range_attributes if name in attributes
+            ]
+            text_attributes = [
+                name for name in text_attributes if name in attributes
+            ]
+            if attributes.isdisjoint(location):
+                location = ()
+
+        class_name = key.partition(".")[0]
+
+        # [(attribute names, index, value in a hash index)]
+        entries = self.__indexed.get(key, [])
+
+        for attribute in hashed:
+            attr_value = getattr(value, attribute, MISSING)
+            if attr_value is MISSING:
+                continue
+
+            index = self.indexes.get((class_name, attribute))
+            if index is None:
+                index = self.indexes[(class_name, attribute)] = {}
+
+            if attribute in references and isinstance(attr_value, list):
+                attr_values = dict.fromkeys(
+                    item for item in attr_value if isinstance(item, str)
+                )
+            else:
+                attr_values = (attr_value,)
+
+            for attr_value in attr_values:
+                try:
+                    bucket = index.get(attr_value)
+                except TypeError:
+                    continue
+
+                if bucket is None:
+                    bucket = index[attr_value] = {}
+
+                bucket[key] = value
+                entries.append(((attribute,), index, attr_value))
+
+        for attribute in range_attributes:
+            attr_value = getattr(value, attribute, MISSING)
+            if not is_number(attr_value):
+                continue
+
+            index = self.ranges.get((class_name, attribute))
+            if index is None:
+                index = self.ranges[(class_name, attribute)] = RangeIndex()
+
+            index.add(key, attr_value, bulk)
+            entries.append(((attribute,), index, None))
+
+        if location:
+            latitude = getattr(value, location[0], None)
+            longitude = getattr(value, location[1], None)
+
+            if is_location(latitude, longitude):
+                index = self.locations.get(class_name)
+                if index is None:
+                    index = self.locations[class_name] = SpatialIndex()
+
+                index.add(key, latitude, longitude)
+                entries.append((location, index, None))
+
+        for attribute in text_attributes:
+            attr_value = getattr(value, attribute, None)
+            index = self.texts.get((class_name, attribute))
+            indexed = [entry for entry in entries if entry[1] is index]
+
+            if not isinstance(attr_value, str) or not attr_value:
+                if index is not None:
+                    index.remove(key)
+                for entry in indexed:
+                    entries.remove(entry)
+                continue
+
+            if index is None:
+                index = self.texts[(class_name, attribute)] = TextIndex()
+
+            # costs nothing when the text didn't change
+            index.add(key, attr_value)
+            if not indexed:
+                entries.append(((attribute,), index, None))
+
+        if entries:
+            self.__indexed[key] = entries
+        else:
+            self.__indexed.pop(key, None)
+
+    def __unindex(
+        self, key: str, attributes: Optional[set] = None, texts: bool = True
+    ) -> None:
+        """Removes a key from the indexes it was added to.
+
+        Args:
+            key (str): The key.
+
+            attributes (Optional[set], optional): The names of the attributes
+            whose indexes the key is removed from. Defaults to None, meaning
+            every index.
+
+            texts (bool, optional): Whether the key is removed from the text
+            indexes, which are otherwise updated by `__index()` only if the
+            text changed. Defaults to True.
+        """
+        entries = self.__indexed.pop(key, None)
+        if entries is None:
+            return
+
+        kept = []
+        for entry in entries:
+            names, index, attr_value = entry
+            if (attributes is not None and attributes.isdisjoint(names)) or (
+                not texts and isinstance(index, TextIndex)
+            ):
+                kept.append(entry)
+            elif isinstance(index, dict):
+                bucket = index[attr_value]
+
+                del bucket[key]
+                if not bucket:
+                    del index[attr_value]
+            else:
+                index.remove(key)
+
+        if kept:
+            self.__indexed[key] = kept
+
+    def __partition(self, key: str) -> dict:
+        """Returns the partition of a key, creating it if needed."""
+        class_name = key.partition(".")[0]
+
+        partition = self.partitions.get(class_name)
+        if partition is None:
+            partition = self.partitions[class_name] = {}
+
+        return partition
+
+    def __unpartition(self, key: str) -> None:
+        """Removes a key from its partition."""
+        partition = self.partitions.get(key.partition(".")[0])
+
+        if partition is not None:
+            partition.pop(key, None)
+
+    def __forget(self, key: str) -> None:
+        """Marks a removed key dirty and drops its version, partition and
+        indexes."""
+        self.__remove(key)
+        self.dirty.add(key)
+        self.versions.pop(key, None)
+        self.generations[key.partition(".")[0]] = next(self.__counter)
@@ -0,0 +1,536 @@
+#!/usr/bin/python3
+
+"""This module defines the filter language of the `where` and `explain`
+commands, and the planner that picks an index to answer a filter.
+
+A filter compares attributes to literals and combines the comparisons with
+`and`, `or`, `not` and parentheses, e.g.
+`price_by_night < 100 and (max_guest >= 4 or city_id == "1234")`. Strings
+are quoted, and numbers, `True`, `False` and `None` are the other literals.
+
+The planner turns a filter into a plan, which lists the candidates to check
+against the filter: the objects of a hash index bucket, of a range of a range
+index, the union of such plans for an `or`, or every object of the model.
+For an `and`, the plan with the fewest candidates is used. When no index
+helps and the model is kept in a columnar projection, the comparisons are
+run over its columns instead: only the objects whose values the columns
+can't compare are then checked.
+"""
+
+import re
+from ast import literal_eval
+from operator import eq, ge, gt, le, lt, ne
+from typing import Any, Callable, Iterable, List, Optional, Set, Tuple
+from models.engine.columnar import ColumnarProjection
+from models.engine.object_registry import MISSING, ObjectRegistry
+from models.engine.range_index import is_number
+
+OPERATORS = {"==": eq, "=": eq, "!=": ne, "<": lt, "<=": le, ">": gt, ">=": ge}
+KEYWORDS = {"and", "or", "not"}
+CONSTANTS = {
+    "True": True,
+    "true": True,
+    "False": False,
+    "false": False,
+    "None": None,
+    "null": None,
+}
+
+TOKEN = re.compile(
+    r"""\s*(?:
+        (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+        |(?P<number>-?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)
+        |(?P<operator>==|!=|<=|>=|<|>|=)
+        |(?P<paren>[()])
+        |(?P<name>[A-Za-z_]\w*)
+    )""",
+    re.VERBOSE,
+)
+
+
+class Comparison:
+    """Defines the comparison of an attribute to a literal.
+
+    Objects missing the attribute, or whose value can't be compared to the
+    literal, don't match. Like the range indexes, a number only compares to
+    numbers: a value that isn't one (see `is_number()`), `True` and `False`
+    included, only matches `!=`.
+    """
+
+    def __init__(self, attribute: str, operator: str, value: Any) -> None:
+        """Initializes a comparison.
+
+        Args:
+            attribute (str): The name of the attribute.
+            operator (str): The comparison operator, e.g. `<=`.
+            value (Any): The literal.
+        """
+        self.attribute = attribute
+        self.operator = "==" if operator == "=" else operator
+        self.value = value
+        self.__compare = OPERATORS[operator]
+        self.__numeric = is_number(value)
+
+    def __str__(self) -> str:
+        """Returns the comparison as written in a filter."""
+        return f"{self.attribute} {self.operator} {self.value!r}"
+
+    def matches(self, obj: Any) -> bool:
+        """Checks whether an object matches the comparison."""
+        value = getattr(obj, self.attribute, MISSING)
+        if value is MISSING:
+            return False
+
+        if self.__numeric and not is_number(value):
+            return self.operator == "!="
+
+        try:
+            return bool(self.__compare(value, self.value))
+        except TypeError:
+            return False
+
+
+class And:
+    """Defines the conjunction of filters."""
+
+    def __init__(self, children: List[Any]) -> None:
+        """Initializes a conjunction.
+
+        Args:
+            children (List[Any]): The filters that must all match.
+        """
+        self.children = children
+
+    def __str__(self) -> str:
+        """Returns the conjunction as written in a filter."""
+        return "(" + " and ".join(str(child) for child in self.children) + ")"
+
+    def matches(self, obj: Any) -> bool:
+        """Checks whether an object matches every filter."""
+        return all(child.matches(obj) for child in self.children)
+
+
+class Or:
+    """Defines the disjunction of filters."""
+
+    def __init__(self, children: List[Any]) -> None:
+        """Initializes a disjunction.
+
+        Args:
+            children (List[Any]): The filters of which one must match.
+        """
+        self.children = children
+
+    def __str__(self) -> str:
+        """Returns the disjunction as written in a filter."""
+        return "(" + " or ".join(str(child) for child in self.children) + ")"
+
+    def matches(self, obj: Any) -> bool:
+        """Checks whether an object matches any filter."""
+        return any(child.matches(obj) for child in self.children)
+
+
+class Not:
+    """Defines the negation of a filter."""
+
+    def __init__(self, child: Any) -> None:
+        """Initializes a negation.
+
+        Args:
+            child (Any): The filter that must not match.
+        """
+        self.child = child
+
+    def __str__(self) -> str:
+        """Returns the negation as written in a filter."""
+        return f"not {self.child}"
+
+    def matches(self, obj: Any) -> bool:
+        """Checks whether an object doesn't match the filter."""
+        return not self.child.matches(obj)
+
+
+class _Parser:
+    """Defines a recursive descent parser of filters."""
+
+    def __init__(self, text: str) -> None:
+        """Splits a filter into tokens."""
+        self.tokens = []
+
+        position = 0
+        text = text.rstrip()
+        while position < len(text):
+            match = TOKEN.match(text, position)
+            if match is None or match.end() == position:
+                raise ValueError(f"unexpected {text[position:].strip()!r}")
+
+            self.tokens.append((match.lastgroup, match.group(match.lastgroup)))
+            position = match.end()
+
+        self.position = 0
+
+    def peek(self) -> tuple:
+        """Returns the next token, without consuming it."""
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+
+        return None, None
+
+    def take(self) -> tuple:
+        """Consumes the next token and returns it."""
+        token = self.peek()
+        if token[0] is None:
+            raise ValueError("unexpected end of filter")
+
+        self.position += 1
+        return token
+
+    def accept(self, keyword: str) -> bool:
+        """Consumes the next token if it is a given keyword or parenthesis."""
+        kind, text = self.peek()
+        if kind in ("name", "paren") and text == keyword:
+            self.position += 1
+            return True
+
+        return False
+
+    def parse(self) -> Any:
+        """Parses the whole filter."""
+        node = self.disjunction()
+
+        kind, text = self.peek()
+        if kind is not None:
+            raise ValueError(f"unexpected {text!r}")
+
+        return node
+
+    def disjunction(self) -> Any:
+        """Parses `<conjunction> [or <conjunction>]...`."""
+        children = [self.conjunction()]
+        while self.accept("or"):
+            children.append(self.conjunction())
+
+        return children[0] if len(children) == 1 else Or(children)
+
+    def conjunction(self) -> Any:
+        """Parses `<negation> [and <negation>]...`."""
+        children = [self.negation()]
+        while self.accept("and"):
+            children.append(self.negation())
+
+        return children[0] if len(children) == 1 else And(children)
+
+    def negation(self) -> Any:
+        """Parses `[not] <negation>`, a parenthesized filter or a
+        comparison."""
+        if self.accept("not"):
+            return Not(self.negation())
+
+        if self.accept("("):
+            node = self.disjunction()
+            if not self.accept(")"):
+                raise ValueError("missing closing parenthesis")
+            return node
+
+        kind, attribute = self.take()
+        if kind != "name" or attribute in KEYWORDS:
+            raise ValueError(f"expected an attribute name, got {attribute!r}")
+
+        kind, operator = self.take()
+        if kind != "operator":
+            raise ValueError(f"expected an operator, got {operator!r}")
+
+        return Comparison(attribute, operator, self.literal())
+
+    def literal(self) -> Any:
+        """Parses a string, a number or a constant."""
+        kind, text = self.take()
+
+        if kind in ("string", "number"):
+            return literal_eval(text)
+
+        if kind == "name" and text in CONSTANTS:
+            return CONSTANTS[text]
+
+        raise ValueError(f"expected a value, got {text!r}")
+
+
+def parse(text: str) -> Any:
+    """Parses a filter into a tree of comparisons, `And`, `Or` and `Not`.
+
+    Args:
+        text (str): The filter.
+
+    Returns:
+        Any: The root of the tree, which has a `matches(obj)` method.
+
+    Raises:
+        ValueError: If the filter is empty or invalid.
+    """
+    if not text or not text.strip():
+        raise ValueError("empty filter")
+
+    return _Parser(text).parse()
+
+
+class Plan:
+    """Defines how the candidates of a filter are found.
+
+    Attributes:
+        description (str): What the plan does, for `explain`.
+        estimate (int): The number of candidates the plan yields.
+        scan (bool): Whether the plan yields every object of the model.
+    """
+
+    def __init__(
+        self,
+        description: str,
+        estimate: int,
+        candidates: Callable[[], Iterable[Any]],
+        scan: bool = False,
+        matches: Callable[[], Iterable[Any]] = None,
+    ) -> None:
+        """Initializes a plan.
+
+        Args:
+            description (str): What the plan does.
+            estimate (int): The number of candidates, matches included.
+            candidates (Callable[[], Iterable[Any]]): Yields the candidates.
+
+            scan (bool, optional): Whether the plan yields every object of
+            the model. Defaults to False.
+
+            matches (Callable[[], Iterable[Any]], optional): Yields the
+            objects known to match the filter, which don't need to be checked
+            and aren't yielded by `candidates`. Defaults to None, meaning
+            none are known.
+        """
+        self.description = description
+        self.estimate = estimate
+        self.candidates = candidates
+        self.scan = scan
+        self.matches = matches if matches is not None else tuple
+
+
+def plan(
+    node: Any, model_name: str, model: type, objects: ObjectRegistry
+) -> Plan:
+    """Picks the plan with the fewest candidates for a filter.
+
+    Args:
+        node (Any): The filter, as returned by `parse()`.
+        model_name (str): The name of the model.
+        model (type): The model.
+        objects (ObjectRegistry): The objects, with their indexes.
+
+    Returns:
+        Plan: The plan. Its candidates, along with its known matches, are a
+        superset of the matching objects, and must still be checked against
+        the filter.
+    """
+    planner = _Planner(model_name, model, objects)
+    chosen = planner.plan(node)
+
+    if chosen.scan:
+        return planner.columnar(node) or chosen
+
+    return chosen
+
+
+class _Planner:
+    """Defines the planner of the filters on the objects of a model."""
+
+    def __init__(
+        self, model_name: str, model: type, objects: ObjectRegistry
+    ) -> None:
+        """Initializes a planner."""
+        self.model_name = model_name
+        self.objects = objects
+        self.hashed = set(getattr(model, "_indexes", ())).union(
+            getattr(model, "_references", {})
+        )
+        self.ranged = set(getattr(model, "_range_indexes", ()))
+
+    def plan(self, node: Any) -> Plan:
+        """Returns the plan with the fewest candidates for a filter."""
+        if isinstance(node, Comparison):
+            return self.comparison(node) or self.scan()
+
+        if isinstance(node, And):
+            return self.conjunction(node)
+
+        if isinstance(node, Or):
+            plans = [self.plan(child) for child in node.children]
+            if any(child.scan for child in plans):
+                return self.scan()
+
+            return self.union(plans)
+
+        return self.scan()
+
+    def scan(self) -> Plan:
+        """Returns the plan checking every object of the model."""
+        partition = self.objects.partition(self.model_name)
+
+        return Plan(
+            f"full scan of {self.model_name}",
+            len(partition),
+            partition.values,
+            scan=True,
+        )
+
+    def comparison(self, node: Comparison) -> Optional[Plan]:
+        """Returns the plan of a comparison using an index, if any."""
+        if node.operator == "==" and node.attribute in self.hashed:
+            return self.lookup(node.attribute, node.value)
+
+        bounds = {
+            "==": (node.value, node.value),
+            "<": (None, node.value),
+            "<=": (None, node.value),
+            ">": (node.value, None),
+            ">=": (node.value, None),
+        }.get(node.operator)
+
+        if (
+            bounds is not None
+            and node.attribute in self.ranged
+            and is_number(node.value)
+        ):
+            return self.range(node.attribute, *bounds)
+
+        return None
+
+    def conjunction(self, node: And) -> Plan:
+        """Returns the plan with the fewest candidates among those of the
+        filters of a conjunction.
+
+        The bounds of the comparisons on the same range indexed attribute are
+        merged first, e.g. `max_guest > 2 and max_guest <= 6`.
+        """
+        plans = []
+        bounds = {}
+
+        for child in node.children:
+            if (
+                isinstance(child, Comparison)
+                and child.attribute in self.ranged
+                and child.operator in ("<", "<=", ">", ">=")
+                and is_number(child.value)
+            ):
+                low, high = bounds.get(child.attribute, (None, None))
+                if child.operator in (">", ">="):
+                    low = child.value if low is None else max(low, child.value)
+                else:
+                    high = (
+                        child.value if high is None else min(high, child.value)
+                    )
+                bounds[child.attribute] = (low, high)
+            else:
+                plans.append(self.plan(child))
+
+        for attribute, (low, high) in bounds.items():
+            plans.append(self.range(attribute, low, high))
+
+        return min(plans, key=lambda child: child.estimate)
+
+    def lookup(self, attribute: str, value: Any) -> Plan:
+        """Returns the plan reading a bucket of a hash index."""
+        bucket = self.objects.lookup(self.model_name, attribute, value)
+        if bucket is None:
+            # an unhashable value, or no object indexed yet
+            bucket = {}
+
+        return Plan(
+            f"hash index on {self.model_name}.{attribute} == {value!r}",
+            len(bucket),
+            bucket.values,
+        )
+
+    def range(self, attribute: str, low: Any, high: Any) -> Plan:
+        """Returns the plan reading a range of a range index."""
+        index = self.objects.ranges.get((self.model_name, attribute))
+        objects = self.objects
+
+        def candidates() -> Iterable[Any]:
+            """Yields the objects within the range."""
+            if index is None:
+                return []
+
+            return (objects[key] for key in index.range(low, high))
+
+        return Plan(
+            f"range index on {self.model_name}.{attribute} "
+            f"in [{'-inf' if low is None else low}, "
+            f"{'inf' if high is None else high}]",
+            0 if index is None else index.count(low, high),
+            candidates,
+        )
+
+    def union(self, plans: List[Plan]) -> Plan:
+        """Returns the plan yielding the candidates of many plans, once."""
+
+        def candidates() -> Iterable[Any]:
+            """Yields the candidates of every plan, skipping duplicates."""
+            seen = set()
+            for child in plans:
+                for obj in child.candidates():
+                    if id(obj) not in seen:
+                        seen.add(id(obj))
+                        yield obj
+
+        return Plan(
+            "union of " + "; ".join(child.description for child in plans),
+            sum(child.estimate for child in plans),
+            candidates,
+        )
+
+    def columnar(self, node: Any) -> Optional[Plan]:
+        """Returns the plan comparing the columns of the columnar projection
+        of the model, if there is one and it has every attribute compared."""
+        projection = self.objects.projections.get(self.model_name)
+        if projection is None:
+            return None
+
+        decided = self.decide(projection, node)
+        if decided is None:
+            return None
+
+        matches, undecided = decided
+        keys = projection.keys
+        objects = self.objects
+
+        return Plan(
+            f"columnar scan of {self.model_name}",
+            len(matches) + len(undecided),
+            lambda: (objects[keys[row]] for row in sorted(undecided)),
+            matches=lambda: (objects[keys[row]] for row in sorted(matches)),
+        )
+
+    def decide(
+        self, projection: ColumnarProjection, node: Any
+    ) -> Optional[Tuple[Set[int], Set[int]]]:
+        """Returns the rows of a projection matching a filter and those left
+        undecided by its columns, or None if an attribute has no column."""
+        if isinstance(node, Comparison):
+            return projection.compare(
+                node.attribute, node.operator, node.value
+            )
+
+        if isinstance(node, Not):
+            decided = self.decide(projection, node.child)
+            if decided is None:
+                return None
+
+            matches, undecided = decided
+            return projection.every() - matches - undecided, undecided
+
+        children = [self.decide(projection, child) for child in node.children]
+        if None in children:
+            return None
+
+        combine = set.intersection if isinstance(node, And) else set.union
+        matches = combine(*(matches for matches, _ in children))
+        possible = combine(*(m | undecided for m, undecided in children))
+
+        return matches, possible - matches
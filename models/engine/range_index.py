@@ -0,0 +1,140 @@
+#!/usr/bin/python3
+
+"""This module defines the ordered index kept by the storage engines on the
+numeric attributes of a model, which answers range queries without a full
+scan."""
+
+from bisect import bisect_left, bisect_right, insort
+from math import isnan
+from operator import itemgetter
+from typing import Any, List
+
+_value = itemgetter(0)
+
+
+def is_number(value: Any) -> bool:
+    """Checks whether a value can be kept in a range index.
+
+    Args:
+        value (Any): The value.
+
+    Returns:
+        bool: True for integers and floats other than NaN, False otherwise.
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return False
+
+    return not (isinstance(value, float) and isnan(value))
+
+
+class RangeIndex:
+    """Defines a sorted array of `(value, key)` pairs searched with bisect.
+
+    A range query costs O(log N + k) for k results. Adding or removing a key
+    moves the end of the array, which is a single memory move. Keys added in
+    bulk (e.g. on reload) are appended as they come and sorted at once by the
+    next query.
+    """
+
+    def __init__(self) -> None:
+        """Initializes an empty index."""
+        self.__entries = []
+        self.__values = {}
+        self.__sorted = True
+
+    def __len__(self) -> int:
+        """Returns the number of keys in the index."""
+        return len(self.__values)
+
+    def add(self, key: str, value: Any, bulk: bool = False) -> None:
+        """Adds a key with its value, replacing its previous value.
+
+        Args:
+            key (str): The key of the object.
+            value (Any): The value of the attribute, which must be a number.
+
+            bulk (bool, optional): Determines whether the array is only sorted
+            by the next query, which is faster when adding many keys at once.
+            Defaults to False.
+        """
+        if key in self.__values:
+            self.remove(key)
+
+        self.__values[key] = value
+
+        if bulk or not self.__sorted:
+            self.__entries.append((value, key))
+            self.__sorted = False
+        else:
+            insort(self.__entries, (value, key))
+
+    def remove(self, key: str) -> None:
+        """Removes a key, if it is in the index.
+
+        Args:
+            key (str): The key of the object.
+        """
+        value = self.__values.pop(key, None)
+        if value is None:
+            return
+
+        entries = self.__sort()
+        del entries[bisect_left(entries, (value, key))]
+
+    def range(self, low: Any = None, high: Any = None) -> List[str]:
+        """Returns the keys whose value is between two bounds.
+
+        Args:
+            low (Any, optional): The lowest value, included. Defaults to None,
+            meaning there is no lower bound.
+
+            high (Any, optional): The highest value, included. Defaults to
+            None, meaning there is no upper bound.
+
+        Returns:
+            List[str]: The keys, ordered by value.
+        """
+        start, end = self.__bounds(low, high)
+
+        return [key for _, key in self.__entries[start:end]]
+
+    def count(self, low: Any = None, high: Any = None) -> int:
+        """Returns the number of keys whose value is between two bounds,
+        without listing them.
+
+        Args:
+            low (Any, optional): The lowest value, included. Defaults to None,
+            meaning there is no lower bound.
+
+            high (Any, optional): The highest value, included. Defaults to
+            None, meaning there is no upper bound.
+
+        Returns:
+            int: The number of keys.
+        """
+        start, end = self.__bounds(low, high)
+
+        return max(0, end - start)
+
+    def __bounds(self, low: Any, high: Any) -> tuple:
+        """Returns the positions of the first entry within two bounds and of
+        the entry after the last one."""
+        entries = self.__sort()
+
+        start = 0 if low is None else bisect_left(entries, low, key=_value)
+        end = (
+            len(entries)
+            if high is None
+            else bisect_right(entries, high, key=_value)
+        )
+
+        return start, end
+
+    def __sort(self) -> list:
+        """Sorts the entries added in bulk, then returns the entries."""
+        if not self.__sorted:
+            # readers sorting at the same time never see a list being sorted
+            self.__entries = sorted(self.__entries)
+            self.__sorted = True
+
+        return self.__entries
@@ -0,0 +1,143 @@
+#!/usr/bin/python3
+
+"""This module defines the reader/writer lock guarding the objects shared by
+the storage engines.
+
+Any number of threads may hold the lock for reading at once, while a thread
+holding it for writing holds it alone. Writers are preferred: once a writer
+waits, threads asking to read wait behind it, so that a steady flow of
+readers can't starve writers. Both sides are reentrant, and a writer may
+also read, but a reader can't become a writer, as two readers doing so would
+wait for each other forever.
+"""
+
+import threading
+
+
+class _Side:
+    """Defines one side of a reader/writer lock, used as a context manager."""
+
+    def __init__(self, acquire, release) -> None:
+        """Initializes a side of the lock.
+
+        Args:
+            acquire (Callable[[], None]): Acquires the side.
+            release (Callable[[], None]): Releases the side.
+        """
+        self.acquire = acquire
+        self.release = release
+
+    def __enter__(self) -> None:
+        """Acquires the side."""
+        self.acquire()
+
+    def __exit__(self, *_) -> None:
+        """Releases the side."""
+        self.release()
+
+
+class ReadWriteLock:
+    """Defines a reentrant, writer-preferring reader/writer lock.
+
+    Attributes:
+        read (_Side): Holds the lock for reading, e.g. `with lock.read:`.
+        write (_Side): Holds the lock for writing, e.g. `with lock.write:`.
+    """
+
+    def __init__(self) -> None:
+        """Initializes an unlocked lock."""
+        self.__condition = threading.Condition(threading.Lock())
+
+        # the number of threads reading, and of threads waiting to write
+        self.__readers = 0
+        self.__waiting_writers = 0
+
+        # the thread writing, and how many times it holds the lock
+        self.__writer = None
+        self.__writes = 0
+
+        # how many times the current thread holds the lock for reading
+        self.__local = threading.local()
+
+        self.read = _Side(self.acquire_read, self.release_read)
+        self.write = _Side(self.acquire_write, self.release_write)
+
+    def held(self) -> bool:
+        """Returns whether the current thread holds the lock, for reading or
+        writing."""
+        return bool(
+            getattr(self.__local, "reads", 0)
+            or self.__writer == threading.get_ident()
+        )
+
+    def acquire_read(self) -> None:
+        """Holds the lock for reading, waiting for the writers first.
+
+        A thread already reading or writing gets it at once.
+        """
+        reads = getattr(self.__local, "reads", 0)
+        self.__local.reads = reads + 1
+
+        if reads or self.__writer == threading.get_ident():
+            return
+
+        with self.__condition:
+            while self.__writer is not None or self.__waiting_writers:
+                self.__condition.wait()
+
+            self.__readers += 1
+
+    def release_read(self) -> None:
+        """Releases the lock held for reading."""
+        self.__local.reads -= 1
+
+        if self.__local.reads or self.__writer == threading.get_ident():
+            return
+
+        with self.__condition:
+            self.__readers -= 1
+            if not self.__readers:
+                self.__condition.notify_all()
+
+    def acquire_write(self) -> None:
+        """Holds the lock for writing, waiting for the readers and the other
+        writer first.
+
+        Raises:
+            RuntimeError: If the thread holds the lock for reading only.
+        """
+        me = threading.get_ident()
+        if self.__writer == me:
+            self.__writes += 1
+            return
+
+        if getattr(self.__local, "reads", 0):
+            raise RuntimeError("a read lock can't be upgraded to a write lock")
+
+        with self.__condition:
+            self.__waiting_writers += 1
+            try:
+                while self.__writer is not None or self.__readers:
+                    self.__condition.wait()
+            finally:
+                self.__waiting_writers -= 1
+
+            self.__writer = me
+            self.__writes = 1
+
+    def release_write(self) -> None:
+        """Releases the lock held for writing.
+
+        Raises:
+            RuntimeError: If the thread doesn't hold the lock for writing.
+        """
+        if self.__writer != threading.get_ident():
+            raise RuntimeError("the write lock isn't held by this thread")
+
+        self.__writes -= 1
+        if self.__writes:
+            return
+
+        with self.__condition:
+            self.__writer = None
+            self.__condition.notify_all()
@@ -0,0 +1,125 @@
+#!/usr/bin/python3
+
+"""This module defines the point-in-time snapshots of the objects dictionary
+of the storage engines.
+
+A snapshot copies the references to the objects and their versions, which
+is a shallow copy of two dictionaries, not of the objects. Objects changed
+after the snapshot was taken are only copied then: before an attribute is
+assigned, the storage engine asks every open snapshot to keep the state the
+object had (its `to_dict()`), unless the snapshot already has it. Objects
+added, replaced or deleted afterwards don't change the snapshot, as it keeps
+its own references.
+
+So a snapshot reads the objects as they were when it was taken, whatever
+writers do in the meantime, which is what saves serialize. Only changes made
+through attribute assignment (or announced with `preserve()`) are isolated:
+mutating a list attribute in place isn't seen by the storage engines.
+"""
+
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any, Dict, Iterator
+
+
+class Snapshot(Mapping):
+    """Defines a read-only view of the objects as they were at some point.
+
+    The snapshot maps the keys of the objects to their state, as returned by
+    `to_dict()` at the time of the snapshot, in read-only dictionaries.
+    Close it (or use it as a context manager) once done, so that changed
+    objects are no longer copied for it.
+
+    Attributes:
+        version (int): The version of the snapshot, greater than that of the
+        snapshots taken before it and than every object version it holds.
+
+        versions (Dict[str, int]): The version of every object.
+
+        objects (Dict[str, Any]): The objects, by key. Those changed since the
+        snapshot was taken must be read through the snapshot.
+    """
+
+    def __init__(
+        self, objects: Dict[str, Any], versions: Dict[str, int], version: int
+    ) -> None:
+        """Initializes a snapshot.
+
+        Args:
+            objects (Dict[str, Any]): A copy of the objects dictionary.
+            versions (Dict[str, int]): A copy of the object versions.
+            version (int): The version of the snapshot.
+        """
+        self.objects = objects
+        self.versions = versions
+        self.version = version
+        self.closed = False
+
+        # the state of the objects changed since the snapshot
+        self.__states = {}
+
+    # snapshots are compared by identity, not by the states they hold
+    __eq__ = object.__eq__
+    __hash__ = object.__hash__
+
+    def __getitem__(self, key: str) -> Mapping:
+        """Returns the state of an object, which can't be modified."""
+        return MappingProxyType(self.state(key))
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterates over the keys of the objects."""
+        return iter(self.objects)
+
+    def __len__(self) -> int:
+        """Returns the number of objects."""
+        return len(self.objects)
+
+    def __enter__(self) -> "Snapshot":
+        """Returns the snapshot, to close it on exit."""
+        return self
+
+    def __exit__(self, *_) -> None:
+        """Closes the snapshot."""
+        self.close()
+
+    def state(self, key: str) -> dict:
+        """Returns the state of an object, as returned by its `to_dict()` at
+        the time of the snapshot.
+
+        Args:
+            key (str): The key of the object.
+
+        Returns:
+            dict: The state, which must not be modified.
+
+        Raises:
+            KeyError: If there was no object under the key.
+        """
+        state = self.__states.get(key)
+        if state is not None:
+            return state
+
+        state = self.objects[key].to_dict()
+
+        # an object changed meanwhile kept its state before changing, which
+        # wins over what may be its new state
+        return self.__states.get(key, state)
+
+    def preserve(self, key: str, obj: Any) -> None:
+        """Keeps the current state of an object about to change, if it is the
+        object of the snapshot and its state wasn't kept yet.
+
+        Args:
+            key (str): The key of the object.
+            obj (Any): The object.
+        """
+        if (
+            not self.closed
+            and key not in self.__states
+            and self.objects.get(key) is obj
+        ):
+            self.__states.setdefault(key, obj.to_dict())
+
+    def close(self) -> None:
+        """Stops keeping the state of the objects that change."""
+        self.closed = True
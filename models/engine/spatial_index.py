@@ -0,0 +1,426 @@
+#!/usr/bin/python3
+
+"""This module defines the spatial index kept by the storage engines on the
+coordinates of a model, which finds the objects in a bounding box, within a
+radius or nearest to a point without a full scan.
+
+The index is a quadtree over latitudes and longitudes: a cell holding more
+than `CAPACITY` objects is split into four, so crowded areas get small cells
+and empty areas stay cheap. Cells are visited nearest first, using a lower
+bound of the distance from the point to every point of a cell. Distances are
+great-circle distances in kilometres, as given by the haversine formula, and
+are compared through the chord between the points on the unit sphere, which
+needs no trigonometry for every object.
+"""
+
+import heapq
+from itertools import count
+from math import asin, cos, inf, pi, radians, sin, sqrt
+from typing import Any, Iterator, List, Optional, Tuple
+from models.engine.range_index import is_number
+
+EARTH_RADIUS = 6371.0088
+CAPACITY = 32
+MAX_DEPTH = 24
+
+
+def haversine(
+    latitude_1: float,
+    longitude_1: float,
+    latitude_2: float,
+    longitude_2: float,
+) -> float:
+    """Returns the great-circle distance between two points.
+
+    Args:
+        latitude_1 (float): The latitude of the first point, in degrees.
+        longitude_1 (float): The longitude of the first point, in degrees.
+        latitude_2 (float): The latitude of the second point, in degrees.
+        longitude_2 (float): The longitude of the second point, in degrees.
+
+    Returns:
+        float: The distance in kilometres.
+    """
+    phi_1 = radians(latitude_1)
+    phi_2 = radians(latitude_2)
+
+    a = (
+        sin((phi_2 - phi_1) / 2) ** 2
+        + cos(phi_1)
+        * cos(phi_2)
+        * sin(radians(longitude_2 - longitude_1) / 2) ** 2
+    )
+
+    return 2 * EARTH_RADIUS * asin(min(1.0, sqrt(a)))
+
+
+def is_location(latitude: Any, longitude: Any) -> bool:
+    """Checks whether coordinates can be kept in a spatial index.
+
+    Args:
+        latitude (Any): The latitude, in degrees.
+        longitude (Any): The longitude, in degrees.
+
+    Returns:
+        bool: True if both are numbers within their valid range.
+    """
+    return (
+        is_number(latitude)
+        and is_number(longitude)
+        and -90 <= latitude <= 90
+        and -180 <= longitude <= 180
+    )
+
+
+def _unit_vector(latitude: float, longitude: float) -> tuple:
+    """Returns the point of the unit sphere at a location."""
+    phi = radians(latitude)
+    lam = radians(longitude)
+
+    return cos(phi) * cos(lam), cos(phi) * sin(lam), sin(phi)
+
+
+def _to_distance(half_chord_squared: float) -> float:
+    """Converts the squared half chord between two points to kilometres."""
+    return 2 * EARTH_RADIUS * asin(min(1.0, sqrt(half_chord_squared)))
+
+
+def _to_half_chord_squared(distance: float) -> float:
+    """Converts kilometres to the squared half chord between two points."""
+    if distance >= pi * EARTH_RADIUS:
+        return 1.0
+
+    return sin(distance / (2 * EARTH_RADIUS)) ** 2
+
+
+class _Cell:
+    """Defines a cell of the quadtree, a range of latitudes and longitudes.
+
+    A leaf holds the `(x, y, z, latitude, longitude)` of its objects by key,
+    any other cell holds four smaller cells.
+    """
+
+    __slots__ = (
+        "south",
+        "west",
+        "north",
+        "east",
+        "depth",
+        "middle_lat",
+        "middle_lon",
+        "min_cos",
+        "points",
+        "children",
+    )
+
+    def __init__(
+        self, south: float, west: float, north: float, east: float, depth: int
+    ) -> None:
+        """Initializes an empty leaf."""
+        self.south = south
+        self.west = west
+        self.north = north
+        self.east = east
+        self.depth = depth
+        self.middle_lat = (south + north) / 2
+        self.middle_lon = (west + east) / 2
+
+        # the smallest cosine of the latitudes of the cell
+        self.min_cos = min(cos(radians(south)), cos(radians(north)))
+
+        self.points = {}
+        self.children = None
+
+    def child(self, latitude: float, longitude: float) -> "_Cell":
+        """Returns the child cell holding a location."""
+        return self.children[
+            (latitude >= self.middle_lat) * 2 + (longitude >= self.middle_lon)
+        ]
+
+    def split(self) -> None:
+        """Splits a leaf into four cells and moves its objects to them."""
+        middle_lat = self.middle_lat
+        middle_lon = self.middle_lon
+        depth = self.depth + 1
+
+        self.children = [
+            _Cell(self.south, self.west, middle_lat, middle_lon, depth),
+            _Cell(self.south, middle_lon, middle_lat, self.east, depth),
+            _Cell(middle_lat, self.west, self.north, middle_lon, depth),
+            _Cell(middle_lat, middle_lon, self.north, self.east, depth),
+        ]
+
+        for key, point in self.points.items():
+            self.child(point[3], point[4]).points[key] = point
+
+        self.points = None
+
+    def bound(
+        self, latitude: float, longitude: float, cos_phi: float
+    ) -> float:
+        """Returns a lower bound of the squared half chord from a location to
+        any point of the cell.
+
+        The bound follows the haversine formula with the smallest difference
+        of latitude and of longitude to the cell, and the smallest cosine of
+        its latitudes.
+        """
+        if latitude < self.south:
+            lat_gap = self.south - latitude
+        elif latitude > self.north:
+            lat_gap = latitude - self.north
+        else:
+            lat_gap = 0.0
+
+        if self.west <= longitude <= self.east:
+            lon_gap = 0.0
+        else:
+            lon_gap = min(
+                (self.west - longitude) % 360, (longitude - self.east) % 360
+            )
+
+        return (
+            sin(radians(lat_gap) / 2) ** 2
+            + cos_phi * self.min_cos * sin(radians(lon_gap) / 2) ** 2
+        )
+
+
+class SpatialIndex:
+    """Defines a quadtree holding the keys of the objects by location."""
+
+    def __init__(self) -> None:
+        """Initializes an empty index."""
+        self.__root = _Cell(-90.0, -180.0, 90.0, 180.0, 0)
+
+        # the leaf holding every key
+        self.__leaves = {}
+
+    def __len__(self) -> int:
+        """Returns the number of keys in the index."""
+        return len(self.__leaves)
+
+    def add(self, key: str, latitude: float, longitude: float) -> None:
+        """Adds a key at a location, moving it if it was already indexed.
+
+        Args:
+            key (str): The key of the object.
+            latitude (float): The latitude of the object, in degrees.
+            longitude (float): The longitude of the object, in degrees.
+        """
+        self.remove(key)
+
+        cell = self.__root
+        while cell.children is not None:
+            cell = cell.children[
+                (latitude >= cell.middle_lat) * 2
+                + (longitude >= cell.middle_lon)
+            ]
+
+        cell.points[key] = (
+            *_unit_vector(latitude, longitude),
+            latitude,
+            longitude,
+        )
+        self.__leaves[key] = cell
+
+        if len(cell.points) > CAPACITY and cell.depth < MAX_DEPTH:
+            cell.split()
+            for child in cell.children:
+                for moved in child.points:
+                    self.__leaves[moved] = child
+
+    def remove(self, key: str) -> None:
+        """Removes a key, if it is in the index.
+
+        Args:
+            key (str): The key of the object.
+        """
+        cell = self.__leaves.pop(key, None)
+        if cell is not None:
+            del cell.points[key]
+
+    def bbox(
+        self, south: float, west: float, north: float, east: float
+    ) -> List[str]:
+        """Returns the keys located in a bounding box.
+
+        Args:
+            south (float): The lowest latitude, included.
+            west (float): The western longitude, included.
+            north (float): The highest latitude, included.
+            east (float): The eastern longitude, included. A box crossing the
+            antimeridian has an eastern longitude lower than the western one.
+
+        Returns:
+            List[str]: The keys.
+        """
+        if south > north:
+            return []
+
+        if west <= east:
+            boxes = [(west, east)]
+        else:
+            boxes = [(west, 180.0), (-180.0, east)]
+
+        keys = {}
+        for box_west, box_east in boxes:
+            stack = [self.__root]
+            while stack:
+                cell = stack.pop()
+                if (
+                    cell.south > north
+                    or cell.north < south
+                    or cell.west > box_east
+                    or cell.east < box_west
+                ):
+                    continue
+
+                if cell.children is not None:
+                    stack.extend(cell.children)
+                    continue
+
+                for key, (_, _, _, lat, lon) in cell.points.items():
+                    if south <= lat <= north and box_west <= lon <= box_east:
+                        keys[key] = None
+
+        return list(keys)
+
+    def within(
+        self, latitude: float, longitude: float, radius: float
+    ) -> List[Tuple[float, str]]:
+        """Returns the keys located within a distance of a point.
+
+        Args:
+            latitude (float): The latitude of the point, in degrees.
+            longitude (float): The longitude of the point, in degrees.
+            radius (float): The distance, in kilometres.
+
+        Returns:
+            List[Tuple[float, str]]: The `(distance, key)` pairs, nearest
+            first.
+        """
+        if radius < 0:
+            return []
+
+        x, y, z = _unit_vector(latitude, longitude)
+        cos_phi = cos(radians(latitude))
+        limit = _to_half_chord_squared(radius)
+
+        found = []
+        stack = [self.__root]
+        while stack:
+            cell = stack.pop()
+
+            if cell.children is not None:
+                stack.extend(
+                    child
+                    for child in cell.children
+                    if child.bound(latitude, longitude, cos_phi) <= limit
+                )
+                continue
+
+            for key, (px, py, pz, _, _) in cell.points.items():
+                half_chord_squared = (
+                    (px - x) ** 2 + (py - y) ** 2 + (pz - z) ** 2
+                ) / 4
+                if half_chord_squared <= limit:
+                    distance = _to_distance(half_chord_squared)
+                    if distance <= radius:
+                        found.append((distance, key))
+
+        found.sort()
+        return found
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int,
+        radius: Optional[float] = None,
+    ) -> List[Tuple[float, str]]:
+        """Returns the keys nearest to a point.
+
+        Args:
+            latitude (float): The latitude of the point, in degrees.
+            longitude (float): The longitude of the point, in degrees.
+            k (int): The number of keys to return.
+
+            radius (Optional[float], optional): The largest distance, in
+            kilometres. Defaults to None, meaning there is no limit.
+
+        Returns:
+            List[Tuple[float, str]]: At most `k` `(distance, key)` pairs,
+            nearest first.
+        """
+        if k <= 0 or (radius is not None and radius < 0):
+            return []
+
+        limit = inf if radius is None else _to_half_chord_squared(radius)
+        found = []
+
+        for half_chord_squared, key in self.__nearest_first(
+            latitude, longitude, limit
+        ):
+            distance = _to_distance(half_chord_squared)
+            if radius is not None and distance > radius:
+                break
+
+            found.append((distance, key))
+            if len(found) == k:
+                break
+
+        return found
+
+    def __nearest_first(
+        self, latitude: float, longitude: float, limit: float
+    ) -> Iterator[Tuple[float, str]]:
+        """Yields the keys by distance from a point, nearest first.
+
+        The cells and the points are kept in a single heap ordered by their
+        squared half chord (a lower bound of it for cells), so a point is only
+        yielded once no cell left can hold a nearer one.
+
+        Args:
+            latitude (float): The latitude of the point, in degrees.
+            longitude (float): The longitude of the point, in degrees.
+
+            limit (float): The largest squared half chord. Cells and points
+            further away are skipped.
+
+        Yields:
+            Tuple[float, str]: The squared half chord to the point of every
+            key, and the key.
+        """
+        x, y, z = _unit_vector(latitude, longitude)
+        cos_phi = cos(radians(latitude))
+
+        # cells are the entries with an empty key, so at the same distance
+        # they come before the points, which come by key; the counter orders
+        # cells without comparing them
+        tiebreak = count()
+        heap = [(0.0, "", next(tiebreak), self.__root)]
+
+        while heap:
+            distance, key, _, cell = heapq.heappop(heap)
+
+            if key:
+                yield distance, key
+                continue
+
+            if cell.children is not None:
+                for child in cell.children:
+                    bound = child.bound(latitude, longitude, cos_phi)
+                    if bound <= limit:
+                        heapq.heappush(
+                            heap, (bound, "", next(tiebreak), child)
+                        )
+                continue
+
+            for point_key, (px, py, pz, _, _) in cell.points.items():
+                half_chord_squared = (
+                    (px - x) ** 2 + (py - y) ** 2 + (pz - z) ** 2
+                ) / 4
+                if half_chord_squared <= limit:
+                    heapq.heappush(
+                        heap, (half_chord_squared, point_key, 0, None)
+                    )
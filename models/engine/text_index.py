@@ -0,0 +1,191 @@
+#!/usr/bin/python3
+
+"""This module defines the inverted index kept by the storage engines on the
+text attributes of a model, which ranks the objects mentioning some words
+with BM25 without a full scan."""
+
+import re
+import zlib
+from collections import Counter
+from math import log
+from typing import Any, Callable, Dict, List
+
+K1 = 1.2
+B = 0.75
+
+WORD = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Splits a text into lowercase words.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        List[str]: The words, in order.
+    """
+    return WORD.findall(text.lower())
+
+
+class TextIndex:
+    """Defines an inverted index, mapping every word to the keys of the
+    objects whose text contains it.
+
+    Every document also keeps a checksum of its text, so adding a text that
+    didn't change (e.g. when reloading objects over an index read from disk)
+    costs no tokenization.
+
+    Attributes:
+        changed (bool): Whether the index changed since it was last saved.
+    """
+
+    def __init__(self) -> None:
+        """Initializes an empty index."""
+        # {word: {key: number of occurrences}}
+        self.__postings = {}
+
+        # {key: (checksum, number of words, distinct words)}
+        self.__documents = {}
+
+        self.__total_length = 0
+        self.changed = False
+
+    def __len__(self) -> int:
+        """Returns the number of documents in the index."""
+        return len(self.__documents)
+
+    def __contains__(self, key: str) -> bool:
+        """Checks whether a key is in the index."""
+        return key in self.__documents
+
+    def add(self, key: str, text: str) -> None:
+        """Adds the text of a key, replacing its previous text.
+
+        Args:
+            key (str): The key of the object.
+            text (str): The text.
+        """
+        checksum = zlib.crc32(text.encode("utf-8", "surrogatepass"))
+
+        document = self.__documents.get(key)
+        if document is not None:
+            if document[0] == checksum:
+                return
+            self.remove(key)
+
+        counts = Counter(tokenize(text))
+        for word, occurrences in counts.items():
+            postings = self.__postings.get(word)
+            if postings is None:
+                postings = self.__postings[word] = {}
+            postings[key] = occurrences
+
+        length = sum(counts.values())
+        self.__documents[key] = (checksum, length, tuple(counts))
+        self.__total_length += length
+        self.changed = True
+
+    def remove(self, key: str) -> None:
+        """Removes the text of a key, if it is in the index.
+
+        Args:
+            key (str): The key of the object.
+        """
+        document = self.__documents.pop(key, None)
+        if document is None:
+            return
+
+        for word in document[2]:
+            postings = self.__postings[word]
+            del postings[key]
+            if not postings:
+                del self.__postings[word]
+
+        self.__total_length -= document[1]
+        self.changed = True
+
+    def prune(self, keep: Callable[[str], bool]) -> None:
+        """Removes the keys that should no longer be in the index.
+
+        Args:
+            keep (Callable[[str], bool]): Tells whether a key is kept.
+        """
+        for key in [key for key in self.__documents if not keep(key)]:
+            self.remove(key)
+
+    def search(self, query: str) -> Dict[str, float]:
+        """Scores the documents containing any word of a query with BM25.
+
+        Args:
+            query (str): The words to look for.
+
+        Returns:
+            Dict[str, float]: The score of every matching key.
+        """
+        count = len(self.__documents)
+        if not count:
+            return {}
+
+        average_length = self.__total_length / count or 1
+        documents = self.__documents
+        scores = {}
+
+        for word in set(tokenize(query)):
+            postings = self.__postings.get(word)
+            if not postings:
+                continue
+
+            matches = len(postings)
+            idf = log((count - matches + 0.5) / (matches + 0.5) + 1)
+
+            for key, occurrences in postings.items():
+                norm = K1 * (1 - B + B * documents[key][1] / average_length)
+                scores[key] = scores.get(key, 0.0) + idf * (
+                    occurrences * (K1 + 1) / (occurrences + norm)
+                )
+
+        return scores
+
+    def to_state(self) -> Dict[str, Any]:
+        """Returns the content of the index, to be saved as JSON.
+
+        Returns:
+            Dict[str, Any]: The checksum and length of every document, and
+            the postings of every word.
+        """
+        return {
+            "documents": {
+                key: [checksum, length]
+                for key, (checksum, length, _) in self.__documents.items()
+            },
+            "postings": self.__postings,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "TextIndex":
+        """Builds an index from the content returned by `to_state()`.
+
+        Args:
+            state (Dict[str, Any]): The content of the index.
+
+        Returns:
+            TextIndex: The index.
+        """
+        index = cls()
+        words = {key: [] for key in state["documents"]}
+
+        for word, postings in state["postings"].items():
+            for key in postings:
+                words[key].append(word)
+
+        index.__postings = state["postings"]
+        index.__documents = {
+            key: (checksum, length, tuple(words[key]))
+            for key, (checksum, length) in state["documents"].items()
+        }
+        index.__total_length = sum(
+            length for _, length in state["documents"].values()
+        )
+
+        return index
@@ -2,12 +2,27 @@
 
 """This module defines the Place model."""
 
+import models
 from models.base_model import BaseModel
 
 
 class Place(BaseModel):
     """Defines the Place model."""
 
+    _references = {
+        "city_id": "City",
+        "user_id": "User",
+        "amenity_ids": "Amenity",
+    }
+    _range_indexes = (
+        "number_rooms",
+        "number_bathrooms",
+        "max_guest",
+        "price_by_night",
+    )
+    _location_index = ("latitude", "longitude")
+    _text_indexes = ("name", "description")
+
     city_id = ""
     user_id = ""
     name = ""
@@ -19,3 +34,27 @@ class Place(BaseModel):
     latitude = 0.0
     longitude = 0.0
     amenity_ids = []
+
+    @property
+    def city(self) -> "BaseModel | None":
+        """Returns the city of the place, if it exists."""
+        return models.storage.get("City", self.city_id)
+
+    @property
+    def user(self) -> "BaseModel | None":
+        """Returns the owner of the place, if it exists."""
+        return models.storage.get("User", self.user_id)
+
+    @property
+    def reviews(self) -> list:
+        """Returns the reviews of the place."""
+        return models.storage.related(self, "Review")
+
+    @property
+    def amenities(self) -> list:
+        """Returns the amenities of the place that exist."""
+        amenities = (
+            models.storage.get("Amenity", amenity_id)
+            for amenity_id in self.amenity_ids
+        )
+        return [amenity for amenity in amenities if amenity is not None]
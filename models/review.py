@@ -2,12 +2,26 @@
 
 """This module defines the Review model."""
 
+import models
 from models.base_model import BaseModel
 
 
 class Review(BaseModel):
     """Defines the Review model."""
 
+    _references = {"place_id": "Place", "user_id": "User"}
+    _text_indexes = ("text",)
+
     place_id = ""
     user_id = ""
     text = ""
+
+    @property
+    def place(self) -> "BaseModel | None":
+        """Returns the reviewed place, if it exists."""
+        return models.storage.get("Place", self.place_id)
+
+    @property
+    def user(self) -> "BaseModel | None":
+        """Returns the author of the review, if it exists."""
+        return models.storage.get("User", self.user_id)
@@ -2,6 +2,7 @@
 
 """This module defines the State model."""
 
+import models
 from models.base_model import BaseModel
 
 
@@ -9,3 +10,8 @@ class State(BaseModel):
     """Defines the State model."""
 
     name = ""
+
+    @property
+    def cities(self) -> list:
+        """Returns the cities of the state."""
+        return models.storage.related(self, "City")
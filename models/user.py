@@ -2,13 +2,26 @@
 
 """This model define the User model."""
 
+import models
 from models.base_model import BaseModel
 
 
 class User(BaseModel):
     """Defines the User model."""
 
+    _indexes = ("email",)
+
     email = ""
     password = ""
     first_name = ""
     last_name = ""
+
+    @property
+    def places(self) -> list:
+        """Returns the places owned by the user."""
+        return models.storage.related(self, "Place")
+
+    @property
+    def reviews(self) -> list:
+        """Returns the reviews written by the user."""
+        return models.storage.related(self, "Review")
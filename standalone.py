@@ -0,0 +1,41 @@
+#!/usr/bin/python3
+
+"""Imports the modules of the storage engines without creating the storage.
+
+Importing any module of the `models` package first runs `models/__init__.py`,
+which creates the storage and loads the objects saved in the working
+directory. The command line tools that only read and write the files they are
+given import the engine modules with `import_engine()` instead, so they never
+touch the storage.
+"""
+
+import os
+import sys
+from importlib import import_module
+from importlib.machinery import ModuleSpec
+from importlib.util import module_from_spec
+from types import ModuleType
+
+MODELS_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "models"
+)
+
+
+def import_engine(name: str) -> ModuleType:
+    """Imports a module of `models.engine`.
+
+    If the `models` package hasn't been imported yet, it is registered
+    without running `models/__init__.py`, so the process has no storage.
+
+    Args:
+        name (str): The name of the module, e.g. `codec`.
+
+    Returns:
+        ModuleType: The module.
+    """
+    if "models" not in sys.modules:
+        spec = ModuleSpec("models", None, is_package=True)
+        spec.submodule_search_locations = [MODELS_PATH]
+        sys.modules["models"] = module_from_spec(spec)
+
+    return import_module(f"models.engine.{name}")
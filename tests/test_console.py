@@ -4,6 +4,7 @@
 
 import os
 import inspect
+import tempfile
 from io import StringIO
 from uuid import UUID as uuid
 from unittest import TestCase
@@ -11,6 +12,13 @@ from unittest.mock import patch
 from console import HBNBCommand as hbnb
 from tests.test_models.test_base_model import JSON_FILE_PATH
 import models
+from models.place import Place
+from models.city import City
+from models.state import State
+from models.review import Review
+from models.amenity import Amenity
+from models.engine.events import CREATED, DELETED, UPDATED, Event
+from models.engine.file_storage import FileStorage
 from lazy_methods import LazyMethods
 
 instance = LazyMethods()
@@ -92,8 +100,9 @@ class TestHelpCommand(TestCase):
             "\n"
             "Documented commands (type help <topic>):\n"
             "========================================\n"
-            "all  clear  count  create  destroy  eof  "
-            "help  quit  shell  show  update\n"
+            "all    count   destroy  explain  near  range   shell  stats   "
+            "where\n"
+            "clear  create  eof      help     quit  search  show   update\n"
             "\n"
         )
 
@@ -112,10 +121,15 @@ class TestHelpCommand(TestCase):
         """Tests the output of the `all` command's help message."""
         self.__expected_output = (
             "Prints the string representation for all or a specified model's "
-            "instances.\n"
+            "instances, optionally a page of at most limit instances, "
+            "skipping offset instances from the first one or from the one "
+            "after the given id (or <class name>.<id> without a class name), "
+            "optionally with only some fields.\n"
             "Usage:\n"
-            "\tOption 1: all [<class name>]\n"
-            "\tOption 2: <class name>.all()\n"
+            "\tOption 1: all [<class name>] [limit=<n>] [offset=<n>] "
+            "[after=<id>] [fields=[<name>,...]]\n"
+            "\tOption 2: <class name>.all([limit=<n>][, offset=<n>]"
+            "[, after=<id>][, fields=[<name>,...]])\n"
         )
 
         with patch("sys.stdout", new=StringIO()) as result:
@@ -146,6 +160,105 @@ class TestHelpCommand(TestCase):
 
         self.assertEqual(result.getvalue(), self.__expected_output)
 
+    def test_help_on_range(self) -> None:
+        """Tests the output of the `range` command's help message."""
+        self.__expected_output = (
+            "Prints the instances of a model whose numeric attribute is "
+            "between a minimum and an optional maximum, both included.\n"
+            "Usage:\n"
+            "\tOption 1: range <class name> <attribute name> <min> [<max>]\n"
+            "\tOption 2: "
+            "<class name>.range(<attribute name>, <min>[, <max>])\n"
+        )
+
+        with patch("sys.stdout", new=StringIO()) as result:
+            hbnb().onecmd("help range")
+
+        self.assertEqual(result.getvalue(), self.__expected_output)
+
+    def test_help_on_near(self) -> None:
+        """Tests the output of the `near` command's help message."""
+        self.__expected_output = (
+            "Prints the k instances of a model nearest to a point, 10 by "
+            "default, optionally within a radius in kilometres.\n"
+            "Usage:\n"
+            "\tOption 1: near <class name> <latitude> <longitude> [<k>] "
+            "[<radius>]\n"
+            "\tOption 2: "
+            "<class name>.near(<latitude>, <longitude>[, <k>[, <radius>]])\n"
+        )
+
+        with patch("sys.stdout", new=StringIO()) as result:
+            hbnb().onecmd("help near")
+
+        self.assertEqual(result.getvalue(), self.__expected_output)
+
+    def test_help_on_where(self) -> None:
+        """Tests the output of the `where` command's help message."""
+        self.__expected_output = (
+            "Prints the instances of a model matching a filter, which "
+            "compares attributes to values with ==, !=, <, <=, > and >=, "
+            "combined with and, or, not and parentheses.\n"
+            "Usage:\n"
+            "\tOption 1: where <class name> <filter>\n"
+            "\tOption 2: <class name>.where(<filter>)\n"
+            "Example: Place.where(price_by_night < 100 and max_guest >= 4)\n"
+        )
+
+        with patch("sys.stdout", new=StringIO()) as result:
+            hbnb().onecmd("help where")
+
+        self.assertEqual(result.getvalue(), self.__expected_output)
+
+    def test_help_on_explain(self) -> None:
+        """Tests the output of the `explain` command's help message."""
+        self.__expected_output = (
+            "Runs a filter on a model, as the `where` command does, and "
+            "prints the index or scan used to find the candidates, with "
+            "timings.\n"
+            "Usage:\n"
+            "\tOption 1: explain <class name> <filter>\n"
+            "\tOption 2: <class name>.explain(<filter>)\n"
+        )
+
+        with patch("sys.stdout", new=StringIO()) as result:
+            hbnb().onecmd("help explain")
+
+        self.assertEqual(result.getvalue(), self.__expected_output)
+
+    def test_help_on_stats(self) -> None:
+        """Tests the output of the `stats` command's help message."""
+        self.__expected_output = (
+            "Prints the count, min, max, mean, standard deviation, sum and "
+            "percentiles of a numeric attribute of a model's instances, "
+            "optionally of those matching a filter.\n"
+            "Usage:\n"
+            "\tOption 1: stats <class name> <attribute name> "
+            "[where <filter>]\n"
+            "\tOption 2: "
+            "<class name>.stats(<attribute name>[ where <filter>])\n"
+        )
+
+        with patch("sys.stdout", new=StringIO()) as result:
+            hbnb().onecmd("help stats")
+
+        self.assertEqual(result.getvalue(), self.__expected_output)
+
+    def test_help_on_search(self) -> None:
+        """Tests the output of the `search` command's help message."""
+        self.__expected_output = (
+            "Prints the instances of a model whose text mentions any of the "
+            "search terms, best match first.\n"
+            "Usage:\n"
+            '\tOption 1: search <class name> "<search terms>"\n'
+            '\tOption 2: <class name>.search("<search terms>")\n'
+        )
+
+        with patch("sys.stdout", new=StringIO()) as result:
+            hbnb().onecmd("help search")
+
+        self.assertEqual(result.getvalue(), self.__expected_output)
+
     def test_help_on_create(self) -> None:
         """Tests the output of the `create` command's help message."""
         self.__expected_output = (
@@ -163,10 +276,12 @@ class TestHelpCommand(TestCase):
     def test_help_on_destroy(self) -> None:
         """Tests the output of the `destroy` command's help message."""
         self.__expected_output = (
-            "Deletes an instance based on the class name and id\n"
+            "Deletes an instance based on the class name and id. With "
+            "--cascade, the instances referencing it are deleted too (e.g. "
+            "the cities, places and reviews of a state).\n"
             "Usage:\n"
-            "\tOption 1: destroy <class name> <id>\n"
-            "\tOption 2: <class name>.destroy(<id>)\n"
+            "\tOption 1: destroy <class name> <id> [--cascade]\n"
+            "\tOption 2: <class name>.destroy(<id>[, --cascade])\n"
         )
 
         with patch("sys.stdout", new=StringIO()) as result:
@@ -219,10 +334,10 @@ class TestHelpCommand(TestCase):
         """Tests the output of the `show` command's help message."""
         self.__expected_output = (
             "Prints the string representation of an instance based on the "
-            "class name and id\n"
+            "class name and id, optionally with only some fields\n"
             "Usage:\n"
-            "\tOption 1: show <class name> <id>\n"
-            "\tOption 2: <class name>.show(<id>)\n"
+            "\tOption 1: show <class name> <id> [fields=[<name>,...]]\n"
+            "\tOption 2: <class name>.show(<id>[, fields=[<name>,...]])\n"
         )
 
         with patch("sys.stdout", new=StringIO()) as result:
@@ -642,14 +757,559 @@ class TestUpdateCommand(TestCase):
                 attr_name_2, models.storage.all()[instance_key].to_dict()
             )
 
+    def test_update_keeps_indexes(self) -> None:
+        """Tests that the indexes follow attributes set by the `update`
+        command, including with a dictionary."""
+        with patch("sys.stdout", new=StringIO()) as result:
+            hbnb().onecmd("create User")
+        user_id = str(instance.get_uuid(result))
+
+        with patch("sys.stdout", new=StringIO()):
+            hbnb().onecmd(f'update User {user_id} email "a@alx.com"')
+        found = models.storage.find("User", email="a@alx.com")
+        self.assertEqual([user.id for user in found], [user_id])
+
+        with patch("sys.stdout", new=StringIO()):
+            hbnb().onecmd(
+                f'User.update("{user_id}", {{"email": "b@alx.com"}})'
+            )
+        self.assertEqual(models.storage.find("User", email="a@alx.com"), [])
+        found = models.storage.find("User", email="b@alx.com")
+        self.assertEqual([user.id for user in found], [user_id])
+
+    def test_update_events(self) -> None:
+        """Tests that the subscribers are told once about every command,
+        with the attributes updated."""
+        events = []
+        subscription = models.storage.subscribe(events.append)
+        try:
+            with patch("sys.stdout", new=StringIO()) as result:
+                hbnb().onecmd("create User")
+            user_id = str(instance.get_uuid(result))
+            self.assertEqual(len(events), 1)
+            self.assertEqual(events[0].kind, CREATED)
+
+            with patch("sys.stdout", new=StringIO()):
+                hbnb().onecmd(f'update User {user_id} email "a@alx.com"')
+                hbnb().onecmd(
+                    f'User.update("{user_id}", '
+                    '{"email": "b@alx.com", "first_name": "Betty"})'
+                )
+        finally:
+            models.storage.unsubscribe(subscription)
+
+        self.assertEqual(
+            events[1:],
+            [
+                Event(UPDATED, "User", user_id, ("email", "updated_at")),
+                Event(
+                    UPDATED,
+                    "User",
+                    user_id,
+                    ("email", "first_name", "updated_at"),
+                ),
+            ],
+        )
+
 
 class TestAllCommand(TestCase):
     """Tests the `all` command on all models."""
 
+    def setUp(self) -> None:
+        models.storage.all().clear()
+
+    def tearDown(self) -> None:
+        models.storage.all().clear()
+
+    def run_all(self, line: str) -> str:
+        """Runs a command and returns what it printed, stripped."""
+        with patch("sys.stdout", new=StringIO()) as result:
+            hbnb().onecmd(line)
+
+        return result.getvalue().strip()
+
+    def test_all(self) -> None:
+        """Tests that instances are printed as a list of strings."""
+        self.assertEqual(self.run_all("all"), "[]")
+
+        state, city = State(), City()
+        self.assertEqual(self.run_all("all"), str([str(state), str(city)]))
+        self.assertEqual(self.run_all("City.all()"), str([str(city)]))
+        self.assertEqual(self.run_all("all Place"), "[]")
+
+    def test_all_pages(self) -> None:
+        """Tests printing pages of instances with a limit, an offset and a
+        cursor."""
+        cities = [City() for _ in range(5)]
+        state = State()
+
+        for line, expected in (
+            ("City.all(limit=2)", cities[:2]),
+            ("all City limit=2 offset=2", cities[2:4]),
+            (f"City.all(limit=2, after={cities[2].id})", cities[3:]),
+            (f"all City after={cities[1].id} offset=1", cities[3:]),
+            (f"all City after={cities[4].id}", []),
+            ("all City offset=10", []),
+            ("all City limit=0", []),
+            (f"all limit=1 after=City.{cities[4].id}", [state]),
+        ):
+            with self.subTest(line=line):
+                self.assertEqual(
+                    self.run_all(line), str([str(obj) for obj in expected])
+                )
+
+    def test_all_fields(self) -> None:
+        """Tests printing only some fields of the instances."""
+        cheap, dear = Place(), Place()
+        cheap.name, cheap.price_by_night = "Cabin", 80
+        dear.name = "Villa"
+        state = State()
+
+        expected = str(
+            [
+                f"[Place] ({place.id}) {{'id': '{place.id}', 'name': "
+                f"'{place.name}', 'price_by_night': {place.price_by_night}}}"
+                for place in (cheap, dear)
+            ]
+        )
+        for line in (
+            "Place.all(fields=[id,name,price_by_night])",
+            "Place.all(fields=[id, name, price_by_night])",
+            "all Place fields=[id, name, price_by_night]",
+            "all Place fields=id,name,price_by_night",
+        ):
+            with self.subTest(line=line):
+                self.assertEqual(self.run_all(line), expected)
+
+        self.assertEqual(
+            self.run_all("all limit=1 offset=2 fields=[text,id]"),
+            str([f"[State] ({state.id}) {{'id': '{state.id}'}}"]),
+        )
+        self.assertEqual(
+            self.run_all(
+                f"Place.all(limit=1, fields=[name], after={cheap.id})"
+            ),
+            str([f"[Place] ({dear.id}) {{'name': 'Villa'}}"]),
+        )
+
+        with patch("sys.stdout", new=StringIO()) as result:
+            hbnb().onecmd(f"Place.show({dear.id}, fields=[name, max_guest])")
+        self.assertEqual(
+            result.getvalue(),
+            f"[Place] ({dear.id}) {{'name': 'Villa', 'max_guest': 0}}\n",
+        )
+
+        for line in (
+            "all Place fields=[]",
+            "all Place fields=[id,1]",
+            f"show Place {dear.id} fields=[name-]",
+        ):
+            with self.subTest(line=line):
+                self.assertEqual(self.run_all(line), "** invalid fields **")
+
+    def test_all_errors(self) -> None:
+        """Tests the `all` command with invalid arguments."""
+        for line, error in (
+            ("all Nope", "** class doesn't exist **"),
+            ("all City size=2", "** unknown option **"),
+            ("all City 2", "** unknown option **"),
+            (
+                "all City limit=-1",
+                "** limit must be a non-negative integer **",
+            ),
+            (
+                "all City offset=x",
+                "** offset must be a non-negative integer **",
+            ),
+            ("all City after=nope", "** no instance found **"),
+            ("all after=nope", "** no instance found **"),
+        ):
+            with self.subTest(line=line):
+                self.assertEqual(self.run_all(line), error)
+
 
 class TestDestroyCommand(TestCase):
     """Tests the `destroy` command on all models."""
 
+    def setUp(self) -> None:
+        models.storage.all().clear()
+
+    def tearDown(self) -> None:
+        models.storage.all().clear()
+
+        try:
+            os.remove(JSON_FILE_PATH)
+        except FileNotFoundError:
+            pass
+
+    def test_destroy_cascade(self) -> None:
+        """Tests deleting a state with its cities, places and reviews."""
+        state, other_state = State(), State()
+        city, other_city = City(), City()
+        city.state_id = state.id
+        other_city.state_id = other_state.id
+
+        wifi = Amenity()
+        place, other_place = Place(), Place()
+        place.city_id = city.id
+        other_place.city_id = other_city.id
+        place.amenity_ids = other_place.amenity_ids = [wifi.id]
+
+        review = Review()
+        review.place_id = place.id
+
+        with patch("console.storage.save") as mock_save, patch(
+            "sys.stdout", new=StringIO()
+        ) as result:
+            hbnb().onecmd(f"State.destroy({state.id}, --cascade)")
+
+        self.assertEqual(result.getvalue(), "")
+        mock_save.assert_called_once_with()
+        self.assertCountEqual(
+            models.storage.all().values(),
+            [other_state, other_city, other_place, wifi],
+        )
+        self.assertEqual(wifi.places, [other_place])
+
+        with patch("sys.stdout", new=StringIO()):
+            hbnb().onecmd(f"destroy Amenity {wifi.id} --cascade")
+
+        self.assertEqual(other_place.amenity_ids, [])
+        self.assertIn(other_place, models.storage.all().values())
+
+    def test_destroy_without_cascade(self) -> None:
+        """Tests that only the instance is deleted by default."""
+        state = State()
+        city = City()
+        city.state_id = state.id
+
+        with patch("sys.stdout", new=StringIO()):
+            hbnb().onecmd(f"destroy State {state.id}")
+
+        self.assertEqual(list(models.storage.all().values()), [city])
+        self.assertIsNone(city.state)
+
+        with patch("sys.stdout", new=StringIO()) as result:
+            hbnb().onecmd(f"destroy City {city.id} --force")
+        self.assertEqual(result.getvalue(), "** unknown option **\n")
+
+    def test_destroy_events(self) -> None:
+        """Tests that the subscribers are told the instances deleted."""
+        state = State()
+        city = City()
+        city.state_id = state.id
+
+        events = []
+        subscription = models.storage.subscribe(events.append)
+        try:
+            with patch("sys.stdout", new=StringIO()):
+                hbnb().onecmd(f"destroy State {state.id} --cascade")
+        finally:
+            models.storage.unsubscribe(subscription)
+
+        self.assertEqual(
+            events,
+            [
+                Event(DELETED, "State", state.id),
+                Event(DELETED, "City", city.id),
+            ],
+        )
+
 
 class TestCountCommand(TestCase):
     """Tests the `count` command on all models."""
+
+
+class TestRangeCommand(TestCase):
+    """Tests the `range` command."""
+
+    def setUp(self) -> None:
+        models.storage.all().clear()
+
+    def tearDown(self) -> None:
+        models.storage.all().clear()
+
+    def test_range(self) -> None:
+        """Tests printing the places within a price range."""
+        cheap, mid, expensive = Place(), Place(), Place()
+        cheap.price_by_night = 30
+        mid.price_by_night = 90
+        expensive.price_by_night = 300
+
+        for line in (
+            "Place.range(price_by_night, 50, 120)",
+            "range Place price_by_night 50 120",
+        ):
+            with patch("sys.stdout", new=StringIO()) as result:
+                hbnb().onecmd(line)
+            self.assertEqual(result.getvalue().strip(), str([str(mid)]))
+
+        with patch("sys.stdout", new=StringIO()) as result:
+            hbnb().onecmd("Place.range(price_by_night, 90)")
+        self.assertEqual(
+            result.getvalue().strip(), str([str(mid), str(expensive)])
+        )
+
+    def test_range_errors(self) -> None:
+        """Tests the `range` command with missing or invalid arguments."""
+        for line, error in (
+            ("range", "** class name missing **"),
+            ("range Nope", "** class doesn't exist **"),
+            ("range Place", "** attribute name missing **"),
+            ("range Place max_guest", "** value missing **"),
+            (
+                "range Place max_guest two",
+                "** range bounds must be numbers **",
+            ),
+        ):
+            with patch("sys.stdout", new=StringIO()) as result:
+                hbnb().onecmd(line)
+            self.assertEqual(result.getvalue().strip(), error)
+
+
+class TestNearCommand(TestCase):
+    """Tests the `near` command."""
+
+    def setUp(self) -> None:
+        models.storage.all().clear()
+
+    def tearDown(self) -> None:
+        models.storage.all().clear()
+
+    def test_near(self) -> None:
+        """Tests printing the places nearest to a point."""
+        accra, kumasi = Place(), Place()
+        accra.latitude, accra.longitude = 5.6037, -0.1870
+        kumasi.latitude, kumasi.longitude = 6.6885, -1.6244
+
+        for line, expected in (
+            ("Place.near(6.5, -1.5)", [kumasi, accra]),
+            ("Place.near(5.5, -0.1, 1)", [accra]),
+            ("near Place 6.5 -1.5 10 50", [kumasi]),
+        ):
+            with patch("sys.stdout", new=StringIO()) as result:
+                hbnb().onecmd(line)
+            self.assertEqual(
+                result.getvalue().strip(), str([str(obj) for obj in expected])
+            )
+
+    def test_near_errors(self) -> None:
+        """Tests the `near` command with missing or invalid arguments."""
+        for line, error in (
+            ("near", "** class name missing **"),
+            ("near Place 5.5", "** coordinates missing **"),
+            ("near Place north 1", "** coordinates must be numbers **"),
+            ("near User 5.5 1", "** class has no location **"),
+            ("near Place 5.5 1 -5", "** k must be a positive integer **"),
+            ("near Place 5.5 1 0", "** k must be a positive integer **"),
+            ("Place.near(5.5, 1, 2.7)", "** k must be a positive integer **"),
+        ):
+            with patch("sys.stdout", new=StringIO()) as result:
+                hbnb().onecmd(line)
+            self.assertEqual(result.getvalue().strip(), error)
+
+
+class TestWhereCommand(TestCase):
+    """Tests the `where` and `explain` commands."""
+
+    def setUp(self) -> None:
+        models.storage.all().clear()
+
+    def tearDown(self) -> None:
+        models.storage.all().clear()
+
+    def test_where(self) -> None:
+        """Tests printing the instances matching a filter."""
+        cheap, dear = Place(), Place()
+        cheap.price_by_night, cheap.max_guest = 80, 4
+        dear.price_by_night, dear.max_guest = 300, 6
+        dear.name = "Villa, with pool"
+
+        for line, expected in (
+            ("Place.where(price_by_night < 100 and max_guest >= 4)", [cheap]),
+            ('Place.where(name == "Villa, with pool")', [dear]),
+            ("where Place max_guest > 5 or price_by_night <= 80", None),
+            ("where Place not max_guest >= 4", []),
+        ):
+            with patch("sys.stdout", new=StringIO()) as result:
+                hbnb().onecmd(line)
+
+            if expected is None:
+                self.assertIn(str(cheap), result.getvalue())
+                self.assertIn(str(dear), result.getvalue())
+            else:
+                self.assertEqual(
+                    result.getvalue().strip(),
+                    str([str(obj) for obj in expected]),
+                )
+
+    def test_explain(self) -> None:
+        """Tests printing the plan of a filter."""
+        for price in (50, 150, 250):
+            Place().price_by_night = price
+
+        with patch("sys.stdout", new=StringIO()) as result:
+            hbnb().onecmd("Place.explain(price_by_night > 100)")
+
+        lines = result.getvalue().splitlines()
+        self.assertEqual(
+            lines[:4],
+            [
+                "Filter: price_by_night > 100",
+                "Plan: range index on Place.price_by_night in [100, inf]",
+                "Candidates: 2",
+                "Matches: 2",
+            ],
+        )
+        self.assertRegex(lines[4], r"^Planning time: \d+\.\d{3} ms$")
+        self.assertRegex(lines[5], r"^Execution time: \d+\.\d{3} ms$")
+
+    def test_where_errors(self) -> None:
+        """Tests the `where` command with missing or invalid arguments."""
+        for line, error in (
+            ("where", "** class name missing **"),
+            ("where Car a == 1", "** class doesn't exist **"),
+            ("where Place", "** filter missing **"),
+            (
+                "explain Place max_guest >",
+                "** invalid filter: unexpected end of filter **",
+            ),
+            (
+                "Place.where(max_guest == four)",
+                "** invalid filter: expected a value, got 'four' **",
+            ),
+        ):
+            with patch("sys.stdout", new=StringIO()) as result:
+                hbnb().onecmd(line)
+            self.assertEqual(result.getvalue().strip(), error)
+
+
+class TestStatsCommand(TestCase):
+    """Tests the `stats` command."""
+
+    def setUp(self) -> None:
+        models.storage.all().clear()
+
+        for price, guests in ((10, 1), (20, 4), (30, 5)):
+            place = Place()
+            place.price_by_night = price
+            place.max_guest = guests
+
+    def tearDown(self) -> None:
+        models.storage.all().clear()
+
+    def test_stats(self) -> None:
+        """Tests printing statistics, with and without a filter."""
+        for line, expected in (
+            (
+                "Place.stats(price_by_night)",
+                "count: 3\nmin: 10.0\nmax: 30.0\nmean: 20.0\n"
+                "stddev: 8.164966\nsum: 60.0\np25: 15.0\np50: 20.0\n"
+                "p75: 25.0\np90: 28.0\np99: 29.8\n",
+            ),
+            (
+                "stats Place price_by_night where max_guest > 4",
+                "count: 1\nmin: 30.0\nmax: 30.0\nmean: 30.0\nstddev: 0.0\n"
+                "sum: 30.0\np25: 30.0\np50: 30.0\np75: 30.0\np90: 30.0\n"
+                "p99: 30.0\n",
+            ),
+            ("Place.stats(name)", "count: 0\n"),
+        ):
+            with patch("sys.stdout", new=StringIO()) as result:
+                hbnb().onecmd(line)
+            self.assertEqual(result.getvalue(), expected)
+
+    def test_stats_errors(self) -> None:
+        """Tests the `stats` command with missing or invalid arguments."""
+        for line, error in (
+            ("stats", "** class name missing **"),
+            ("stats Car price", "** class doesn't exist **"),
+            ("stats Place", "** attribute name missing **"),
+            ("stats Place price_by_night max_guest", None),
+            ("stats Place price_by_night where", None),
+            (
+                "stats Place price_by_night where max_guest >",
+                "** invalid filter: unexpected end of filter **",
+            ),
+        ):
+            with patch("sys.stdout", new=StringIO()) as result:
+                hbnb().onecmd(line)
+            self.assertEqual(
+                result.getvalue().strip(),
+                error or "** filter missing after where **",
+            )
+
+
+class TestSearchCommand(TestCase):
+    """Tests the `search` command."""
+
+    def setUp(self) -> None:
+        models.storage.all().clear()
+
+        # the text indexes are saved next to the storage file
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        file_storage = FileStorage(
+            os.path.join(tmp_dir.name, "file_storage.json")
+        )
+        for target in ("models.storage", "console.storage"):
+            patcher = patch(target, file_storage)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self) -> None:
+        models.storage.all().clear()
+
+    def test_search(self) -> None:
+        """Tests printing the reviews mentioning some words."""
+        quiet, noisy = Review(), Review()
+        quiet.text = "A quiet room with a view of the sea"
+        noisy.text = "Noisy street, but the room was clean"
+
+        for line, expected in (
+            ('search Review "quiet sea"', [quiet]),
+            ('Review.search("room NOISY")', [noisy, quiet]),
+            ('search Review "mountains"', []),
+        ):
+            with patch("sys.stdout", new=StringIO()) as result:
+                hbnb().onecmd(line)
+            self.assertEqual(
+                result.getvalue().strip(), str([str(obj) for obj in expected])
+            )
+
+    def test_search_after_update(self) -> None:
+        """Tests that updated texts are searched by their new words."""
+        review = Review()
+        review.save()
+
+        with patch("sys.stdout", new=StringIO()):
+            hbnb().onecmd(f'update Review {review.id} text "great host"')
+
+        with patch("sys.stdout", new=StringIO()) as result:
+            hbnb().onecmd('search Review "host"')
+        self.assertEqual(result.getvalue().strip(), str([str(review)]))
+
+    def test_search_errors(self) -> None:
+        """Tests the `search` command with missing or invalid arguments."""
+        for line, error in (
+            ("search", "** class name missing **"),
+            ("search Review", "** search terms missing **"),
+            ('search User "bob"', "** class has no text index **"),
+        ):
+            with patch("sys.stdout", new=StringIO()) as result:
+                hbnb().onecmd(line)
+            self.assertEqual(result.getvalue().strip(), error)
+
+
+class TestQuitCommand(TestCase):
+    """Tests the `quit` and `EOF` commands."""
+
+    def test_quit_and_eof_flush_the_storage(self) -> None:
+        """Tests that pending writes are flushed before exiting."""
+        for command in ("quit", "EOF"):
+            with patch("console.storage") as mock_storage, patch(
+                "sys.stdout", new=StringIO()
+            ):
+                self.assertTrue(hbnb().onecmd(command.lower()))
+
+            mock_storage.flush.assert_called_once_with()
@@ -84,6 +84,29 @@ class TestBaseModel(unittest.TestCase):
             f"[BaseModel] ({self.base1.id}) {self.base1.__dict__}",
         )
 
+    def test_formatter(self) -> None:
+        """Tests formatting instances with only some attributes."""
+        self.base1.name = "Test Name"
+        self.base1.number = 25
+        formatter = BaseModel.formatter(("number", "id", "number"))
+
+        self.assertIs(formatter, BaseModel.formatter(["number", "id"]))
+        self.assertEqual(
+            formatter(self.base1),
+            f"[BaseModel] ({self.base1.id}) "
+            f"{ {'number': 25, 'id': self.base1.id} }",
+        )
+
+        # instances missing an attribute are formatted without it
+        self.assertEqual(
+            formatter(self.base2),
+            f"[BaseModel] ({self.base2.id}) { {'id': self.base2.id} }",
+        )
+        self.assertEqual(
+            BaseModel.formatter(("name",))(self.base1),
+            f"[BaseModel] ({self.base1.id}) {{'name': 'Test Name'}}",
+        )
+
     def test_unique_id(self) -> None:
         """Tests to ensure no two objects have the same UUID."""
         self.assertNotEqual(self.base1.id, self.base2.id)
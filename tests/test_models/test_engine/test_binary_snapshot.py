@@ -0,0 +1,136 @@
+#!/usr/bin/python3
+
+"""Tests the binary snapshot format of the file storage engine."""
+
+import os
+import json
+import tempfile
+import unittest
+from unittest.mock import patch
+from datetime import datetime, timezone
+from models.engine import binary_snapshot
+from convert_snapshot import main
+
+
+class TestBinarySnapshot(unittest.TestCase):
+    """Tests the `dump()` and `load()` functions."""
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "file_storage.bin")
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def round_trip(self, records: list) -> list:
+        """Dumps `records` and returns what is loaded back."""
+        binary_snapshot.dump(records, self.path)
+
+        return [
+            (model_name, dict(zip(names, values)))
+            for model_name, names, rows in binary_snapshot.load(self.path)
+            for values in rows
+        ]
+
+    def test_attribute_types(self) -> None:
+        """Tests that every type of attribute is loaded back as it was."""
+        attributes = {
+            "id": "5f0e5e07-6fe4-4b7e-a0b7-6a0ad8f1d2c3",
+            "created_at": datetime(2024, 2, 29, 23, 59, 59, 999999),
+            "updated_at": datetime(1969, 7, 20, 20, 17, 40, 1),
+            "name": "Kumasi – Ashanti",
+            "empty": "",
+            "nothing": None,
+            "flag": True,
+            "rooms": -3,
+            "huge": 2**70,
+            "latitude": 5.6037,
+            "amenity_ids": ["a", "b"],
+            "extra": {"nested": [1, None]},
+        }
+
+        self.assertEqual(
+            self.round_trip([("Place", attributes)]), [("Place", attributes)]
+        )
+
+    def test_fallbacks(self) -> None:
+        """Tests ids that aren't UUIDs and dates with a time zone."""
+        records = [
+            ("User", {"id": "1234", "created_at": datetime.now()}),
+            ("User", {"id": "5F0E5E07-6FE4-4B7E-A0B7-6A0AD8F1D2C3"}),
+            (
+                "User",
+                {"updated_at": datetime(2024, 1, 1, tzinfo=timezone.utc)},
+            ),
+        ]
+
+        self.assertEqual(self.round_trip(records), records)
+
+    def test_shared_strings(self) -> None:
+        """Tests that repeated strings are only stored once."""
+        records = [("City", {"state_id": "x" * 1000})] * 100
+
+        self.assertEqual(self.round_trip(records), records)
+        self.assertLess(os.path.getsize(self.path), 2000)
+
+    def test_empty(self) -> None:
+        """Tests snapshots without objects or attributes."""
+        self.assertEqual(self.round_trip([]), [])
+        self.assertEqual(
+            self.round_trip([("BaseModel", {})] * 2), [("BaseModel", {})] * 2
+        )
+
+    def test_not_a_snapshot(self) -> None:
+        """Tests that other files are rejected."""
+        with open(self.path, "w", encoding="utf-8") as json_file:
+            json.dump({}, json_file)
+
+        with self.assertRaises(ValueError):
+            list(binary_snapshot.load(self.path))
+
+    def test_converters(self) -> None:
+        """Tests converting a JSON file to a snapshot and back."""
+        content = {
+            "User.5f0e5e07-6fe4-4b7e-a0b7-6a0ad8f1d2c3": {
+                "id": "5f0e5e07-6fe4-4b7e-a0b7-6a0ad8f1d2c3",
+                "created_at": "2024-01-01T10:00:00.000001",
+                "updated_at": "2024-01-02T10:00:00",
+                "email": "betty@alx.com",
+                "__class__": "User",
+            },
+            "City.1": {
+                "id": "1",
+                "created_at": "2024-01-01T10:00:00+00:00",
+                "updated_at": "2024-01-01T10:00:00+00:00",
+                "name": "Accra",
+                "__class__": "City",
+            },
+        }
+
+        json_path = os.path.join(self.tmp_dir.name, "file_storage.json")
+        with open(json_path, "w", encoding="utf-8") as json_file:
+            json.dump(content, json_file, indent=4)
+
+        binary_snapshot.json_to_binary(json_path, self.path)
+        os.remove(json_path)
+        binary_snapshot.binary_to_json(self.path, json_path)
+
+        with open(json_path, "r", encoding="utf-8") as json_file:
+            self.assertEqual(json.load(json_file), content)
+
+
+    def test_convert_snapshot(self) -> None:
+        """Tests the command line converter."""
+        json_path = os.path.join(self.tmp_dir.name, "file_storage.json")
+        with open(json_path, "w", encoding="utf-8") as json_file:
+            json.dump({}, json_file)
+
+        self.assertEqual(main(["to-binary", json_path, self.path]), 0)
+        self.assertTrue(os.path.exists(self.path))
+
+        with patch("sys.stderr"):
+            self.assertEqual(main(["to-yaml"]), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
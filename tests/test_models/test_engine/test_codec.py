@@ -0,0 +1,74 @@
+#!/usr/bin/python3
+
+"""Tests the codecs of the file storage engine."""
+
+import io
+import json
+import unittest
+from unittest.mock import patch
+from models.place import Place
+from models.engine.codec import CODECS, JSONCodec, get_codec
+
+
+class TestCodecs(unittest.TestCase):
+    """Tests every codec available."""
+
+    def setUp(self) -> None:
+        place = Place()
+        place.name = "Kumasi – Ashanti"
+        place.number_rooms = 4
+        place.latitude = -0.5
+        place.amenity_ids = ["1", "2"]
+        place.rules = {"pets": False, "smoking": None}
+
+        self.objects = {f"Place.{place.id}": place.to_dict()}
+
+    def decode(self, codec: "Codec", content: "bytes | str") -> dict:
+        """Returns the objects decoded from `content`."""
+        if codec.binary:
+            file = io.BytesIO(content)
+        else:
+            file = io.StringIO(content, newline="")
+
+        return dict(codec.decode(file))
+
+    def test_round_trip(self) -> None:
+        """Tests that every codec decodes exactly what it encoded."""
+        for name, codec in CODECS.items():
+            with self.subTest(codec=name):
+                content = codec.encode(self.objects)
+
+                self.assertIsInstance(content, bytes if codec.binary else str)
+                self.assertEqual(self.decode(codec, content), self.objects)
+                self.assertEqual(self.decode(codec, codec.encode({})), {})
+
+    def test_round_trip_without_orjson(self) -> None:
+        """Tests the JSON codecs when `orjson` isn't installed."""
+        with patch("models.engine.codec.orjson", None):
+            for name in ("json-compact", "jsonl"):
+                with self.subTest(codec=name):
+                    codec = CODECS[name]
+                    content = codec.encode(self.objects)
+
+                    self.assertEqual(
+                        self.decode(codec, content), self.objects
+                    )
+
+    def test_json_layout(self) -> None:
+        """Tests that the json codec writes what `json.dump` does."""
+        self.assertEqual(
+            JSONCodec().encode(self.objects),
+            json.dumps(self.objects, indent=4),
+        )
+        self.assertEqual(JSONCodec().encode({}), json.dumps({}, indent=4))
+
+    def test_get_codec(self) -> None:
+        """Tests looking up codecs by name."""
+        self.assertIs(get_codec("pickle"), CODECS["pickle"])
+
+        with self.assertRaises(ValueError):
+            get_codec("yaml")
+
+
+if __name__ == "__main__":
+    unittest.main()
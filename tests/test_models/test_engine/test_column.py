@@ -0,0 +1,57 @@
+#!/usr/bin/python3
+
+"""Tests the numeric columns used for statistics."""
+
+import random
+import statistics
+import unittest
+from models.engine.column import NumericColumn
+
+
+class TestNumericColumn(unittest.TestCase):
+    """Tests the NumericColumn class."""
+
+    def test_values(self) -> None:
+        """Tests that only numbers are kept, sorted."""
+        column = NumericColumn([3, "4", 1.5, None, True, float("nan"), -2])
+
+        self.assertEqual(list(column.values), [-2.0, 1.5, 3.0])
+        self.assertEqual(column.values.typecode, "d")
+        self.assertEqual(len(column), 3)
+
+    def test_summary(self) -> None:
+        """Tests the statistics against the statistics module."""
+        random.seed(0)
+        values = [random.uniform(0, 500) for _ in range(1001)]
+        stats = NumericColumn(values).summary()
+
+        self.assertEqual(stats["count"], 1001)
+        self.assertEqual(stats["min"], min(values))
+        self.assertEqual(stats["max"], max(values))
+        self.assertAlmostEqual(stats["mean"], statistics.fmean(values))
+        self.assertAlmostEqual(stats["stddev"], statistics.pstdev(values))
+        self.assertAlmostEqual(stats["sum"], sum(values))
+        self.assertAlmostEqual(stats["p50"], statistics.median(values))
+
+        quantiles = statistics.quantiles(values, n=100, method="inclusive")
+        for percent in (25, 75, 90, 99):
+            self.assertAlmostEqual(
+                stats[f"p{percent}"], quantiles[percent - 1]
+            )
+
+    def test_percentile(self) -> None:
+        """Tests interpolating between values."""
+        column = NumericColumn([10, 20, 30, 40])
+
+        self.assertEqual(column.percentile(0), 10)
+        self.assertEqual(column.percentile(100), 40)
+        self.assertEqual(column.percentile(50), 25)
+        self.assertAlmostEqual(column.percentile(90), 37)
+
+    def test_empty(self) -> None:
+        """Tests the statistics of an empty column."""
+        column = NumericColumn(["a", None])
+
+        self.assertEqual(column.summary(), {"count": 0})
+        with self.assertRaises(ValueError):
+            column.percentile(50)
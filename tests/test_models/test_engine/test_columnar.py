@@ -0,0 +1,164 @@
+#!/usr/bin/python3
+
+"""Tests the columnar projections of the objects of a model."""
+
+import unittest
+from datetime import datetime
+from models.engine.columnar import ColumnarProjection
+
+
+class Room:
+    """An object with integer, float and string attributes."""
+
+    kind = ""
+    guests = 0
+    price = 0.0
+    is_open = True
+    photos = []
+
+    def __init__(self, kind: str, guests: int, price: float) -> None:
+        self.kind = kind
+        self.guests = guests
+        self.price = price
+        self.created_at = self.updated_at = datetime(2024, 1, 1, 12)
+
+
+class TestColumnarProjection(unittest.TestCase):
+    """Tests the ColumnarProjection class."""
+
+    def setUp(self) -> None:
+        self.projection = ColumnarProjection(Room)
+        self.rooms = {
+            "Room.1": Room("suite", 2, 120.5),
+            "Room.2": Room("single", 1, 60),
+            "Room.3": Room("suite", 4, 300.0),
+        }
+        for key, room in self.rooms.items():
+            self.projection.add(key, room)
+
+    def test_columns(self) -> None:
+        """Tests the columns built from the class attributes and their
+        types."""
+        columns = self.projection.columns
+
+        self.assertEqual(
+            list(columns),
+            ["kind", "guests", "price", "created_at", "updated_at"],
+        )
+        self.assertEqual(columns["guests"].values.typecode, "q")
+        self.assertEqual(columns["price"].values.typecode, "d")
+        self.assertEqual(columns["created_at"].values.typecode, "q")
+        self.assertEqual(list(columns["kind"].values), [0, 1, 0])
+        self.assertEqual(columns["kind"].strings, ["suite", "single"])
+        self.assertEqual(len(self.projection), 3)
+
+        self.assertEqual(
+            self.projection.row("Room.2"),
+            {
+                "kind": "single",
+                "guests": 1,
+                "price": 60.0,
+                "created_at": datetime(2024, 1, 1, 12),
+                "updated_at": datetime(2024, 1, 1, 12),
+            },
+        )
+
+    def test_nulls(self) -> None:
+        """Tests that values of another type than their column are null."""
+        room = self.rooms["Room.1"]
+        room.guests, room.price, room.kind = "two", True, None
+        room.created_at = "2024-01-01"
+        self.projection.add("Room.1", room)
+
+        self.assertEqual(
+            self.projection.row("Room.1"),
+            {
+                "kind": None,
+                "guests": None,
+                "price": None,
+                "created_at": None,
+                "updated_at": datetime(2024, 1, 1, 12),
+            },
+        )
+        self.assertEqual(list(self.projection.numbers("guests")), [1, 4])
+        self.assertEqual(self.projection.compare("guests", ">", 0)[1], {0})
+
+    def test_update_and_remove(self) -> None:
+        """Tests that rows are updated in place and that removed rows are
+        replaced by the last one."""
+        self.rooms["Room.2"].guests = 3
+        self.projection.add("Room.2", self.rooms["Room.2"])
+        self.assertEqual(self.projection.keys, ["Room.1", "Room.2", "Room.3"])
+
+        self.projection.remove("Room.1")
+        self.projection.remove("Room.9")
+        self.assertEqual(self.projection.keys, ["Room.3", "Room.2"])
+        self.assertEqual(self.projection.rows, {"Room.3": 0, "Room.2": 1})
+        self.assertEqual(list(self.projection.numbers("guests")), [4, 3])
+        self.assertEqual(self.projection.row("Room.3")["kind"], "suite")
+
+        self.projection.remove("Room.2")
+        self.projection.remove("Room.3")
+        self.assertEqual(len(self.projection), 0)
+        self.assertEqual(
+            self.projection.compare("guests", ">", 0), (set(), set())
+        )
+
+    def test_string_dictionary(self) -> None:
+        """Tests that the strings no row holds any longer are dropped from
+        the dictionary, and their codes reused."""
+        column = self.projection.columns["kind"]
+        self.assertEqual(column.codes, {"suite": 0, "single": 1})
+
+        self.rooms["Room.2"].kind = "double"
+        self.projection.add("Room.2", self.rooms["Room.2"])
+        self.projection.remove("Room.1")
+        self.assertEqual(column.codes, {"suite": 0, "double": 2})
+        self.assertEqual(column.counts, [1, 0, 1])
+
+        self.projection.add("Room.4", Room("loft", 2, 90.0))
+        self.assertEqual(column.codes, {"suite": 0, "double": 2, "loft": 1})
+        self.assertEqual(self.projection.row("Room.4")["kind"], "loft")
+
+        self.projection.remove("Room.3")
+        self.assertEqual(self.projection.keys, ["Room.4", "Room.2"])
+        self.assertEqual(column.codes, {"double": 2, "loft": 1})
+        self.assertEqual(
+            self.projection.compare("kind", ">=", "e"), ({0}, set())
+        )
+
+    def test_numbers(self) -> None:
+        """Tests reading the values of numeric columns."""
+        self.assertEqual(
+            list(self.projection.numbers("price")), [120.5, 60.0, 300.0]
+        )
+        self.assertEqual(
+            list(self.projection.numbers("guests", {0, 2})), [2, 4]
+        )
+        self.assertIsNone(self.projection.numbers("kind"))
+        self.assertIsNone(self.projection.numbers("created_at"))
+        self.assertIsNone(self.projection.numbers("view"))
+
+    def test_compare(self) -> None:
+        """Tests comparing columns to literals."""
+        for attribute, operator, literal, expected in (
+            ("guests", ">=", 2, ({0, 2}, set())),
+            ("guests", "<", 2.5, ({0, 1}, set())),
+            ("price", "==", 60, ({1}, set())),
+            ("price", "!=", 60, ({0, 2}, set())),
+            ("kind", "==", "suite", ({0, 2}, set())),
+            ("kind", "<", "suite", ({1}, set())),
+            ("kind", "==", "double", (set(), set())),
+            ("guests", "==", "2", (set(), {0, 1, 2})),
+            ("guests", "==", True, (set(), {0, 1, 2})),
+            ("kind", "==", None, (set(), {0, 1, 2})),
+            ("created_at", "<", 0, (set(), {0, 1, 2})),
+        ):
+            with self.subTest(attribute=attribute, operator=operator):
+                self.assertEqual(
+                    self.projection.compare(attribute, operator, literal),
+                    expected,
+                )
+
+        self.assertIsNone(self.projection.compare("view", "==", "sea"))
+        self.assertIsNone(self.projection.compare("photos", "==", []))
@@ -0,0 +1,143 @@
+#!/usr/bin/python3
+
+"""Tests the DBStorage engine."""
+
+import os
+import inspect
+import sqlite3
+import tempfile
+import threading
+import unittest
+from models import storage
+from models.user import User
+from models.city import City
+from models.place import Place
+from models.state import State
+from models.engine.db_storage import DBStorage
+
+
+class TestDBStorageDocumentation(unittest.TestCase):
+    """Tests the documentation for modules, classes and methods for
+    DBStorage."""
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        """Set up class method for the doc tests."""
+        cls.methods = inspect.getmembers(DBStorage, inspect.isfunction)
+
+    def test_classes_docstring_exists(self) -> None:
+        """Tests if class docstring documentation exists."""
+        self.assertIsNotNone(DBStorage.__doc__)
+
+    def test_methods_docstring_exists(self) -> None:
+        """Tests if methods docstring documentation exists."""
+        for _, method in self.methods:
+            self.assertIsNotNone(method.__doc__)
+
+
+class TestDBStorage(unittest.TestCase):
+    """Tests saving and reloading objects with the DBStorage engine."""
+
+    def setUp(self) -> None:
+        storage.all().clear()
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, "hbnb.db")
+        self.storage = DBStorage(self.db_path)
+
+    def tearDown(self) -> None:
+        self.storage.close()
+        storage.all().clear()
+        self.tmp_dir.cleanup()
+
+    def count_rows(self, model_name: str) -> int:
+        """Returns the number of rows in a model table."""
+        with sqlite3.connect(self.db_path) as connection:
+            return connection.execute(
+                f'SELECT COUNT(*) FROM "{model_name}"'
+            ).fetchone()[0]
+
+    def test_wal_journal_mode(self) -> None:
+        """Tests that the database uses write-ahead logging."""
+        with sqlite3.connect(self.db_path) as connection:
+            mode = connection.execute("PRAGMA journal_mode").fetchone()[0]
+
+        self.assertEqual(mode, "wal")
+
+    def test_save_per_class_tables(self) -> None:
+        """Tests that objects are saved in the table of their model."""
+        User()
+        User()
+        City()
+        self.storage.save()
+
+        self.assertEqual(self.count_rows("User"), 2)
+        self.assertEqual(self.count_rows("City"), 1)
+        self.assertEqual(self.count_rows("Place"), 0)
+        self.assertEqual(self.storage.dirty_count(), 0)
+
+    def test_save_and_reload(self) -> None:
+        """Tests that reloaded objects match the saved ones."""
+        place = Place()
+        place.name = "Lazy House"
+        place.max_guest = 4
+        place.amenity_ids = ["1234", "5678"]
+        self.storage.save()
+
+        expected = place.to_dict()
+        storage.all().clear()
+        DBStorage(self.db_path).reload()
+
+        reloaded = storage.all()[f"Place.{place.id}"]
+        self.assertIsInstance(reloaded, Place)
+        self.assertEqual(reloaded.to_dict(), expected)
+
+    def test_save_update_and_delete(self) -> None:
+        """Tests that updates and deletions reach the database."""
+        user = User()
+        state = State()
+        self.storage.save()
+
+        user.email = "john.doe@lzcorp.it"
+        del storage.all()[f"State.{state.id}"]
+        self.storage.save()
+
+        self.assertEqual(self.count_rows("State"), 0)
+
+        storage.all().clear()
+        self.storage.reload()
+        self.assertEqual(list(storage.all()), [f"User.{user.id}"])
+        self.assertEqual(
+            storage.all()[f"User.{user.id}"].email, "john.doe@lzcorp.it"
+        )
+
+    def test_save_dict_key_error(self) -> None:
+        """Tests for invalid keys in the dictionary while saving objects."""
+        storage.all().update({"User": User()})
+
+        with self.assertRaisesRegex(KeyError, "key must be <class name>.<id>"):
+            self.storage.save()
+
+    def test_save_from_threads(self) -> None:
+        """Tests that the storage saves from other threads, while others
+        change the objects."""
+        errors = []
+
+        def run() -> None:
+            try:
+                for _ in range(20):
+                    User()
+                    self.storage.save()
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=run) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(self.count_rows("User"), 80)
+        self.assertEqual(self.storage.dirty_count(), 0)
+
@@ -0,0 +1,114 @@
+#!/usr/bin/python3
+
+"""Tests the events published on changes to the instances."""
+
+import threading
+import unittest
+from models.engine.events import (
+    CREATED,
+    DELETED,
+    UPDATED,
+    BatchedSubscription,
+    Event,
+    EventBus,
+    Subscription,
+)
+
+
+class TestEventBus(unittest.TestCase):
+    """Tests the EventBus class and its subscriptions."""
+
+    def setUp(self) -> None:
+        self.bus = EventBus()
+        self.events = [
+            Event(CREATED, "User", "1", ("id", "created_at", "updated_at")),
+            Event(UPDATED, "User", "1", ("email",)),
+            Event(DELETED, "User", "1"),
+        ]
+
+    def test_subscription(self) -> None:
+        """Tests that synchronous subscribers get every event in order."""
+        received = []
+        subscription = self.bus.subscribe(Subscription(received.append))
+
+        self.bus.publish(iter(self.events))
+        self.assertEqual(received, self.events)
+        self.assertTrue(subscription.flush())
+
+        self.bus.unsubscribe(subscription)
+        self.bus.publish(self.events)
+        self.assertEqual(len(received), 3)
+        self.assertEqual(self.bus.subscriptions, ())
+        self.assertEqual(
+            repr(self.events[2]), "Event('deleted', 'User', '1', ())"
+        )
+
+    def test_batched_subscription(self) -> None:
+        """Tests that batched subscribers get lists of events from another
+        thread."""
+        batches, threads = [], set()
+
+        def receive(batch: list) -> None:
+            threads.add(threading.current_thread())
+            batches.append(batch)
+
+        subscription = self.bus.subscribe(
+            BatchedSubscription(receive, batch_size=2)
+        )
+        self.bus.publish(self.events)
+
+        self.assertTrue(subscription.flush(5))
+        self.assertEqual(sum(batches, []), self.events)
+        self.assertLessEqual(max(map(len, batches)), 2)
+        self.assertNotIn(threading.current_thread(), threads)
+
+        with self.assertRaises(ValueError):
+            BatchedSubscription(receive, queue_size=0)
+
+    def test_overflow(self) -> None:
+        """Tests that the events not fitting in the queue are dropped,
+        without waiting for a slow subscriber."""
+        received = []
+        started, release = threading.Event(), threading.Event()
+
+        def receive(batch: list) -> None:
+            started.set()
+            release.wait(5)
+            received.extend(batch)
+
+        subscription = self.bus.subscribe(
+            BatchedSubscription(receive, batch_size=1, queue_size=2)
+        )
+        self.bus.publish(self.events[:1])
+        self.assertTrue(started.wait(5))
+
+        # the subscriber is busy with the first event
+        self.bus.publish(self.events * 2)
+        self.assertEqual(subscription.dropped, 4)
+        self.assertFalse(subscription.flush(0))
+
+        release.set()
+        self.bus.unsubscribe(subscription)
+        self.assertEqual(received, self.events[:1] + self.events[:2])
+
+    def test_failing_subscriber(self) -> None:
+        """Tests that the errors of a batched subscriber are kept, and that
+        it still gets the next events."""
+        received = []
+
+        def receive(batch: list) -> None:
+            received.extend(batch)
+            raise RuntimeError("down")
+
+        subscription = self.bus.subscribe(
+            BatchedSubscription(receive, batch_size=1)
+        )
+        self.bus.publish(self.events)
+        self.bus.unsubscribe(subscription)
+
+        self.assertEqual(received, self.events)
+        self.assertIsInstance(subscription.error, RuntimeError)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,9 +3,15 @@
 """Tests the FileStorage engine."""
 
 import os
+import sys
 import json
+import time
 import inspect
+import tempfile
+import threading
 import unittest
+import subprocess
+from unittest.mock import patch
 from models import storage
 from models.user import User
 from models.city import City
@@ -14,7 +20,11 @@ from models.place import Place
 from models.review import Review
 from models.amenity import Amenity
 from models.base_model import BaseModel
+from models.engine.codec import CODECS
+from models.engine.events import CREATED, DELETED, UPDATED, Event
+from models.engine.column import NumericColumn
 from models.engine.file_storage import FileStorage
+from models.engine.snapshot import Snapshot
 from tests.test_models.test_base_model import JSON_FILE_PATH
 
 
@@ -241,3 +251,1898 @@ class TestFileStorageReloadMethod(unittest.TestCase):
 
         with self.assertRaises(TypeError):
             storage.reload()
+
+
+class TestFileStorageJournal(unittest.TestCase):
+    """Tests the journal mode of the FileStorage engine."""
+
+    def setUp(self) -> None:
+        storage.all().clear()
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tmp_dir.name, "file_storage.json")
+        self.journal_path = f"{self.file_path}.journal"
+        self.storage = FileStorage(self.file_path, journal=True)
+
+    def tearDown(self) -> None:
+        storage.all().clear()
+        self.tmp_dir.cleanup()
+
+    def get_records(self) -> list:
+        """Returns the records written to the journal."""
+        with open(self.journal_path, "r", encoding="utf-8") as journal:
+            return [json.loads(line) for line in journal]
+
+    def test_save_appends_new_objects(self) -> None:
+        """Tests that new objects are appended to the journal on save."""
+        user = User()
+        city = City()
+
+        self.storage.save()
+
+        self.assertFalse(os.path.exists(self.file_path))
+        self.assertCountEqual(
+            [record[1] for record in self.get_records()],
+            [f"User.{user.id}", f"City.{city.id}"],
+        )
+
+    def test_save_only_appends_changes(self) -> None:
+        """Tests that only the updated objects are appended on save."""
+        user = User()
+        City()
+        self.storage.save()
+
+        user.first_name = "John"
+        self.storage.save()
+
+        records = self.get_records()
+        self.assertEqual(len(records), 3)
+        self.assertEqual(records[-1][0], "set")
+        self.assertEqual(records[-1][2]["first_name"], "John")
+
+        # nothing changed, nothing is appended
+        self.storage.save()
+        self.assertEqual(len(self.get_records()), 3)
+
+    def test_save_appends_deletions(self) -> None:
+        """Tests that deleted objects are recorded in the journal."""
+        user = User()
+        self.storage.save()
+
+        del storage.all()[f"User.{user.id}"]
+        self.storage.save()
+
+        self.assertEqual(self.get_records()[-1], ["del", f"User.{user.id}"])
+
+    def test_reload_replays_journal(self) -> None:
+        """Tests that a reload replays the journal records."""
+        user = User()
+        place = Place()
+        self.storage.save()
+
+        user.email = "john.doe@lzcorp.it"
+        del storage.all()[f"Place.{place.id}"]
+        self.storage.save()
+
+        storage.all().clear()
+        FileStorage(self.file_path, journal=True).reload()
+
+        self.assertEqual(list(storage.all()), [f"User.{user.id}"])
+        self.assertEqual(
+            storage.all()[f"User.{user.id}"].email, "john.doe@lzcorp.it"
+        )
+
+    def test_reload_ignores_torn_last_record(self) -> None:
+        """Tests that a partially written last record is ignored."""
+        user = User()
+        self.storage.save()
+
+        with open(self.journal_path, "a", encoding="utf-8") as journal:
+            journal.write('["set", "User.1234", {"id"')
+
+        storage.all().clear()
+        self.storage.reload()
+
+        self.assertEqual(list(storage.all()), [f"User.{user.id}"])
+
+    def test_checkpoint(self) -> None:
+        """Tests that a checkpoint folds the journal into the JSON file."""
+        user = User()
+        self.storage.save()
+        self.storage.checkpoint()
+
+        self.assertEqual(self.get_records(), [])
+        with open(self.file_path, "r", encoding="utf-8") as json_file:
+            self.assertIn(f"User.{user.id}", json.load(json_file))
+
+        storage.all().clear()
+        self.storage.reload()
+        self.assertIn(f"User.{user.id}", storage.all())
+
+    def test_checkpoint_interval(self) -> None:
+        """Tests that a checkpoint happens once the interval is reached."""
+        journal_storage = FileStorage(
+            self.file_path, journal=True, checkpoint_interval=3
+        )
+
+        for _ in range(2):
+            State()
+            journal_storage.save()
+
+        self.assertEqual(len(self.get_records()), 2)
+        self.assertFalse(os.path.exists(self.file_path))
+
+        State()
+        journal_storage.save()
+
+        self.assertEqual(self.get_records(), [])
+        with open(self.file_path, "r", encoding="utf-8") as json_file:
+            self.assertEqual(len(json.load(json_file)), 3)
+
+    def test_checkpoint_waits_for_save(self) -> None:
+        """Tests that a checkpoint waits for the save in progress, which
+        writes the same temporary file without locking the objects."""
+        default_storage = FileStorage(self.file_path)
+        writing, release = threading.Event(), threading.Event()
+        write_file = default_storage._FileStorage__write_file
+        writes, errors = [], []
+
+        def slow_write_file(*args, **kwargs) -> dict:
+            writes.append("start")
+            if not writing.is_set():
+                writing.set()
+                release.wait(5)
+            try:
+                return write_file(*args, **kwargs)
+            finally:
+                writes.append("end")
+
+        def run(target) -> threading.Thread:
+            def catch() -> None:
+                try:
+                    target()
+                except Exception as error:
+                    errors.append(error)
+
+            thread = threading.Thread(target=catch)
+            thread.start()
+            return thread
+
+        User()
+        with patch.object(
+            default_storage, "_FileStorage__write_file", slow_write_file
+        ):
+            saver = run(default_storage.save)
+            self.assertTrue(writing.wait(5))
+
+            checkpointer = run(default_storage.checkpoint)
+            checkpointer.join(0.05)
+            release.set()
+            saver.join(5)
+            checkpointer.join(5)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(writes, ["start", "end", "start", "end"])
+        with open(self.file_path, "r", encoding="utf-8") as json_file:
+            self.assertEqual(len(json.load(json_file)), 1)
+
+
+class TestFileStorageDirtyTracking(unittest.TestCase):
+    """Tests the dirty tracking of the FileStorage engine."""
+
+    def setUp(self) -> None:
+        storage.all().clear()
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tmp_dir.name, "file_storage.json")
+        self.storage = FileStorage(self.file_path)
+
+        # start from a clean state
+        self.storage.save()
+
+    def tearDown(self) -> None:
+        storage.all().clear()
+        self.tmp_dir.cleanup()
+
+    def test_dirty_count(self) -> None:
+        """Tests the number of dirty objects before and after a save."""
+        user = User()
+        City()
+        self.assertEqual(self.storage.dirty_count(), 2)
+
+        self.storage.save()
+        self.assertEqual(self.storage.dirty_count(), 0)
+
+        user.first_name = "Betty"
+        self.assertEqual(self.storage.dirty_count(), 1)
+
+        del storage.all()[f"User.{user.id}"]
+        self.assertEqual(self.storage.dirty_count(), 1)
+
+    def test_unregistered_object_not_dirty(self) -> None:
+        """Tests that changes to objects not in storage are ignored."""
+        user = User()
+        self.storage.save()
+
+        twin = User(**user.to_dict())
+        twin.first_name = "Lucy"
+
+        self.assertEqual(self.storage.dirty_count(), 0)
+
+    def test_same_output_as_json_dump(self) -> None:
+        """Tests that the file matches `json.dump` with an indent of 4."""
+        user = User()
+        place = Place()
+        place.amenity_ids = ["1234", "5678"]
+        self.storage.save()
+
+        user.last_name = "Doe"
+        Review()
+        self.storage.save()
+
+        expected = json.dumps(
+            {key: obj.to_dict() for key, obj in storage.all().items()},
+            indent=4,
+        )
+        with open(self.file_path, "r", encoding="utf-8") as json_file:
+            self.assertEqual(json_file.read(), expected)
+
+    def test_only_dirty_objects_serialized(self) -> None:
+        """Tests that clean objects are not serialized again on save."""
+        users = [User() for _ in range(5)]
+        self.storage.save()
+
+        users[0].first_name = "Bob"
+        with patch.object(
+            User, "to_dict", autospec=True, side_effect=BaseModel.to_dict
+        ) as to_dict:
+            self.storage.save()
+
+        to_dict.assert_called_once_with(users[0])
+
+    def test_deleted_object_removed_from_file(self) -> None:
+        """Tests that deleted objects are dropped from the file."""
+        user = User()
+        city = City()
+        self.storage.save()
+
+        del storage.all()[f"City.{city.id}"]
+        self.storage.save()
+
+        with open(self.file_path, "r", encoding="utf-8") as json_file:
+            self.assertEqual(list(json.load(json_file)), [f"User.{user.id}"])
+
+
+class TestFileStorageAllByModel(unittest.TestCase):
+    """Tests the `all()`, `count()`, `iter()` and `delete()` methods with a
+    model."""
+
+    def setUp(self) -> None:
+        storage.all().clear()
+
+    def tearDown(self) -> None:
+        storage.all().clear()
+
+    def test_all_by_model(self) -> None:
+        """Tests that only the objects of the model are returned."""
+        user = User()
+        City()
+
+        expected = {f"User.{user.id}": user}
+        self.assertEqual(storage.all(User), expected)
+        self.assertEqual(storage.all("User"), expected)
+        self.assertEqual(storage.all(Place), {})
+
+    def test_count_and_iter(self) -> None:
+        """Tests counting and iterating over the objects of a model."""
+        users = {User(), User()}
+        City()
+
+        self.assertEqual(storage.count(User), 2)
+        self.assertEqual(storage.count("City"), 1)
+        self.assertEqual(storage.count(Place), 0)
+
+        self.assertEqual(set(storage.iter("User")), users)
+        self.assertEqual(list(storage.iter(Place)), [])
+
+        # the iterator isn't affected by deletions
+        for user in storage.iter(User):
+            storage.delete(user)
+        self.assertEqual(storage.count(User), 0)
+
+    def test_page(self) -> None:
+        """Tests listing pages of instances with a limit, an offset and a
+        cursor."""
+        users = [User() for _ in range(5)]
+        city = City()
+
+        self.assertEqual(list(storage.page(User)), users)
+        self.assertEqual(list(storage.page("User", limit=2)), users[:2])
+        self.assertEqual(list(storage.page(User, 2, 2)), users[2:4])
+        self.assertEqual(
+            list(storage.page(User, limit=2, after=users[1].id)), users[2:4]
+        )
+        self.assertEqual(
+            list(storage.page(User, offset=1, after=users[1].id)), users[3:]
+        )
+        self.assertEqual(
+            list(storage.page(after=f"User.{users[4].id}")), [city]
+        )
+        self.assertEqual(list(storage.page(Place, limit=3)), [])
+
+        # the page isn't affected by deletions
+        for user in storage.page(User, limit=3):
+            storage.delete(user)
+        self.assertEqual(list(storage.page(User)), users[3:])
+
+        for options in (
+            {"limit": -1},
+            {"offset": None},
+            {"limit": True},
+            {"after": users[0].id},
+            {"after": "nope"},
+        ):
+            with self.subTest(**options), self.assertRaises(ValueError):
+                storage.page(User, **options)
+
+    def test_delete(self) -> None:
+        """Tests that `delete()` removes the object from storage."""
+        user = User()
+        city = City()
+
+        storage.delete(user)
+        storage.delete(None)
+        storage.delete(user)
+
+        self.assertEqual(storage.all(), {f"City.{city.id}": city})
+
+
+class TestFileStorageIndexes(unittest.TestCase):
+    """Tests the hash indexes and the `find()` method."""
+
+    def setUp(self) -> None:
+        storage.all().clear()
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tmp_dir.name, "file_storage.json")
+
+    def tearDown(self) -> None:
+        storage.all().clear()
+        self.tmp_dir.cleanup()
+
+    def saved_files(self) -> dict:
+        """Returns the modification time of every saved file by path."""
+        return {
+            os.path.join(root, name): os.stat(
+                os.path.join(root, name)
+            ).st_mtime_ns
+            for root, _, names in os.walk(self.tmp_dir.name)
+            for name in names
+        }
+
+    def test_find(self) -> None:
+        """Tests finding instances by indexed and other attributes."""
+        first, second = User(), User()
+        first.email = second.email = "betty@alx.com"
+        first.first_name = "Betty"
+        City().state_id = "1234"
+
+        self.assertCountEqual(
+            storage.find(User, email="betty@alx.com"), [first, second]
+        )
+        self.assertEqual(
+            storage.find("User", email="betty@alx.com", first_name="Betty"),
+            [first],
+        )
+        self.assertEqual(storage.find(User, first_name="Betty"), [first])
+        self.assertEqual(len(storage.find(City, state_id="1234")), 1)
+        self.assertEqual(storage.find(User, email="nobody@alx.com"), [])
+        self.assertEqual(storage.find(Place, city_id="1234"), [])
+
+    def test_indexes_follow_changes(self) -> None:
+        """Tests that the indexes follow updates, deletions and direct
+        changes to `__dict__` reported with `mark_dirty()`."""
+        place = Place()
+        place.city_id = "1"
+        self.assertEqual(storage.find(Place, city_id="1"), [place])
+
+        place.city_id = "2"
+        self.assertEqual(storage.find(Place, city_id="1"), [])
+        self.assertEqual(storage.find(Place, city_id="2"), [place])
+
+        place.__dict__["user_id"] = "3"
+        storage.mark_dirty(place, "user_id")
+        self.assertEqual(
+            storage.all().lookup("Place", "user_id", "3"),
+            {f"Place.{place.id}": place},
+        )
+
+        storage.delete(place)
+        self.assertEqual(storage.find(Place, city_id="2"), [])
+        self.assertEqual(storage.all().lookup("Place", "user_id", "3"), {})
+
+    def test_where_and_explain(self) -> None:
+        """Tests filtering instances with the planner in every mode."""
+        for options in ({}, {"lazy": True}, {"sharded": True}):
+            with self.subTest(**options):
+                file_storage = FileStorage(self.file_path, **options)
+                cheap, dear = Place(), Place()
+                cheap.price_by_night, cheap.max_guest = 80, 4
+                dear.price_by_night, dear.max_guest = 300, 6
+                cheap.name = "Cabin"
+                file_storage.save()
+
+                storage.all().clear()
+                file_storage.reload()
+
+                found = file_storage.where(
+                    Place, "price_by_night < 100 and max_guest >= 4"
+                )
+                self.assertEqual([obj.id for obj in found], [cheap.id])
+
+                result = file_storage.explain(
+                    "Place", "name == 'Cabin' or max_guest > 5"
+                )
+                self.assertEqual(result["plan"], "full scan of Place")
+                self.assertEqual(result["candidates"], 2)
+                self.assertCountEqual(
+                    [obj.id for obj in result["matches"]], [cheap.id, dear.id]
+                )
+                self.assertGreaterEqual(result["execution"], 0)
+
+                result = file_storage.explain(Place, "max_guest > 5")
+                self.assertEqual(
+                    result["plan"],
+                    "range index on Place.max_guest in [5, inf]",
+                )
+                self.assertEqual(result["candidates"], 1)
+
+                with self.assertRaises(ValueError):
+                    file_storage.where(Place, "max_guest >")
+
+                storage.all().clear()
+                file_storage.save()
+
+    def test_stats(self) -> None:
+        """Tests that the statistics are computed on a cached column, built
+        again once the instances of the model change."""
+        places = [Place() for _ in range(4)]
+        for place, price in zip(places, (50, 100, 150, "free")):
+            place.price_by_night = price
+            place.max_guest = 2 if price == 50 else 4
+        User().first_name = "Betty"
+
+        with patch(
+            "models.engine.file_storage.NumericColumn",
+            wraps=NumericColumn,
+        ) as mock_column:
+            stats = storage.stats(Place, "price_by_night")
+            self.assertEqual(stats["count"], 3)
+            self.assertEqual(stats["mean"], 100)
+            self.assertEqual(stats["p50"], 100)
+
+            # other models don't invalidate the column
+            User().first_name = "Holberton"
+            self.assertEqual(storage.stats("Place", "price_by_night"), stats)
+            self.assertEqual(mock_column.call_count, 1)
+
+            filtered = storage.stats(Place, "price_by_night", "max_guest > 2")
+            self.assertEqual(filtered["min"], 100)
+            self.assertEqual(mock_column.call_count, 2)
+
+            places[0].price_by_night = 350
+            stats = storage.stats(Place, "price_by_night")
+            self.assertEqual((stats["min"], stats["max"]), (100, 350))
+            self.assertEqual(mock_column.call_count, 3)
+
+            storage.delete(places[1])
+            stats = storage.stats(Place, "price_by_night")
+            self.assertEqual(stats["sum"], 500)
+            self.assertEqual(mock_column.call_count, 4)
+
+        self.assertEqual(storage.stats(Place, "name"), {"count": 0})
+        with self.assertRaises(ValueError):
+            storage.stats(Place, "price_by_night", "max_guest >")
+
+    def test_columnar(self) -> None:
+        """Tests that the columnar projection of a model follows its
+        instances and answers filters and statistics."""
+        self.addCleanup(storage.all().projections.clear)
+        with self.assertRaises(ValueError):
+            FileStorage(self.file_path, columnar=("Room",))
+
+        cheap, dear = Place(), Place()
+        cheap.price_by_night, cheap.name = 80, "Cabin"
+        dear.price_by_night, dear.name = 300, "Villa"
+        file_storage = FileStorage(self.file_path, columnar=("Place",))
+        file_storage.save()
+
+        storage.all().clear()
+        file_storage.reload()
+        cheap = file_storage.get(Place, cheap.id)
+        dear = file_storage.get(Place, dear.id)
+
+        result = file_storage.explain(Place, "name != 'Cabin'")
+        self.assertEqual(result["plan"], "columnar scan of Place")
+        self.assertEqual(result["candidates"], 1)
+        self.assertEqual(result["matches"], [dear])
+
+        projection = file_storage.columns(Place)
+        self.assertIs(projection, storage.all().projections["Place"])
+        self.assertEqual(projection.row(f"Place.{cheap.id}")["name"], "Cabin")
+
+        cheap.name = "Hut"
+        cabin = Place()
+        cabin.name = "Cabin"
+        storage.delete(dear)
+        self.assertEqual(
+            file_storage.where(Place, "name != 'Cabin'"), [cheap]
+        )
+        self.assertEqual(
+            projection.keys, [f"Place.{cheap.id}", f"Place.{cabin.id}"]
+        )
+
+        with patch.object(
+            NumericColumn, "from_numbers", wraps=NumericColumn.from_numbers
+        ) as from_numbers:
+            stats = file_storage.stats(Place, "price_by_night")
+            self.assertEqual((stats["count"], stats["sum"]), (2, 80))
+            self.assertEqual(from_numbers.call_count, 1)
+
+        # a float is null in the integer column, but still counted
+        cabin.price_by_night = 50.5
+        stats = file_storage.stats(Place, "price_by_night")
+        self.assertIsNone(
+            projection.row(f"Place.{cabin.id}")["price_by_night"]
+        )
+        self.assertEqual((stats["count"], stats["min"]), (2, 50.5))
+        self.assertEqual(
+            stats, FileStorage(self.file_path).stats(Place, "price_by_night")
+        )
+
+    def test_range(self) -> None:
+        """Tests finding instances by a range of a numeric attribute."""
+        prices = [80, 40, 120, 100, 60]
+        places = []
+        for price in prices:
+            place = Place()
+            place.price_by_night = price
+            places.append(place)
+        places[0].price_by_night = 150
+        places[1].number_rooms = "many"
+        storage.delete(places[2])
+
+        self.assertEqual(
+            storage.range(Place, "price_by_night", 50, 120),
+            [places[4], places[3]],
+        )
+        self.assertEqual(
+            storage.range("Place", "price_by_night", high=50), [places[1]]
+        )
+        self.assertEqual(storage.range(Place, "number_rooms", 1), [])
+        self.assertEqual(len(storage.range(Place, "number_rooms", 0, 0)), 3)
+
+        # attributes that aren't range indexed are scanned
+        self.assertEqual(
+            storage.range(Place, "latitude", 0),
+            storage.range(Place, "max_guest"),
+        )
+
+    def test_near_and_bbox(self) -> None:
+        """Tests finding places by their distance to a point."""
+        places = []
+        for latitude, longitude in [(5.6, -0.2), (6.7, -1.6), (48.8, 2.3)]:
+            place = Place()
+            place.latitude = latitude
+            place.longitude = longitude
+            places.append(place)
+        places[2].latitude = 5.5
+        places[1].longitude = "far"
+
+        self.assertEqual(
+            storage.near(Place, 5.5, -0.1), [places[0], places[2]]
+        )
+        self.assertEqual(storage.near("Place", 5.5, 2.4, k=1), [places[2]])
+        self.assertEqual(
+            storage.near(Place, 5.5, 2.4, radius=300), [places[2], places[0]]
+        )
+        self.assertEqual(storage.near(Place, 5.5, 2.4, radius=10), [])
+        self.assertEqual(storage.bbox(Place, 5, 0, 6, 3), [places[2]])
+
+        storage.delete(places[0])
+        self.assertEqual(storage.near(Place, 5.5, -0.1), [places[2]])
+        self.assertEqual(storage.near(Place, 0, 0, k=0), [])
+
+        with self.assertRaises(ValueError):
+            storage.near(User, 0, 0)
+
+    def test_indexes_rebuilt_on_reload(self) -> None:
+        """Tests that the indexes hold the reloaded objects in every mode."""
+        for options in ({}, {"lazy": True}, {"sharded": True}):
+            with self.subTest(**options):
+                file_storage = FileStorage(self.file_path, **options)
+                review = Review()
+                review.place_id = "1"
+                review.text = "Lovely host"
+                place = Place()
+                place.max_guest = 4
+                place.latitude = 5.6
+                file_storage.save()
+
+                storage.all().clear()
+                file_storage.reload()
+
+                found = file_storage.find(Review, place_id="1")
+                self.assertEqual([obj.id for obj in found], [review.id])
+                self.assertIsNot(found[0], review)
+
+                found = file_storage.range(Place, "max_guest", 2, 6)
+                self.assertEqual([obj.id for obj in found], [place.id])
+
+                found = file_storage.near(Place, 5.5, 0, radius=20)
+                self.assertEqual([obj.id for obj in found], [place.id])
+
+                found = file_storage.search(Review, "host")
+                self.assertEqual([obj.id for obj in found], [review.id])
+
+                storage.all().clear()
+                file_storage.save()
+
+    def test_related(self) -> None:
+        """Tests navigating the references between instances."""
+        state = State()
+        city = City()
+        city.state_id = state.id
+        user = User()
+        wifi, pool = Amenity(), Amenity()
+        place = Place()
+        place.city_id = city.id
+        place.user_id = user.id
+        place.amenity_ids = [pool.id, "unknown", wifi.id]
+        review = Review()
+        review.place_id = place.id
+        review.user_id = user.id
+
+        self.assertEqual(state.cities, [city])
+        self.assertIs(city.state, state)
+        self.assertEqual(city.places, [place])
+        self.assertIs(place.city, city)
+        self.assertIs(place.user, user)
+        self.assertEqual(place.reviews, [review])
+        self.assertEqual(place.amenities, [pool, wifi])
+        self.assertEqual(wifi.places, [place])
+        self.assertEqual(user.places, [place])
+        self.assertEqual(user.reviews, [review])
+        self.assertIs(review.place, place)
+        self.assertIs(review.user, user)
+        self.assertEqual(State().cities, [])
+
+        self.assertEqual(storage.related(state, "City"), [city])
+        with self.assertRaises(ValueError):
+            storage.related(state, Review)
+
+        # found through the indexes, not by scanning the cities
+        self.assertEqual(storage.find(City, state_id=state.id), [city])
+
+    def test_delete_cascade(self) -> None:
+        """Tests that cascading deletes remove the instances referencing an
+        instance in every mode, and are written by a single save."""
+        for options in ({}, {"lazy": True}, {"sharded": True}):
+            with self.subTest(**options):
+                file_storage = FileStorage(self.file_path, **options)
+                user = User()
+                state = State()
+                city = City()
+                city.state_id = state.id
+                place = Place()
+                place.city_id = city.id
+                place.user_id = user.id
+                review = Review()
+                review.place_id = place.id
+                other_review = Review()
+                other_review.user_id = user.id
+                file_storage.save()
+
+                storage.all().clear()
+                file_storage.reload()
+
+                saved = self.saved_files()
+                file_storage.delete(file_storage.get(State, state.id), True)
+                self.assertEqual(len(file_storage.all()), 2)
+                self.assertEqual(file_storage.dirty_count(), 4)
+                self.assertEqual(self.saved_files(), saved)
+
+                file_storage.save()
+
+                storage.all().clear()
+                file_storage.reload()
+                self.assertCountEqual(
+                    [obj.id for obj in file_storage.all().values()],
+                    [user.id, other_review.id],
+                )
+
+                file_storage.delete(file_storage.get(User, user.id), True)
+                self.assertEqual(len(file_storage.all()), 0)
+
+                storage.all().clear()
+                file_storage.save()
+
+    def test_search(self) -> None:
+        """Tests ranking instances by the words of their text attributes."""
+        beach, city, farm = Place(), Place(), Place()
+        beach.name = "Beach house"
+        beach.description = "A house on the beach, with a view of the sea"
+        city.name = "City flat"
+        city.description = "A flat in the city, ten minutes from the beach"
+        farm.description = "A farm"
+
+        self.assertEqual(storage.search(Place, "beach house"), [beach, city])
+        self.assertEqual(storage.search("Place", "BEACH", limit=1), [beach])
+        self.assertEqual(storage.search(Place, "flat"), [city])
+        self.assertEqual(storage.search(Place, "mountain"), [])
+        self.assertEqual(storage.search(Place, ""), [])
+
+        beach.description = "Sold"
+        self.assertEqual(storage.search(Place, "sea"), [])
+
+        storage.delete(city)
+        self.assertEqual(storage.search(Place, "beach"), [beach])
+
+        with self.assertRaises(ValueError):
+            storage.search(User, "betty")
+
+    def test_text_indexes_saved(self) -> None:
+        """Tests that saved text indexes are reused on reload and forget the
+        objects no longer saved."""
+        file_storage = FileStorage(self.file_path)
+        kept, dropped = Review(), Review()
+        kept.text = "Clean and quiet"
+        dropped.text = "Clean but noisy"
+        file_storage.save()
+
+        with open(f"{self.file_path}.fts", "r", encoding="utf-8") as fts:
+            self.assertIn("clean", json.load(fts)["Review.text"]["postings"])
+
+        # the object is removed from the JSON file behind the storage's back
+        with open(self.file_path, "r", encoding="utf-8") as json_file:
+            objects = json.load(json_file)
+        del objects[f"Review.{dropped.id}"]
+        with open(self.file_path, "w", encoding="utf-8") as json_file:
+            json.dump(objects, json_file)
+
+        storage.all().clear()
+        file_storage.reload()
+
+        index = storage.all().texts[("Review", "text")]
+        self.assertIn(f"Review.{kept.id}", index)
+        self.assertNotIn(f"Review.{dropped.id}", index)
+
+        found = file_storage.search(Review, "clean noisy")
+        self.assertEqual([obj.id for obj in found], [kept.id])
+
+    def test_text_indexes_without_store(self) -> None:
+        """Tests that the text indexes of a storage file that is gone are
+        ignored."""
+        file_storage = FileStorage(self.file_path)
+        Review().text = "Clean and quiet"
+        file_storage.save()
+        os.remove(self.file_path)
+
+        storage.all().clear()
+        file_storage.reload()
+        self.assertEqual(storage.all().texts, {})
+        self.assertEqual(file_storage.search(Review, "clean"), [])
+
+    def test_text_indexes_written_when_needed(self) -> None:
+        """Tests that the text indexes are only saved once they hold text
+        and after the text changed, and on checkpoints in journal mode."""
+        fts_path = f"{self.file_path}.fts"
+        file_storage = FileStorage(self.file_path)
+        place = Place()
+        file_storage.save()
+        self.assertFalse(os.path.exists(fts_path))
+
+        place.name = "Beach house"
+        file_storage.save()
+        self.assertTrue(os.path.exists(fts_path))
+
+        # the other attributes leave the postings alone
+        index = storage.all().texts[("Place", "name")]
+        place.max_guest = 4
+        place.name = "Beach house"
+        self.assertFalse(index.changed)
+        self.assertEqual(storage.search(Place, "house"), [place])
+
+        os.remove(fts_path)
+        journal_storage = FileStorage(self.file_path, journal=True)
+        place.name = "Farm"
+        journal_storage.save()
+        self.assertFalse(os.path.exists(fts_path))
+
+        journal_storage.checkpoint()
+        with open(fts_path, "r", encoding="utf-8") as fts:
+            self.assertIn("farm", json.load(fts)["Place.name"]["postings"])
+
+
+class TestFileStorageSharded(unittest.TestCase):
+    """Tests the sharded mode of the FileStorage engine."""
+
+    def setUp(self) -> None:
+        storage.all().clear()
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tmp_dir.name, "file_storage.json")
+        self.shards_dir = os.path.join(self.tmp_dir.name, "file_storage")
+        self.storage = FileStorage(self.file_path, sharded=True)
+
+    def tearDown(self) -> None:
+        storage.all().clear()
+        self.tmp_dir.cleanup()
+
+    def read_shard(self, model_name: str) -> dict:
+        """Returns the objects saved in the file of a model."""
+        shard_path = os.path.join(self.shards_dir, f"{model_name}.json")
+        with open(shard_path, "r", encoding="utf-8") as json_file:
+            return json.load(json_file)
+
+    def test_journal_and_sharded(self) -> None:
+        """Tests that the journal and sharded modes can't be combined."""
+        with self.assertRaises(ValueError):
+            FileStorage(self.file_path, journal=True, sharded=True)
+
+    def test_save_one_file_per_model(self) -> None:
+        """Tests that every model is saved to its own file."""
+        user = User()
+        city = City()
+        self.storage.save()
+
+        self.assertFalse(os.path.exists(self.file_path))
+        self.assertCountEqual(
+            os.listdir(self.shards_dir), ["User.json", "City.json"]
+        )
+        self.assertEqual(list(self.read_shard("User")), [f"User.{user.id}"])
+        self.assertEqual(list(self.read_shard("City")), [f"City.{city.id}"])
+
+    def test_save_only_changed_models(self) -> None:
+        """Tests that only the files of changed models are written."""
+        user = User()
+        City()
+        self.storage.save()
+        os.remove(os.path.join(self.shards_dir, "City.json"))
+
+        user.first_name = "Lisa"
+        self.storage.save()
+
+        self.assertEqual(os.listdir(self.shards_dir), ["User.json"])
+        self.assertEqual(
+            self.read_shard("User")[f"User.{user.id}"]["first_name"], "Lisa"
+        )
+
+    def test_reload_on_demand(self) -> None:
+        """Tests that a model is only loaded when it is first needed."""
+        user = User()
+        City()
+        self.storage.save()
+        storage.all().clear()
+
+        self.storage.reload()
+        self.assertEqual(len(storage.all()), 0)
+
+        self.assertEqual(list(self.storage.all(User)), [f"User.{user.id}"])
+        self.assertEqual(list(dict.keys(storage.all())), [f"User.{user.id}"])
+
+        self.assertEqual(len(self.storage.all()), 2)
+
+    def test_save_merges_unloaded_model(self) -> None:
+        """Tests that saving a model that wasn't loaded keeps its objects."""
+        user = User()
+        self.storage.save()
+        storage.all().clear()
+
+        self.storage.reload()
+        new_user = User()
+        self.storage.save()
+
+        self.assertCountEqual(
+            self.read_shard("User"),
+            [f"User.{user.id}", f"User.{new_user.id}"],
+        )
+
+    def test_delete(self) -> None:
+        """Tests that deleted objects are removed from the model file."""
+        user = User()
+        self.storage.save()
+
+        self.storage.delete(user)
+        self.storage.save()
+
+        self.assertEqual(self.read_shard("User"), {})
+
+    def test_text_indexes_pruned(self) -> None:
+        """Tests that the saved text indexes forget the objects no longer
+        saved once their model is loaded."""
+        kept, dropped = Review(), Review()
+        kept.text = "Clean and quiet"
+        dropped.text = "Clean but noisy"
+        self.storage.save()
+
+        # the object is removed from the model file behind the storage's back
+        objects = self.read_shard("Review")
+        del objects[f"Review.{dropped.id}"]
+        shard_path = os.path.join(self.shards_dir, "Review.json")
+        with open(shard_path, "w", encoding="utf-8") as json_file:
+            json.dump(objects, json_file)
+
+        storage.all().clear()
+        self.storage.reload()
+
+        found = self.storage.search(Review, "clean noisy")
+        self.assertEqual([obj.id for obj in found], [kept.id])
+        index = storage.all().texts[("Review", "text")]
+        self.assertNotIn(f"Review.{dropped.id}", index)
+
+
+class TestFileStorageLazy(unittest.TestCase):
+    """Tests the lazy mode of the FileStorage engine."""
+
+    def setUp(self) -> None:
+        storage.all().clear()
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tmp_dir.name, "file_storage.json")
+        self.storage = FileStorage(self.file_path, lazy=True)
+
+        self.user = User()
+        self.user.first_name = "Betty"
+        self.city = City()
+        self.city.name = "Accra"
+        self.storage.save()
+
+        storage.all().clear()
+        self.storage.reload()
+
+    def tearDown(self) -> None:
+        storage.all().clear()
+        self.tmp_dir.cleanup()
+
+    def test_reload_builds_nothing(self) -> None:
+        """Tests that no object is built on reload."""
+        self.assertTrue(os.path.exists(f"{self.file_path}.idx"))
+        self.assertEqual(len(storage.all()), 0)
+
+    def test_get(self) -> None:
+        """Tests that a lookup only builds the object looked up."""
+        user = self.storage.get(User, self.user.id)
+
+        self.assertEqual(user.to_dict(), self.user.to_dict())
+        self.assertEqual(list(storage.all()), [f"User.{self.user.id}"])
+        self.assertIsNone(self.storage.get("User", "1234"))
+
+    def test_all_by_model(self) -> None:
+        """Tests that `all()` with a model only builds its objects."""
+        cities = self.storage.all(City)
+
+        self.assertEqual(list(cities), [f"City.{self.city.id}"])
+        self.assertEqual(list(storage.all()), [f"City.{self.city.id}"])
+
+    def test_count(self) -> None:
+        """Tests that counting the objects of a model builds nothing, and
+        doesn't walk the objects not built yet."""
+
+        class Unwalkable(dict):
+            """A dictionary that can't be iterated."""
+
+            def __iter__(self):
+                raise AssertionError("the pending objects were walked")
+
+        pending = self.storage._FileStorage__pending
+        self.storage._FileStorage__pending = Unwalkable(pending)
+        self.assertEqual(self.storage.count(User), 1)
+        self.storage._FileStorage__pending = pending
+
+        self.assertEqual(self.storage.count(User), 1)
+        self.assertEqual(self.storage.count(City), 1)
+        self.assertEqual(len(storage.all()), 0)
+
+        self.storage.get(User, self.user.id)
+        self.assertEqual(self.storage.count(User), 1)
+
+        # the counts of the objects not built yet follow new and deleted ones
+        user = User()
+        self.assertEqual(self.storage.count(User), 2)
+        self.storage.delete(user)
+        self.storage.new(City(**self.city.to_dict()))
+        self.assertEqual(self.storage.count(User), 1)
+        self.assertEqual(self.storage.count(City), 1)
+        self.assertEqual(self.storage.count("Place"), 0)
+
+    def test_all(self) -> None:
+        """Tests that `all()` builds every object."""
+        self.assertEqual(len(self.storage.all()), 2)
+
+    def test_page(self) -> None:
+        """Tests that a page only builds its objects and those before it,
+        which keep the order of the index."""
+        for _ in range(5):
+            User()
+        self.storage.save()
+        storage.all().clear()
+        self.storage.reload()
+
+        first = [user.id for user in self.storage.page(User, limit=2)]
+        self.assertEqual(len(storage.all()), 2)
+
+        third = self.storage.page(User, limit=2, after=first[1], offset=2)
+        third = [user.id for user in third]
+        self.assertEqual(len(storage.all()), 6)
+
+        ordered = [user.id for user in self.storage.page(User)]
+        self.assertEqual(ordered[:2], first)
+        self.assertEqual(ordered[4:6], third)
+        self.assertEqual(len(ordered), 6)
+        self.assertEqual(len(list(self.storage.page(offset=6))), 1)
+
+        with self.assertRaises(ValueError):
+            self.storage.page(User, after="1234")
+
+    def test_save_keeps_unbuilt_objects(self) -> None:
+        """Tests that objects not built yet survive a save."""
+        self.storage.get(User, self.user.id).last_name = "Doe"
+        self.storage.save()
+
+        # the city was never built, but it's still readable
+        self.assertEqual(self.storage.get(City, self.city.id).name, "Accra")
+
+        storage.all().clear()
+        FileStorage(self.file_path).reload()
+        self.assertEqual(
+            storage.all()[f"User.{self.user.id}"].last_name, "Doe"
+        )
+        self.assertEqual(storage.all()[f"City.{self.city.id}"].name, "Accra")
+
+    def test_reload_without_index(self) -> None:
+        """Tests that the JSON file is scanned when the index is missing."""
+        self.storage.get(City, self.city.id).name = "Kumasi – Ashanti"
+        self.storage.save()
+        os.remove(f"{self.file_path}.idx")
+
+        with open(self.file_path, "r", encoding="utf-8") as json_file:
+            content = json.load(json_file)
+        with open(self.file_path, "w", encoding="utf-8") as json_file:
+            json.dump(content, json_file, ensure_ascii=False)
+
+        storage.all().clear()
+        self.storage.reload()
+
+        self.assertEqual(
+            self.storage.get(City, self.city.id).name, "Kumasi – Ashanti"
+        )
+        self.assertEqual(
+            self.storage.get(User, self.user.id).first_name, "Betty"
+        )
+
+    def test_lazy_and_journal(self) -> None:
+        """Tests that journal records override the unbuilt objects."""
+        journal_storage = FileStorage(self.file_path, journal=True, lazy=True)
+        journal_storage.reload()
+
+        journal_storage.get(User, self.user.id).first_name = "Lucy"
+        journal_storage.save()
+
+        storage.all().clear()
+        journal_storage.reload()
+
+        self.assertEqual(len(storage.all()), 1)
+        self.assertEqual(
+            journal_storage.get(User, self.user.id).first_name, "Lucy"
+        )
+
+
+class TestFileStorageBinary(unittest.TestCase):
+    """Tests the binary mode of the FileStorage engine."""
+
+    def setUp(self) -> None:
+        storage.all().clear()
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tmp_dir.name, "file_storage.json")
+        self.storage = FileStorage(self.file_path, binary=True)
+
+        self.user = User()
+        self.user.first_name = "Betty"
+        self.place = Place()
+        self.place.amenity_ids = ["1", "2"]
+        self.place.latitude = 5.6037
+        self.storage.save()
+
+    def tearDown(self) -> None:
+        storage.all().clear()
+        self.tmp_dir.cleanup()
+
+    def test_save_and_reload(self) -> None:
+        """Tests that the objects are loaded back from the snapshot."""
+        expected = {
+            class_id: obj.to_dict() for class_id, obj in storage.all().items()
+        }
+
+        self.assertTrue(
+            os.path.exists(os.path.join(self.tmp_dir.name, "file_storage.bin"))
+        )
+        self.assertFalse(os.path.exists(self.file_path))
+
+        storage.all().clear()
+        self.storage.reload()
+
+        self.assertEqual(
+            {
+                class_id: obj.to_dict()
+                for class_id, obj in storage.all().items()
+            },
+            expected,
+        )
+        self.assertIsInstance(self.storage.get(Place, self.place.id), Place)
+        self.assertEqual(self.storage.dirty_count(), 0)
+
+    def test_delete(self) -> None:
+        """Tests that deleted objects are left out of the snapshot."""
+        self.storage.delete(self.user)
+        self.storage.save()
+
+        storage.all().clear()
+        self.storage.reload()
+
+        self.assertEqual(list(storage.all()), [f"Place.{self.place.id}"])
+
+    def test_binary_and_journal(self) -> None:
+        """Tests that journal records are replayed over the snapshot."""
+        journal_storage = FileStorage(
+            self.file_path, journal=True, binary=True
+        )
+        journal_storage.reload()
+
+        journal_storage.get(User, self.user.id).first_name = "Lucy"
+        journal_storage.save()
+
+        storage.all().clear()
+        journal_storage.reload()
+        self.assertEqual(
+            journal_storage.get(User, self.user.id).first_name, "Lucy"
+        )
+
+        journal_storage.checkpoint()
+        storage.all().clear()
+        self.storage.reload()
+        self.assertEqual(
+            self.storage.get(User, self.user.id).first_name, "Lucy"
+        )
+
+    def test_invalid_combinations(self) -> None:
+        """Tests that the binary mode can't be sharded or lazy."""
+        with self.assertRaises(ValueError):
+            FileStorage(self.file_path, binary=True, sharded=True)
+
+        with self.assertRaises(ValueError):
+            FileStorage(self.file_path, binary=True, lazy=True)
+
+
+class TestFileStorageCodecs(unittest.TestCase):
+    """Tests saving and reloading objects with every codec."""
+
+    def setUp(self) -> None:
+        storage.all().clear()
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+        self.user = User()
+        self.user.first_name = "Betty"
+        self.place = Place()
+        self.place.amenity_ids = ["1", "2"]
+
+        self.expected = {
+            class_id: obj.to_dict() for class_id, obj in storage.all().items()
+        }
+
+    def tearDown(self) -> None:
+        storage.all().clear()
+        self.tmp_dir.cleanup()
+
+    def test_save_and_reload(self) -> None:
+        """Tests that the objects are loaded back with every codec."""
+        for codec in CODECS:
+            with self.subTest(codec=codec):
+                file_path = os.path.join(self.tmp_dir.name, f"{codec}.db")
+                codec_storage = FileStorage(file_path, codec=codec)
+
+                codec_storage.all().update(
+                    {f"User.{self.user.id}": self.user}
+                )
+                codec_storage.all()[f"Place.{self.place.id}"] = self.place
+                codec_storage.save()
+
+                storage.all().clear()
+                codec_storage.reload()
+
+                self.assertEqual(
+                    {
+                        class_id: obj.to_dict()
+                        for class_id, obj in storage.all().items()
+                    },
+                    self.expected,
+                )
+
+    def test_sharded(self) -> None:
+        """Tests that the shards are written with the codec."""
+        file_path = os.path.join(self.tmp_dir.name, "file_storage.json")
+        sharded_storage = FileStorage(file_path, sharded=True, codec="jsonl")
+        sharded_storage.save()
+
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(self.tmp_dir.name, "file_storage", "User.jsonl")
+            )
+        )
+
+        storage.all().clear()
+        sharded_storage.reload()
+        self.assertEqual(len(sharded_storage.all()), 2)
+
+    def test_default_file_path(self) -> None:
+        """Tests that the default file is named after the codec."""
+        with patch(
+            "models.engine.file_storage.open", side_effect=FileNotFoundError
+        ) as mock_open:
+            FileStorage(codec="pickle").reload()
+
+        mock_open.assert_called_once_with("file_storage.pickle", "rb")
+
+    def test_invalid_codecs(self) -> None:
+        """Tests unknown codecs and modes that require the json codec."""
+        with self.assertRaises(ValueError):
+            FileStorage(codec="yaml")
+
+        with self.assertRaises(ValueError):
+            FileStorage(lazy=True, codec="pickle")
+
+        with self.assertRaises(ValueError):
+            FileStorage(binary=True, codec="marshal")
+
+
+class TestFileStorageWriteBehind(unittest.TestCase):
+    """Tests the write-behind mode of the FileStorage engine."""
+
+    def setUp(self) -> None:
+        storage.all().clear()
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tmp_dir.name, "file_storage.json")
+        self.storages = []
+
+    def tearDown(self) -> None:
+        for write_behind in self.storages:
+            write_behind.close()
+
+        storage.all().clear()
+        self.tmp_dir.cleanup()
+
+    def write_behind_storage(self, **kwargs) -> FileStorage:
+        """Returns a storage in write-behind mode, closed after the test."""
+        write_behind = FileStorage(self.file_path, write_behind=True, **kwargs)
+        self.storages.append(write_behind)
+
+        return write_behind
+
+    def saved_objects(self, timeout: float = 5) -> dict:
+        """Waits for the JSON file to be written, then returns its content."""
+        deadline = time.monotonic() + timeout
+
+        while not os.path.exists(self.file_path):
+            if time.monotonic() > deadline:
+                self.fail("the JSON file was never written")
+            time.sleep(0.01)
+
+        with open(self.file_path, "r", encoding="utf-8") as json_file:
+            return json.load(json_file)
+
+    def test_save_is_deferred_until_flush(self) -> None:
+        """Tests that saves are only written on flush within the interval."""
+        write_behind = self.write_behind_storage(flush_interval=60)
+
+        for _ in range(3):
+            User()
+            write_behind.save()
+
+        self.assertFalse(os.path.exists(self.file_path))
+
+        write_behind.flush()
+
+        self.assertEqual(len(self.saved_objects()), 3)
+        self.assertEqual(write_behind.dirty_count(), 0)
+
+    def test_interval(self) -> None:
+        """Tests that the writer thread writes after the interval."""
+        write_behind = self.write_behind_storage(flush_interval=0.01)
+        user = User()
+        write_behind.save()
+
+        self.assertIn(f"User.{user.id}", self.saved_objects())
+
+    def test_threshold(self) -> None:
+        """Tests that enough changes are written without waiting."""
+        write_behind = self.write_behind_storage(
+            flush_interval=60, flush_threshold=2
+        )
+        User()
+        City()
+        write_behind.save()
+
+        self.assertEqual(len(self.saved_objects()), 2)
+
+    def test_flush_raises_write_errors(self) -> None:
+        """Tests that invalid keys are reported by flush."""
+        write_behind = self.write_behind_storage(flush_interval=60)
+        storage.all()["User"] = User()
+        write_behind.save()
+
+        with self.assertRaises(KeyError):
+            write_behind.flush()
+
+    def test_flush_waits_for_write(self) -> None:
+        """Tests that flush waits for the write the writer thread is doing,
+        and raises its error."""
+        write_behind = self.write_behind_storage(flush_interval=0)
+        writing, release = threading.Event(), threading.Event()
+        errors = []
+        write_file = FileStorage._FileStorage__write_file
+
+        def slow_write_file(self, *args, **kwargs) -> dict:
+            """Waits to be released before writing."""
+            writing.set()
+            release.wait(5)
+            if errors:
+                raise errors[0]
+            return write_file(self, *args, **kwargs)
+
+        def flush() -> None:
+            try:
+                write_behind.flush()
+            except OSError as error:
+                flushed.append(error)
+            else:
+                flushed.append(os.path.exists(self.file_path))
+
+        with patch.object(
+            FileStorage, "_FileStorage__write_file", slow_write_file
+        ):
+            for error in (None, OSError("disk full")):
+                writing.clear()
+                release.clear()
+                errors[:] = [error] if error else []
+                flushed = []
+
+                User()
+                write_behind.save()
+                self.assertTrue(writing.wait(5))
+
+                flusher = threading.Thread(target=flush)
+                flusher.start()
+                flusher.join(0.05)
+                self.assertTrue(flusher.is_alive())
+
+                release.set()
+                flusher.join(5)
+                self.assertEqual(flushed, [error or True])
+
+    def test_flush_without_write_behind(self) -> None:
+        """Tests that flush does nothing when saves are written at once."""
+        FileStorage(self.file_path).flush()
+
+        self.assertFalse(os.path.exists(self.file_path))
+
+    def test_close(self) -> None:
+        """Tests that closing the storage writes the pending saves."""
+        write_behind = self.write_behind_storage(flush_interval=60)
+        user = User()
+        write_behind.save()
+        write_behind.close()
+
+        self.assertIn(f"User.{user.id}", self.saved_objects())
+
+
+class TestFileStorageAtomicSave(unittest.TestCase):
+    """Tests that saves replace the JSON file atomically."""
+
+    def setUp(self) -> None:
+        storage.all().clear()
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tmp_dir.name, "file_storage.json")
+        self.storage = FileStorage(self.file_path)
+
+        self.user = User()
+        self.storage.save()
+
+    def tearDown(self) -> None:
+        storage.all().clear()
+        self.tmp_dir.cleanup()
+
+    def test_failed_save_keeps_file(self) -> None:
+        """Tests that a save failing midway leaves the old file intact."""
+        with open(self.file_path, "r", encoding="utf-8") as json_file:
+            content = json_file.read()
+
+        City()
+        with patch(
+            "models.engine.file_storage.os.replace", side_effect=OSError
+        ):
+            with self.assertRaises(OSError):
+                self.storage.save()
+
+        with open(self.file_path, "r", encoding="utf-8") as json_file:
+            self.assertEqual(json_file.read(), content)
+
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["file_storage.json"])
+
+    def test_save_syncs_file_and_directory(self) -> None:
+        """Tests that the file and its directory are synced to disk."""
+        with patch(
+            "models.engine.file_storage.os.fsync", wraps=os.fsync
+        ) as mock_fsync:
+            self.storage.save()
+
+        self.assertEqual(mock_fsync.call_count, 2)
+
+    def run_concurrent_saves(self, group_storage: FileStorage) -> list:
+        """Saves from many threads at once, returning their errors."""
+        barrier = threading.Barrier(8)
+        errors = []
+
+        def save() -> None:
+            """Saves once every thread is ready."""
+            barrier.wait()
+            try:
+                group_storage.save()
+            except KeyError as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=save) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return errors
+
+    def test_group_commit(self) -> None:
+        """Tests that concurrent saves share a single write."""
+        group_storage = FileStorage(self.file_path, group_commit_window=0.2)
+        City()
+
+        with patch(
+            "models.engine.file_storage.os.replace", wraps=os.replace
+        ) as mock_replace:
+            self.assertEqual(self.run_concurrent_saves(group_storage), [])
+
+        self.assertLess(mock_replace.call_count, 8)
+        self.assertEqual(group_storage.dirty_count(), 0)
+
+    def test_group_commit_errors(self) -> None:
+        """Tests that every save of a failed group commit raises."""
+        group_storage = FileStorage(self.file_path, group_commit_window=0.2)
+        storage.all()["User"] = User()
+
+        self.assertEqual(len(self.run_concurrent_saves(group_storage)), 8)
+
+
+class TestFileStorageSnapshots(unittest.TestCase):
+    """Tests the snapshots of the instances and the saves using them."""
+
+    def setUp(self) -> None:
+        storage.all().clear()
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tmp_dir.name, "file_storage.json")
+        self.storage = FileStorage(self.file_path)
+
+    def tearDown(self) -> None:
+        storage.all().clear()
+        self.tmp_dir.cleanup()
+
+    def saved(self) -> dict:
+        """Returns the saved instances."""
+        with open(self.file_path, "r", encoding="utf-8") as json_file:
+            return json.load(json_file)
+
+    def test_snapshot(self) -> None:
+        """Tests that a snapshot reads the instances as they were."""
+        user, city = User(), City()
+        user.first_name = "Betty"
+        expected = {
+            f"User.{user.id}": user.to_dict(),
+            f"City.{city.id}": city.to_dict(),
+        }
+
+        with self.storage.snapshot() as snapshot:
+            user.first_name = "Holberton"
+            self.storage.save()
+            storage.delete(city)
+            State()
+
+            self.assertEqual(dict(snapshot), expected)
+
+        self.assertEqual(snapshot[f"User.{user.id}"]["first_name"], "Betty")
+        self.assertEqual(self.storage.snapshot().keys(), storage.all().keys())
+
+    def test_save_during_changes(self) -> None:
+        """Tests that instances can be read and changed while they are
+        saved, and that the save writes them as they were."""
+        self.storage.save()
+        user, city = User(), City()
+        user.first_name = "Betty"
+        expected = {
+            f"User.{user.id}": user.to_dict(),
+            f"City.{city.id}": city.to_dict(),
+        }
+
+        writing, changed = threading.Event(), threading.Event()
+        state = Snapshot.state
+
+        def slow_state(snapshot: Snapshot, key: str) -> dict:
+            """Waits for the instances to change on the first call."""
+            if not writing.is_set():
+                writing.set()
+                changed.wait(5)
+            return state(snapshot, key)
+
+        with patch.object(Snapshot, "state", slow_state):
+            saving = threading.Thread(target=self.storage.save)
+            saving.start()
+            self.assertTrue(writing.wait(5))
+
+            user.first_name = "Holberton"
+            storage.delete(city)
+            self.assertEqual(len(self.storage.all()), 1)
+            changed.set()
+            saving.join()
+
+        self.assertEqual(self.saved(), expected)
+        self.assertEqual(self.storage.dirty_count(), 2)
+
+        self.storage.save()
+        self.assertEqual(self.saved(), {f"User.{user.id}": user.to_dict()})
+        self.assertEqual(self.storage.dirty_count(), 0)
+
+    def test_failed_save_keeps_changes(self) -> None:
+        """Tests that the changes of a failed save are saved next time."""
+        self.storage.save()
+        user = User()
+
+        with patch(
+            "models.engine.file_storage.os.replace", side_effect=OSError
+        ), self.assertRaises(OSError):
+            self.storage.save()
+
+        self.assertEqual(self.storage.dirty_count(), 1)
+        self.storage.save()
+        self.assertEqual(self.saved(), {f"User.{user.id}": user.to_dict()})
+
+
+class TestFileStorageThreads(unittest.TestCase):
+    """Stress tests the storage used by many threads at once."""
+
+    def setUp(self) -> None:
+        storage.all().clear()
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tmp_dir.name, "file_storage.json")
+        self.storage = FileStorage(self.file_path)
+
+        self.user = User()
+        self.user.age = 30
+
+    def tearDown(self) -> None:
+        storage.all().clear()
+        self.tmp_dir.cleanup()
+
+    def run_threads(self, count: int, target) -> None:
+        """Runs `target` in some threads and waits for them."""
+        threads = [threading.Thread(target=target) for _ in range(count)]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_readers_in_parallel(self) -> None:
+        """Tests that readers don't wait for each other: every reader checks
+        the instance while all the others are doing so too."""
+        barrier = threading.Barrier(8, timeout=5)
+        results, errors = [], []
+
+        def meet(_) -> bool:
+            """Waits for every reader to check the instance."""
+            barrier.wait()
+            return True
+
+        def read() -> None:
+            try:
+                results.append(self.storage.range(User, "age"))
+            except threading.BrokenBarrierError as error:
+                errors.append(error)
+
+        with patch("models.engine.file_storage.is_number", meet):
+            self.run_threads(8, read)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(results, [[self.user]] * 8)
+
+    def test_no_lost_updates(self) -> None:
+        """Tests that every change made by concurrent writers is saved, while
+        readers and saves run along."""
+        done = threading.Event()
+        other = FileStorage(self.file_path)
+        created, deleted, errors = [], [], []
+
+        def write() -> None:
+            users = [User() for _ in range(100)]
+            for user in users:
+                for number in range(3):
+                    user.first_name = f"{user.id}-{number}"
+            for user in users[::2]:
+                other.delete(user)
+
+            created.extend(users[1::2])
+            deleted.extend(users[::2])
+
+        def read() -> None:
+            try:
+                while not done.is_set():
+                    self.storage.all(User)
+                    self.storage.count(User)
+                    self.storage.find(User, first_name="0")
+                    self.storage.get(User, self.user.id)
+            except Exception as error:
+                errors.append(error)
+
+        def save() -> None:
+            try:
+                while not done.is_set():
+                    self.storage.save()
+            except Exception as error:
+                errors.append(error)
+
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        readers.append(threading.Thread(target=save))
+        for thread in readers:
+            thread.start()
+
+        self.run_threads(8, write)
+        done.set()
+        for thread in readers:
+            thread.join()
+
+        self.storage.save()
+        with open(self.file_path, "r", encoding="utf-8") as json_file:
+            saved = json.load(json_file)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(created), 400)
+        self.assertEqual(len(saved), 401)
+        for user in created:
+            self.assertEqual(
+                saved[f"User.{user.id}"]["first_name"], f"{user.id}-2"
+            )
+        self.assertFalse(
+            {f"User.{user.id}" for user in deleted}.intersection(saved)
+        )
+
+
+class TestFileStorageShared(unittest.TestCase):
+    """Tests the storage shared by many processes."""
+
+    def setUp(self) -> None:
+        storage.all().clear()
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tmp_dir.name, "file_storage.json")
+        self.storage = FileStorage(self.file_path, shared=True)
+        self.storage.save()
+
+        # a state saved by another process
+        self.state_dict = {
+            "__class__": "State",
+            "id": "lagos",
+            "name": "Lagos",
+            "created_at": "2030-01-01T00:00:00.000001",
+            "updated_at": "2030-01-01T00:00:00.000001",
+        }
+
+    def tearDown(self) -> None:
+        storage.all().clear()
+        self.tmp_dir.cleanup()
+
+    def saved(self) -> dict:
+        """Returns the saved instances."""
+        with open(self.file_path, "r", encoding="utf-8") as json_file:
+            return json.load(json_file)
+
+    def save_elsewhere(self, objects: dict) -> None:
+        """Replaces the file as another process would."""
+        temp_path = f"{self.file_path}.other"
+        with open(temp_path, "w", encoding="utf-8") as json_file:
+            json.dump(objects, json_file)
+        os.replace(temp_path, self.file_path)
+
+    def test_invalid_modes(self) -> None:
+        """Tests that the shared mode only works in the default mode."""
+        for mode in ("journal", "sharded", "lazy", "binary"):
+            with self.subTest(mode=mode), self.assertRaises(ValueError):
+                FileStorage(self.file_path, shared=True, **{mode: True})
+
+    def test_merge(self) -> None:
+        """Tests that only the instances other processes changed are merged
+        before the next read, and that local changes are kept."""
+        kept, changed, removed, edited = User(), User(), User(), User()
+        self.storage.save()
+
+        objects = self.saved()
+        changed_dict = dict(objects[f"User.{changed.id}"])
+        changed_dict.update(
+            first_name="Betty", updated_at="2030-01-01T00:00:00.000001"
+        )
+        objects[f"User.{changed.id}"] = changed_dict
+        objects[f"User.{edited.id}"]["updated_at"] = changed_dict["updated_at"]
+        del objects[f"User.{removed.id}"]
+        objects["State.lagos"] = self.state_dict
+
+        edited.first_name = "Holberton"
+        self.save_elsewhere(objects)
+
+        users = self.storage.all(User)
+        self.assertIs(users[f"User.{kept.id}"], kept)
+        self.assertIs(users[f"User.{edited.id}"], edited)
+        self.assertEqual(users[f"User.{changed.id}"].first_name, "Betty")
+        self.assertNotIn(f"User.{removed.id}", users)
+        self.assertEqual(self.storage.get(State, "lagos").name, "Lagos")
+        self.assertEqual(self.storage.dirty_count(), 1)
+
+        self.storage.save()
+        objects = self.saved()
+        self.assertEqual(len(objects), 4)
+        self.assertEqual(objects[f"User.{edited.id}"], edited.to_dict())
+        self.assertEqual(objects[f"User.{changed.id}"], changed_dict)
+
+    def test_merge_before_save(self) -> None:
+        """Tests that a save keeps the instances another process saved."""
+        user = User()
+        self.storage.save()
+
+        self.save_elsewhere(
+            {f"User.{user.id}": user.to_dict(), "State.lagos": self.state_dict}
+        )
+
+        city = City()
+        self.storage.save()
+
+        self.assertEqual(
+            self.saved().keys(),
+            {f"User.{user.id}", "State.lagos", f"City.{city.id}"},
+        )
+
+    def test_processes(self) -> None:
+        """Tests that no save is lost when processes save at once."""
+        script = (
+            "import sys\n"
+            "from models.user import User\n"
+            "from models.engine.file_storage import FileStorage\n"
+            "storage = FileStorage(sys.argv[1], shared=True)\n"
+            "storage.reload()\n"
+            "for _ in range(20):\n"
+            "    User()\n"
+            "    storage.save()\n"
+        )
+        root = os.path.dirname(
+            os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+        )
+        env = dict(os.environ, PYTHONPATH=os.path.abspath(root))
+        env.pop("HBNB_TYPE_STORAGE", None)
+
+        processes = [
+            subprocess.Popen(
+                [sys.executable, "-c", script, self.file_path],
+                cwd=self.tmp_dir.name,
+                env=env,
+            )
+            for _ in range(4)
+        ]
+        for process in processes:
+            self.assertEqual(process.wait(30), 0)
+
+        self.assertEqual(len(self.saved()), 80)
+        self.assertEqual(len(self.storage.all(User)), 80)
+
+
+class TestFileStorageEvents(unittest.TestCase):
+    """Tests the events published when instances change."""
+
+    def setUp(self) -> None:
+        storage.all().clear()
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.storage = FileStorage(
+            os.path.join(self.tmp_dir.name, "file_storage.json")
+        )
+
+        self.events = []
+        self.subscription = self.storage.subscribe(self.events.append)
+
+    def tearDown(self) -> None:
+        self.storage.unsubscribe(self.subscription)
+        storage.all().clear()
+        self.tmp_dir.cleanup()
+
+    def test_events(self) -> None:
+        """Tests the events of creating, updating and deleting instances,
+        whichever storage engine made the change."""
+        state = State()
+        state.name = "Lagos"
+        city = City()
+        city.state_id = state.id
+        storage.delete(state, cascade=True)
+        storage.delete(state)
+
+        self.assertEqual(
+            self.events,
+            [
+                Event(
+                    CREATED,
+                    "State",
+                    state.id,
+                    ("updated_at", "id", "created_at"),
+                ),
+                Event(UPDATED, "State", state.id, ("name",)),
+                Event(
+                    CREATED,
+                    "City",
+                    city.id,
+                    ("updated_at", "id", "created_at"),
+                ),
+                Event(UPDATED, "City", city.id, ("state_id",)),
+                Event(DELETED, "State", state.id),
+                Event(DELETED, "City", city.id),
+            ],
+        )
+
+        # instances built from a dictionary aren't stored, so aren't told
+        State(**state.to_dict()).name = "Abuja"
+        self.assertEqual(len(self.events), 6)
+
+    def test_batched_events(self) -> None:
+        """Tests that batched subscribers get the events from their thread,
+        and that they are dropped past the queue size."""
+        batches = []
+        started, release = threading.Event(), threading.Event()
+
+        def receive(batch: list) -> None:
+            started.set()
+            release.wait(5)
+            batches.append(batch)
+
+        subscription = self.storage.subscribe(
+            receive, batched=True, batch_size=10, queue_size=10
+        )
+        users = [User()]
+        self.assertTrue(started.wait(5))
+
+        # the subscriber is busy with the first event: 10 more are queued
+        users += [User() for _ in range(29)]
+
+        # the changes weren't held up by the subscriber
+        self.assertEqual(len(self.events), 30)
+        self.assertEqual(subscription.dropped, 19)
+        self.assertFalse(subscription.flush(0))
+        release.set()
+        self.storage.unsubscribe(subscription)
+
+        self.assertEqual([len(batch) for batch in batches], [1, 10])
+        self.assertEqual(sum(batches, []), self.events[:11])
+        self.assertEqual(batches[1][-1].id, users[10].id)
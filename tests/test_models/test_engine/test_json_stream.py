@@ -0,0 +1,65 @@
+#!/usr/bin/python3
+
+"""Tests the streaming reader of the JSON file."""
+
+import io
+import json
+import unittest
+from models.engine.json_stream import iter_members
+
+
+class TestIterMembers(unittest.TestCase):
+    """Tests the `iter_members()` function."""
+
+    def read(self, text: str, chunk_size: int = 3) -> list:
+        """Returns the members read from `text` in small chunks."""
+        return list(iter_members(io.StringIO(text, newline=""), chunk_size))
+
+    def test_empty_object(self) -> None:
+        """Tests reading an empty JSON object."""
+        self.assertEqual(self.read("{}"), [])
+        self.assertEqual(self.read("  {\n}\n"), [])
+
+    def test_members_match_json_load(self) -> None:
+        """Tests that the members match the output of `json.loads()`."""
+        content = {
+            "User.1": {"id": "1", "age": 12345, "ratio": -1.5e-3},
+            "Place.2": {"id": "2", "amenity_ids": ["a", "b"], "x": None},
+            'Odd "key"': [True, False, {"nested": {}}],
+        }
+
+        for indent in (None, 4):
+            text = json.dumps(content, indent=indent)
+            members = self.read(text)
+
+            self.assertEqual(
+                {key: value for key, value, _, _ in members}, content
+            )
+
+    def test_numbers_across_chunks(self) -> None:
+        """Tests that a number split between chunks is read entirely."""
+        self.assertEqual(
+            [value for _, value, _, _ in self.read('{"a": 1234567}')],
+            [1234567],
+        )
+
+    def test_byte_ranges(self) -> None:
+        """Tests that the byte ranges point at the values in the file."""
+        text = json.dumps(
+            {
+                "City.1": {"name": "Kumasi – Ashanti"},
+                "City.2": {"name": "é"},
+            },
+            ensure_ascii=False,
+            indent=4,
+        )
+        data = text.encode("utf-8")
+
+        for _, value, start, end in self.read(text):
+            self.assertEqual(json.loads(data[start:end]), value)
+
+    def test_invalid_json(self) -> None:
+        """Tests that invalid JSON raises a decode error."""
+        for text in ("", "[1, 2]", '{"a": 1', '{"a" 1}', '{"a": 1} 2'):
+            with self.assertRaises(json.JSONDecodeError):
+                self.read(text)
@@ -0,0 +1,197 @@
+#!/usr/bin/python3
+
+"""Tests the ObjectRegistry used by the storage engines."""
+
+import unittest
+from models.engine.object_registry import ObjectRegistry
+
+
+class TestObjectRegistry(unittest.TestCase):
+    """Tests the dirty tracking of the ObjectRegistry."""
+
+    def setUp(self) -> None:
+        self.objects = ObjectRegistry()
+
+    def test_is_dict(self) -> None:
+        """Tests that the registry is a dictionary."""
+        self.assertIsInstance(self.objects, dict)
+        self.assertEqual(self.objects, {})
+
+    def test_setitem_marks_dirty(self) -> None:
+        """Tests that adding an object marks its key dirty."""
+        self.objects["User.1"] = "user"
+        self.objects.update({"City.1": "city"})
+        self.objects.setdefault("State.1", "state")
+
+        self.assertEqual(self.objects.dirty, {"User.1", "City.1", "State.1"})
+
+    def test_removal_marks_dirty(self) -> None:
+        """Tests that removing objects marks their keys dirty."""
+        self.objects.load("User.1", "user")
+        self.objects.load("User.2", "user")
+        self.objects.load("User.3", "user")
+        self.assertEqual(self.objects.dirty, set())
+
+        del self.objects["User.1"]
+        self.objects.pop("User.2")
+        self.assertEqual(self.objects.dirty, {"User.1", "User.2"})
+
+        self.objects.clear()
+        self.assertEqual(self.objects.dirty, {"User.1", "User.2", "User.3"})
+        self.assertEqual(self.objects.versions, {})
+
+    def test_versions_change(self) -> None:
+        """Tests that versions change whenever an object changes."""
+        self.objects["User.1"] = "user"
+        version = self.objects.versions["User.1"]
+
+        self.objects.touch("User.1")
+        self.assertNotEqual(self.objects.versions["User.1"], version)
+
+    def test_generations_change(self) -> None:
+        """Tests that the generation of a class changes with its objects."""
+        self.assertEqual(self.objects.generation("User"), 0)
+
+        generations = []
+        for change in (
+            lambda: self.objects.__setitem__("User.1", "first"),
+            lambda: self.objects.touch("User.1"),
+            lambda: self.objects.load("User.2", "second"),
+            lambda: self.objects.load_many({"User.3": "third"}),
+            lambda: self.objects.unload("User.3"),
+            lambda: self.objects.pop("User.2"),
+            self.objects.clear,
+        ):
+            change()
+            generations.append(self.objects.generation("User"))
+
+        self.assertEqual(len(set(generations)), len(generations))
+        self.assertEqual(generations, sorted(generations))
+
+        generation = self.objects.generation("User")
+        self.objects["Place.1"] = "place"
+        self.assertEqual(self.objects.generation("User"), generation)
+
+    def test_partitions(self) -> None:
+        """Tests that the objects are partitioned by class name."""
+        self.objects["User.1"] = "user 1"
+        self.objects.load("User.2", "user 2")
+        self.objects.load_many({"City.1": "city", "User.3": "user 3"})
+
+        self.assertEqual(
+            self.objects.partition("User"),
+            {"User.1": "user 1", "User.2": "user 2", "User.3": "user 3"},
+        )
+        self.assertEqual(self.objects.partition("City"), {"City.1": "city"})
+        self.assertEqual(self.objects.partition("Place"), {})
+
+        del self.objects["User.1"]
+        self.objects.pop("User.2")
+        self.objects.unload("User.3")
+        self.assertEqual(self.objects.partition("User"), {})
+
+        self.objects.popitem()
+        self.assertEqual(self.objects.partition("City"), {})
+
+        self.objects["State.1"] = "state"
+        self.objects.clear()
+        self.assertEqual(self.objects.partition("State"), {})
+
+    def test_indexes(self) -> None:
+        """Tests that the indexed attributes of the objects are indexed."""
+
+        class Indexed:
+            """An object with an indexed attribute."""
+
+            _indexes = ("email", "tags")
+
+            def __init__(self, email: str) -> None:
+                self.email = email
+                self.tags = []
+
+        first, second = Indexed("a@b.c"), Indexed("a@b.c")
+        self.objects["Indexed.1"] = first
+        self.objects.load("Indexed.2", second)
+        self.objects["Other.1"] = "other"
+
+        self.assertEqual(
+            self.objects.lookup("Indexed", "email", "a@b.c"),
+            {"Indexed.1": first, "Indexed.2": second},
+        )
+        self.assertEqual(self.objects.lookup("Indexed", "email", "x"), {})
+
+        # unhashable values and attributes that aren't indexed
+        self.assertIsNone(self.objects.lookup("Indexed", "tags", []))
+        self.assertIsNone(self.objects.lookup("Indexed", "id", "1"))
+
+        first.email = "x"
+        self.objects.reindex("Indexed.1")
+        self.assertEqual(
+            self.objects.lookup("Indexed", "email", "x"), {"Indexed.1": first}
+        )
+        self.assertEqual(
+            self.objects.lookup("Indexed", "email", "a@b.c"),
+            {"Indexed.2": second},
+        )
+
+        del self.objects["Indexed.1"]
+        self.objects.unload("Indexed.2")
+        self.assertEqual(self.objects.lookup("Indexed", "email", "a@b.c"), {})
+        self.assertEqual(self.objects.lookup("Indexed", "email", "x"), {})
+
+        self.objects.load_many({"Indexed.1": first})
+        self.objects.clear()
+        self.assertEqual(self.objects.indexes, {})
+
+    def test_references(self) -> None:
+        """Tests that references, including lists of ids, are indexed by the
+        ids they hold."""
+
+        class Referencing:
+            """An object referencing other objects."""
+
+            _references = {"parent_id": "Parent", "tag_ids": "Tag"}
+
+            def __init__(self, parent_id: str, tag_ids: list) -> None:
+                self.parent_id = parent_id
+                self.tag_ids = tag_ids
+
+        first = Referencing("1", ["a", "b", "a"])
+        second = Referencing("1", ["b"])
+        self.objects["Referencing.1"] = first
+        self.objects["Referencing.2"] = second
+
+        self.assertEqual(
+            self.objects.lookup("Referencing", "parent_id", "1"),
+            {"Referencing.1": first, "Referencing.2": second},
+        )
+        self.assertEqual(
+            self.objects.lookup("Referencing", "tag_ids", "a"),
+            {"Referencing.1": first},
+        )
+        self.assertEqual(
+            len(self.objects.lookup("Referencing", "tag_ids", "b")), 2
+        )
+
+        first.tag_ids = ["c"]
+        self.objects.reindex("Referencing.1")
+        self.assertEqual(
+            self.objects.lookup("Referencing", "tag_ids", "a"), {}
+        )
+        self.assertEqual(
+            self.objects.lookup("Referencing", "tag_ids", "c"),
+            {"Referencing.1": first},
+        )
+
+        del self.objects["Referencing.2"]
+        self.assertEqual(
+            self.objects.lookup("Referencing", "tag_ids", "b"), {}
+        )
+
+    def test_unload(self) -> None:
+        """Tests that unloading an object does not mark it dirty."""
+        self.objects.load("User.1", "user")
+        self.objects.unload("User.1")
+
+        self.assertNotIn("User.1", self.objects)
+        self.assertEqual(self.objects.dirty, set())
@@ -0,0 +1,218 @@
+#!/usr/bin/python3
+
+"""Tests the filter language and the planner of the `where` command."""
+
+import unittest
+from models.engine.object_registry import ObjectRegistry
+from models.engine.query import And, Comparison, Not, Or, parse, plan
+
+
+class Room:
+    """An object with hash, reference and range indexed attributes."""
+
+    _indexes = ("kind",)
+    _references = {"home_id": "Home"}
+    _range_indexes = ("price", "guests")
+
+    kind = ""
+    home_id = ""
+    price = 0
+    guests = 0
+
+    def __init__(self, kind: str, home_id: str, price: int, guests: int):
+        self.kind = kind
+        self.home_id = home_id
+        self.price = price
+        self.guests = guests
+
+
+class TestParse(unittest.TestCase):
+    """Tests parsing filters into trees."""
+
+    def test_precedence(self) -> None:
+        """Tests that `not` binds tighter than `and`, and `and` than `or`."""
+        node = parse('a == 1 or not b != "x" and (c < 2.5 or d >= -3)')
+
+        self.assertIsInstance(node, Or)
+        self.assertIsInstance(node.children[0], Comparison)
+        self.assertIsInstance(node.children[1], And)
+        self.assertIsInstance(node.children[1].children[0], Not)
+        self.assertIsInstance(node.children[1].children[1], Or)
+        self.assertEqual(
+            str(node), "(a == 1 or (not b != 'x' and (c < 2.5 or d >= -3)))"
+        )
+
+    def test_literals(self) -> None:
+        """Tests strings, numbers and constants."""
+        for text, value in (
+            ("name == 'it\\'s'", "it's"),
+            ('name = "a b"', "a b"),
+            ("count == 1e3", 1000.0),
+            ("flag == true", True),
+            ("flag == False", False),
+            ("name == None", None),
+        ):
+            with self.subTest(text=text):
+                node = parse(text)
+                self.assertEqual(node.operator, "==")
+                self.assertEqual(node.value, value)
+                self.assertIs(type(node.value), type(value))
+
+    def test_errors(self) -> None:
+        """Tests invalid filters."""
+        for text in (
+            "",
+            "a",
+            "a ==",
+            "a == b",
+            "== 1",
+            "a == 1 and",
+            "(a == 1",
+            "a == 1)",
+            "a ~ 1",
+            "and == 1",
+        ):
+            with self.subTest(text=text), self.assertRaises(ValueError):
+                parse(text)
+
+    def test_matches(self) -> None:
+        """Tests matching objects, including missing attributes and values
+        that can't be compared."""
+        room = Room("suite", "1", 120, 2)
+
+        self.assertTrue(parse("price > 100 and guests == 2").matches(room))
+        self.assertTrue(parse("price < 100 or kind == 'suite'").matches(room))
+        self.assertFalse(parse("not price > 100").matches(room))
+        self.assertFalse(parse("price < 'cheap'").matches(room))
+        self.assertFalse(parse("view == 'sea'").matches(room))
+        self.assertTrue(parse("not view == 'sea'").matches(room))
+
+
+class TestPlan(unittest.TestCase):
+    """Tests the plans chosen for filters."""
+
+    def setUp(self) -> None:
+        self.objects = ObjectRegistry()
+        for n in range(100):
+            room = Room(
+                "suite" if n % 10 == 0 else "single", str(n % 4), n, n % 5
+            )
+            self.objects[f"Room.{n}"] = room
+
+    def run_plan(self, text: str) -> tuple:
+        """Returns the plan of a filter and the matching objects."""
+        node = parse(text)
+        chosen = plan(node, "Room", Room, self.objects)
+        known = list(chosen.matches())
+        self.assertTrue(all(node.matches(obj) for obj in known))
+        matches = known + [
+            obj for obj in chosen.candidates() if node.matches(obj)
+        ]
+
+        expected = [
+            obj
+            for obj in self.objects.partition("Room").values()
+            if node.matches(obj)
+        ]
+        self.assertCountEqual(matches, expected)
+
+        return chosen, matches
+
+    def test_indexes(self) -> None:
+        """Tests that the index with the fewest candidates is used."""
+        for text, description, estimate in (
+            ("kind == 'suite'", "hash index on Room.kind == 'suite'", 10),
+            ("home_id == '1'", "hash index on Room.home_id == '1'", 25),
+            ("price < 5", "range index on Room.price in [-inf, 5]", 6),
+            ("price == 7", "range index on Room.price in [7, 7]", 1),
+            (
+                "kind == 'single' and price >= 90",
+                "range index on Room.price in [90, inf]",
+                10,
+            ),
+            (
+                "price > 10 and price <= 20 and guests > 0",
+                "range index on Room.price in [10, 20]",
+                11,
+            ),
+            (
+                "kind == 'suite' or price > 95",
+                "union of hash index on Room.kind == 'suite'; "
+                "range index on Room.price in [95, inf]",
+                15,
+            ),
+        ):
+            with self.subTest(text=text):
+                chosen, _ = self.run_plan(text)
+                self.assertEqual(chosen.description, description)
+                self.assertEqual(chosen.estimate, estimate)
+                self.assertFalse(chosen.scan)
+
+    def test_scans(self) -> None:
+        """Tests the filters that no index can answer."""
+        for text in (
+            "kind != 'suite'",
+            "not price < 50",
+            "view == 'sea'",
+            "price < 'cheap'",
+            "kind == 'suite' or view == 'sea'",
+        ):
+            with self.subTest(text=text):
+                chosen, _ = self.run_plan(text)
+                self.assertTrue(chosen.scan)
+                self.assertEqual(chosen.estimate, 100)
+
+    def test_bools_and_numbers(self) -> None:
+        """Tests that a bool doesn't compare to a number whether the filter
+        is answered by an index or by a scan."""
+        self.objects["Room.5"].price = True
+        self.objects.reindex("Room.5")
+        flagged = self.objects["Room.5"]
+
+        for text, matched in (
+            ("price < 100", False),
+            ("not not price < 100", False),
+            ("price == 1", False),
+            ("price != 1", True),
+            ("price == True", True),
+        ):
+            with self.subTest(text=text):
+                _, matches = self.run_plan(text)
+                self.assertEqual(flagged in matches, matched)
+
+    def test_union_yields_objects_once(self) -> None:
+        """Tests that objects matched by many plans of an `or` are checked
+        once."""
+        chosen, matches = self.run_plan("price < 10 or guests <= 0")
+        self.assertEqual(len(list(chosen.candidates())), 28)
+        self.assertEqual(len(matches), 28)
+
+    def test_columnar(self) -> None:
+        """Tests that the columns of a projection replace full scans."""
+        self.objects.project("Room", Room)
+
+        for text, estimate in (
+            ("kind != 'suite'", 90),
+            ("not price < 50", 50),
+            ("guests > 3 or kind != 'single'", 30),
+            ("price < 'cheap'", 100),
+        ):
+            with self.subTest(text=text):
+                chosen, _ = self.run_plan(text)
+                self.assertEqual(chosen.description, "columnar scan of Room")
+                self.assertEqual(chosen.estimate, estimate)
+
+        self.objects["Room.5"].price = "free"
+        self.objects.reindex("Room.5")
+        # a value of another type can't be ruled out by the column
+        chosen, matches = self.run_plan("not price < 50")
+        self.assertEqual(chosen.estimate, 51)
+        self.assertEqual(list(chosen.candidates()), [self.objects["Room.5"]])
+        self.assertIn(self.objects["Room.5"], matches)
+
+        # indexes are still preferred, and attributes without a column scanned
+        chosen, _ = self.run_plan("price > 90")
+        self.assertEqual(chosen.description, "range index on Room.price in "
+                         "[90, inf]")
+        chosen, _ = self.run_plan("view == 'sea'")
+        self.assertTrue(chosen.scan)
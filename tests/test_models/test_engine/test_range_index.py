@@ -0,0 +1,72 @@
+#!/usr/bin/python3
+
+"""Tests the range index kept on numeric attributes."""
+
+import random
+import unittest
+from models.engine.range_index import RangeIndex, is_number
+
+
+class TestRangeIndex(unittest.TestCase):
+    """Tests the RangeIndex class."""
+
+    def setUp(self) -> None:
+        self.index = RangeIndex()
+
+    def test_is_number(self) -> None:
+        """Tests which values can be kept in a range index."""
+        self.assertTrue(is_number(3))
+        self.assertTrue(is_number(-1.5))
+        self.assertFalse(is_number(True))
+        self.assertFalse(is_number(float("nan")))
+        self.assertFalse(is_number("3"))
+        self.assertFalse(is_number(None))
+
+    def test_range(self) -> None:
+        """Tests that the keys within bounds are returned by value."""
+        self.index.add("a", 50)
+        self.index.add("b", 120)
+        self.index.add("c", 10)
+        self.index.add("d", 75.5)
+        self.index.add("e", 120)
+
+        self.assertEqual(self.index.range(50, 120), ["a", "d", "b", "e"])
+        self.assertEqual(self.index.range(51, 119), ["d"])
+        self.assertEqual(self.index.range(high=50), ["c", "a"])
+        self.assertEqual(self.index.range(100), ["b", "e"])
+        self.assertEqual(self.index.range(), ["c", "a", "d", "b", "e"])
+        self.assertEqual(self.index.range(200, 300), [])
+        self.assertEqual(len(self.index), 5)
+
+        self.assertEqual(self.index.count(50, 120), 4)
+        self.assertEqual(self.index.count(high=50), 2)
+        self.assertEqual(self.index.count(), 5)
+        self.assertEqual(self.index.count(120, 50), 0)
+
+    def test_updates(self) -> None:
+        """Tests replacing and removing keys."""
+        self.index.add("a", 1)
+        self.index.add("b", 2)
+        self.index.add("a", 3)
+        self.assertEqual(self.index.range(), ["b", "a"])
+
+        self.index.remove("b")
+        self.index.remove("b")
+        self.assertEqual(self.index.range(), ["a"])
+        self.assertEqual(len(self.index), 1)
+
+    def test_bulk(self) -> None:
+        """Tests that keys added in bulk are found like the others."""
+        values = {f"key {n}": random.randint(0, 100) for n in range(500)}
+        for key, value in values.items():
+            self.index.add(key, value, bulk=True)
+
+        self.index.remove("key 0")
+        self.index.add("key 1", 1000)
+        del values["key 0"]
+        values["key 1"] = 1000
+
+        expected = sorted(
+            (value, key) for key, value in values.items() if value >= 50
+        )
+        self.assertEqual(self.index.range(50), [key for _, key in expected])
@@ -0,0 +1,96 @@
+#!/usr/bin/python3
+
+"""Tests the reader/writer lock guarding the objects of the storage."""
+
+import threading
+import unittest
+from models.engine.read_write_lock import ReadWriteLock
+
+
+class TestReadWriteLock(unittest.TestCase):
+    """Tests the ReadWriteLock class."""
+
+    def setUp(self) -> None:
+        self.lock = ReadWriteLock()
+
+    def run_thread(self, target) -> threading.Thread:
+        """Starts a daemon thread running `target`."""
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        return thread
+
+    def test_readers_share(self) -> None:
+        """Tests that many threads hold the lock for reading at once."""
+        barrier = threading.Barrier(4, timeout=5)
+        errors = []
+
+        def read() -> None:
+            with self.lock.read:
+                try:
+                    barrier.wait()
+                except threading.BrokenBarrierError as error:
+                    errors.append(error)
+
+        for thread in [self.run_thread(read) for _ in range(4)]:
+            thread.join()
+
+        self.assertEqual(errors, [])
+
+    def test_writer_alone(self) -> None:
+        """Tests that a writer waits for the readers, and readers for it."""
+        events = []
+        writing = threading.Event()
+
+        def write() -> None:
+            writing.set()
+            with self.lock.write:
+                events.append("write")
+
+        def read() -> None:
+            with self.lock.read:
+                events.append("read")
+
+        with self.lock.read:
+            writer = self.run_thread(write)
+            self.assertTrue(writing.wait(5))
+            writer.join(0.05)
+
+            # the waiting writer goes before readers arriving after it
+            reader = self.run_thread(read)
+            reader.join(0.05)
+            self.assertEqual(events, [])
+
+        writer.join(5)
+        reader.join(5)
+        self.assertEqual(events, ["write", "read"])
+
+    def test_reentrant(self) -> None:
+        """Tests that both sides are reentrant, and that a writer reads."""
+        with self.lock.write, self.lock.write, self.lock.read:
+            pass
+
+        # a reader keeps reading while a writer waits
+        with self.lock.read:
+            writer = self.run_thread(self.lock.write.acquire)
+            writer.join(0.05)
+            with self.lock.read:
+                self.assertTrue(writer.is_alive())
+
+        writer.join(5)
+        self.assertFalse(writer.is_alive())
+
+    def test_errors(self) -> None:
+        """Tests upgrading a read lock and releasing another's lock."""
+        with self.lock.read, self.assertRaises(RuntimeError):
+            self.lock.write.acquire()
+
+        with self.assertRaises(RuntimeError):
+            self.lock.write.release()
+
+        # the lock is still usable
+        with self.lock.write:
+            pass
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/python3
+
+"""Tests the point-in-time snapshots of the objects dictionary."""
+
+import unittest
+from models.engine.object_registry import ObjectRegistry
+
+
+class Room:
+    """An object with a state."""
+
+    def __init__(self, kind: str) -> None:
+        self.kind = kind
+
+    def to_dict(self) -> dict:
+        return {"kind": self.kind}
+
+
+class TestSnapshot(unittest.TestCase):
+    """Tests the Snapshot class, as taken by the object registry."""
+
+    def setUp(self) -> None:
+        self.objects = ObjectRegistry()
+        self.suite, self.single = Room("suite"), Room("single")
+        self.objects["Room.1"] = self.suite
+        self.objects["Room.2"] = self.single
+
+    def test_snapshot(self) -> None:
+        """Tests that a snapshot isn't affected by later changes."""
+        snapshot = self.objects.snapshot()
+        self.assertEqual(snapshot.versions, self.objects.versions)
+        self.assertGreater(snapshot.version, max(snapshot.versions.values()))
+
+        self.objects.preserve("Room.1", self.suite)
+        self.suite.kind = "penthouse"
+        self.objects.preserve("Room.1", self.suite)
+        self.suite.kind = "loft"
+        self.objects["Room.3"] = Room("double")
+        del self.objects["Room.2"]
+        self.objects.touch("Room.1")
+
+        self.assertEqual(
+            dict(snapshot),
+            {"Room.1": {"kind": "suite"}, "Room.2": {"kind": "single"}},
+        )
+        self.assertNotEqual(snapshot.versions, self.objects.versions)
+        self.assertEqual(
+            dict(self.objects.snapshot()),
+            {"Room.1": {"kind": "loft"}, "Room.3": {"kind": "double"}},
+        )
+
+        with self.assertRaises(TypeError):
+            snapshot["Room.1"]["kind"] = "attic"
+        with self.assertRaises(KeyError):
+            snapshot["Room.3"]
+
+    def test_close(self) -> None:
+        """Tests that closed snapshots stop keeping states."""
+        with self.objects.snapshot() as snapshot:
+            self.assertIn(snapshot, self.objects.snapshots)
+
+        self.objects.preserve("Room.1", self.suite)
+        self.suite.kind = "loft"
+
+        self.assertTrue(snapshot.closed)
+        self.assertNotIn(snapshot, self.objects.snapshots)
+        self.assertEqual(snapshot["Room.1"], {"kind": "loft"})
+
+    def test_preserve_other_object(self) -> None:
+        """Tests that objects replacing those of a snapshot are ignored."""
+        snapshot = self.objects.snapshot()
+        other = Room("suite")
+        self.objects["Room.1"] = other
+
+        self.objects.preserve("Room.1", other)
+        other.kind = "loft"
+
+        self.assertEqual(snapshot["Room.1"], {"kind": "suite"})
+        self.assertNotEqual(snapshot, self.objects.snapshot())
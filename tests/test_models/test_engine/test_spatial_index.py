@@ -0,0 +1,112 @@
+#!/usr/bin/python3
+
+"""Tests the spatial index kept on the coordinates of places."""
+
+import random
+import unittest
+from models.engine.spatial_index import SpatialIndex, haversine, is_location
+
+
+class TestSpatialIndex(unittest.TestCase):
+    """Tests the SpatialIndex class against a full scan."""
+
+    def setUp(self) -> None:
+        random.seed(0)
+        self.index = SpatialIndex()
+        self.points = {}
+
+        for n in range(3000):
+            if n % 2:
+                location = (random.uniform(-90, 90), random.uniform(-180, 180))
+            else:
+                # a crowded area across the antimeridian
+                location = (
+                    random.uniform(47, 49),
+                    (random.uniform(178, 182) + 180) % 360 - 180,
+                )
+
+            self.points[f"key {n}"] = location
+            self.index.add(f"key {n}", *location)
+
+        # moved and removed keys
+        for n in range(0, 3000, 5):
+            self.index.remove(f"key {n}")
+            del self.points[f"key {n}"]
+
+        for n in range(1, 3000, 7):
+            self.points[f"key {n}"] = (48.5, 179.95)
+            self.index.add(f"key {n}", 48.5, 179.95)
+
+    def scan(self, latitude: float, longitude: float) -> list:
+        """Returns the `(distance, key)` of every point, nearest first."""
+        return sorted(
+            (haversine(latitude, longitude, *location), key)
+            for key, location in self.points.items()
+        )
+
+    def assertSameKeys(self, found: list, expected: list) -> None:
+        """Checks the keys and distances of two lists of pairs."""
+        self.assertEqual(
+            [key for _, key in found], [key for _, key in expected]
+        )
+        for (distance, _), (expected_distance, _) in zip(found, expected):
+            self.assertAlmostEqual(distance, expected_distance, places=6)
+
+    def test_is_location(self) -> None:
+        """Tests which coordinates can be kept in a spatial index."""
+        self.assertTrue(is_location(0, 0.0))
+        self.assertTrue(is_location(-90, 180))
+        self.assertFalse(is_location(91, 0))
+        self.assertFalse(is_location(0, -181))
+        self.assertFalse(is_location("1", 2))
+
+    def test_haversine(self) -> None:
+        """Tests the distance between two cities."""
+        # Accra to Kumasi, about 200 km apart
+        self.assertAlmostEqual(
+            haversine(5.6037, -0.1870, 6.6885, -1.6244), 199.6, places=0
+        )
+        self.assertEqual(haversine(10, 20, 10, 20), 0)
+
+    def test_nearest(self) -> None:
+        """Tests the k nearest keys, with and without a radius."""
+        for point in [(48, 179.9), (48, -179.9), (89.5, 0), (-30, 60)]:
+            with self.subTest(point=point):
+                expected = self.scan(*point)
+                self.assertSameKeys(
+                    self.index.nearest(*point, 15), expected[:15]
+                )
+
+                within = [pair for pair in expected if pair[0] <= 100]
+                self.assertSameKeys(
+                    self.index.nearest(*point, 15, radius=100), within[:15]
+                )
+                self.assertSameKeys(self.index.within(*point, 100), within)
+
+        self.assertEqual(self.index.nearest(0, 0, 0), [])
+        self.assertEqual(len(self.index.nearest(0, 0, 10**6)), len(self.index))
+
+    def test_bbox(self) -> None:
+        """Tests the keys in bounding boxes, including across the
+        antimeridian."""
+        for south, west, north, east in [
+            (47.5, 179, 48.5, -179),
+            (-10, -20, 30, 40),
+            (48.5, 179.95, 48.5, 179.95),
+            (10, 0, -10, 0),
+        ]:
+            with self.subTest(box=(south, west, north, east)):
+                expected = {
+                    key
+                    for key, (lat, lon) in self.points.items()
+                    if south <= lat <= north
+                    and (
+                        west <= lon <= east
+                        if west <= east
+                        else lon >= west or lon <= east
+                    )
+                }
+                found = self.index.bbox(south, west, north, east)
+
+                self.assertEqual(len(found), len(set(found)))
+                self.assertEqual(set(found), expected)
@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+
+"""Tests the inverted index kept on text attributes."""
+
+import json
+import unittest
+from models.engine.text_index import TextIndex, tokenize
+
+
+class TestTextIndex(unittest.TestCase):
+    """Tests the TextIndex class."""
+
+    def setUp(self) -> None:
+        self.index = TextIndex()
+        self.index.add("a", "A quiet room near the beach")
+        self.index.add("b", "Beach, beach and more beach!")
+        self.index.add("c", "A noisy room in the city centre")
+
+    def test_tokenize(self) -> None:
+        """Tests splitting texts into lowercase words."""
+        self.assertEqual(
+            tokenize("Café, WiFi & 2 beds!"), ["café", "wifi", "2", "beds"]
+        )
+        self.assertEqual(tokenize("  "), [])
+
+    def test_search(self) -> None:
+        """Tests that matching keys are scored, rarer and more frequent words
+        scoring higher."""
+        scores = self.index.search("beach")
+        self.assertEqual(set(scores), {"a", "b"})
+        self.assertGreater(scores["b"], scores["a"])
+
+        scores = self.index.search("quiet room")
+        self.assertEqual(set(scores), {"a", "c"})
+        self.assertGreater(scores["a"], scores["c"])
+
+        self.assertEqual(self.index.search("mountain"), {})
+        self.assertEqual(TextIndex().search("beach"), {})
+
+    def test_add_and_remove(self) -> None:
+        """Tests replacing and removing the text of keys."""
+        self.index.changed = False
+        self.index.add("a", "A quiet room near the beach")
+        self.assertFalse(self.index.changed)
+
+        self.index.add("a", "A flat in the city")
+        self.assertTrue(self.index.changed)
+        self.assertEqual(set(self.index.search("city beach")), {"a", "b", "c"})
+        self.assertNotIn("a", self.index.search("quiet"))
+
+        self.index.remove("b")
+        self.index.remove("unknown")
+        self.assertEqual(set(self.index.search("beach")), set())
+        self.assertEqual(len(self.index), 2)
+
+        self.index.prune(lambda key: key != "c")
+        self.assertEqual(list(self.index.search("city")), ["a"])
+
+    def test_state(self) -> None:
+        """Tests that an index saved as JSON scores keys the same way."""
+        state = json.loads(json.dumps(self.index.to_state()))
+        index = TextIndex.from_state(state)
+
+        self.assertEqual(len(index), 3)
+        self.assertFalse(index.changed)
+        for query in ("beach", "quiet room", "city centre"):
+            self.assertEqual(index.search(query), self.index.search(query))
+
+        index.add("a", "A quiet room near the beach")
+        self.assertFalse(index.changed)
+
+        index.remove("b")
+        self.assertEqual(set(index.search("beach")), {"a"})
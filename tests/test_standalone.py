@@ -0,0 +1,75 @@
+#!/usr/bin/python3
+
+"""Tests that the command line tools don't touch the storage."""
+
+import os
+import sys
+import tempfile
+import unittest
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestStandalone(unittest.TestCase):
+    """Tests the `import_engine()` function and the tools using it."""
+
+    def run_python(self, code: str) -> str:
+        """Runs Python code in a directory holding an unreadable storage
+        file, then returns its output."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_path = os.path.join(tmp_dir, "file_storage.json")
+            with open(json_path, "w", encoding="utf-8") as json_file:
+                json_file.write("{broken")
+
+            output = subprocess.run(
+                [sys.executable, "-c", code],
+                cwd=tmp_dir,
+                env={**os.environ, "PYTHONPATH": ROOT},
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+
+            self.assertEqual(os.listdir(tmp_dir), ["file_storage.json"])
+
+        return output
+
+    def test_import_engine(self) -> None:
+        """Tests that the engine modules are imported without the
+        storage."""
+        output = self.run_python(
+            "import sys\n"
+            "from standalone import import_engine\n"
+            "codec = import_engine('codec')\n"
+            "print(codec.__name__, hasattr(sys.modules['models'], 'storage'))"
+        )
+        self.assertEqual(output.split(), ["models.engine.codec", "False"])
+
+    def test_benchmark_codecs(self) -> None:
+        """Tests that the codec benchmark runs without the storage."""
+        output = self.run_python(
+            "from benchmark_codecs import main\nmain(['30'])"
+        )
+        self.assertIn("30 objects", output)
+        self.assertIn("| `json` |", output)
+
+    def test_convert_snapshot(self) -> None:
+        """Tests that the snapshot converter only writes its output."""
+        output = self.run_python(
+            "import os, sys, tempfile\n"
+            "from convert_snapshot import main\n"
+            "with tempfile.TemporaryDirectory() as tmp_dir:\n"
+            "    json_path = os.path.join(tmp_dir, 'in.json')\n"
+            "    with open(json_path, 'w') as json_file:\n"
+            "        json_file.write('{}')\n"
+            "    bin_path = os.path.join(tmp_dir, 'out.bin')\n"
+            "    print(main(['to-binary', json_path, bin_path]),\n"
+            "          os.path.exists(bin_path),\n"
+            "          hasattr(sys.modules['models'], 'storage'))"
+        )
+        self.assertEqual(output.split(), ["0", "True", "False"])
+
+
+if __name__ == "__main__":
+    unittest.main()